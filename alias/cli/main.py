@@ -18,6 +18,7 @@ import logging
 from alias.io.command_line_input import enter_file
 from alias.src.run_alias import run_alias
 from alias.src.alias_options import AliasOptions
+from alias.src.linear_algebra import ASSEMBLY_ENGINES, SOLVERS
 from alias.src.utilities import print_alias
 from alias.version import __version__
 
@@ -60,13 +61,39 @@ from alias.version import __version__
     '--ow_dist', is_flag=True, default=False,
     help='Toggles overwrite intrinsic probability distributions'
 )
+@click.option(
+    '--jobs', type=click.IntRange(min=1), default=1,
+    help='Number of processes fitting intrinsic surfaces to frames '
+         'in parallel'
+)
+@click.option(
+    '--warm_start', is_flag=True, default=False,
+    help='Seeds intrinsic surface pivots from those of the previous frame'
+)
+@click.option(
+    '--assembly', type=click.Choice(ASSEMBLY_ENGINES), default='auto',
+    help='Engine used to form linear equations for surface coefficients'
+)
+@click.option(
+    '--solver', type=click.Choice(list(SOLVERS)), default='auto',
+    help='Method used to solve linear equations for surface coefficients'
+)
+@click.option(
+    '--incremental', is_flag=True, default=False,
+    help='Updates Cholesky factors with each batch of new pivots'
+)
+@click.option(
+    '--coarse_to_fine', is_flag=True, default=False,
+    help='Grows pivots against surfaces of increasing resolution'
+)
 @click.argument(
     'trajectory', type=click.Path(exists=True),
     required=True, default=None
 )
 def alias(trajectory, topology, debug, checkpoint,
           ow_coeff, ow_recon, ow_pos, ow_intpos, ow_hist,
-          ow_dist):
+          ow_dist, jobs, warm_start, assembly, solver, incremental,
+          coarse_to_fine):
 
     # Initialising log
     if debug:
@@ -91,7 +118,10 @@ def alias(trajectory, topology, debug, checkpoint,
     # Collate options for overwriting files
     options = AliasOptions(
         ow_coeff, ow_recon, ow_pos,
-        ow_intpos, ow_hist, ow_dist
+        ow_intpos, ow_hist, ow_dist,
+        jobs=jobs, warm_start=warm_start, assembly=assembly,
+        solver=solver, incremental=incremental,
+        coarse_to_fine=coarse_to_fine
     )
 
     run_alias(
@@ -1,7 +1,95 @@
+import os
+
 import numpy as np
 import tables
 
 
+#: Data types available for storing floating point datasets
+STORAGE_ATOMS = {
+    'float64': tables.Float64Atom,
+    'float32': tables.Float32Atom,
+    'int16': tables.Int16Atom
+}
+
+
+def storage_atom(dtype='float64'):
+    """Returns atom storing floating point data as dtype, either
+    'float64', 'float32' or 'int16' (see `quantise_array`)"""
+    try:
+        return STORAGE_ATOMS[dtype]()
+    except KeyError:
+        raise ValueError(
+            'Storage type {} not one of {}'.format(
+                dtype, list(STORAGE_ATOMS)))
+
+
+def storage_filters(complib=None, complevel=5, shuffle=True):
+    """
+    Returns compression filters for hdf5 datasets
+
+    Parameters
+    ----------
+    complib:  str (optional)
+        Compression library supported by PyTables, for example
+        'zlib', 'blosc' or 'blosc:zstd' (default=no compression)
+    complevel:  int (optional)
+        Compression level from 1 to 9
+    shuffle:  bool (optional)
+        Whether to apply byte shuffle filter before compression
+
+    Returns
+    -------
+    filters:  tables.Filters
+        Filters to apply, or None if no compression
+    """
+    if complib is None:
+        return None
+
+    return tables.Filters(
+        complevel=complevel, complib=complib, shuffle=shuffle)
+
+
+def quantise_array(array, scale_factor, dtype=np.int16):
+    """
+    Quantises floating point array to integers of dtype in steps of
+    scale_factor, so that values are stored to within scale_factor / 2
+
+    Parameters
+    ----------
+    array:  float, array_like
+        Values to quantise
+    scale_factor:  float
+        Size of each quantisation step
+    dtype:  type (optional)
+        Integer type of quantised values
+
+    Returns
+    -------
+    quantised:  int, array_like
+        Quantised values, such that array ~ quantised * scale_factor
+    """
+
+    quantised = np.round(np.asarray(array) / scale_factor)
+    limit = np.iinfo(dtype).max
+
+    if np.any(np.abs(quantised) > limit):
+        raise ValueError(
+            'Values exceed range +/-{} of quantisation with scale factor '
+            '{}'.format(limit * scale_factor, scale_factor))
+
+    return quantised.astype(dtype)
+
+
+def decode_array(array, attrs):
+    """Returns array loaded from a dataset with attributes attrs
+    as floating point values, reversing any quantisation"""
+
+    if 'scale_factor' in attrs:
+        return array * attrs['scale_factor']
+
+    return array
+
+
 def make_earray(file_name, arrays, atom, sizes):
     """
     General purpose algorithm to create an empty earray
@@ -47,7 +135,7 @@ def make_hdf5(file_path, shape, datatype):
     )
 
 
-def load_hdf5(file_path, frame='all'):
+def load_hdf5(file_path, frame='all', node='/dataset'):
     """
     General purpose algorithm to load an array from a hdf5 file
 
@@ -57,6 +145,8 @@ def load_hdf5(file_path, frame='all'):
         Path name of hdf5 file
     frame:  int (optional)
         Trajectory frame to load
+    node:  str (optional)
+        Location of dataset in hdf5 file
 
     Returns
     -------
@@ -66,10 +156,13 @@ def load_hdf5(file_path, frame='all'):
     """
 
     with tables.open_file(file_path + '.hdf5', 'r') as infile:
+        dataset = infile.get_node(node)
         if frame == 'all':
-            array = infile.root.dataset[:]
+            array = dataset[:]
         else:
-            array = infile.root.dataset[frame]
+            array = dataset[frame]
+
+        array = decode_array(array, dataset.attrs)
 
     return array
 
@@ -176,3 +269,423 @@ def mode_check_hdf5(frame_check, ow=False):
     elif ow:
         return 'r+'
     return False
+
+
+def frame_chunkshape(shape, atom, chunk_bytes=2**20, max_frames=None):
+    """
+    Returns chunk shape of an earray holding one frame of given shape
+    per row, so that each frame is read from and written to whole
+    chunks. Frames smaller than chunk_bytes are grouped together.
+
+    Parameters
+    ----------
+    shape:  int, tuple
+        Shape of each frame in dataset
+    atom:  tables.Atom
+        Data type of dataset
+    chunk_bytes:  int (optional)
+        Target size of each chunk in bytes
+    max_frames:  int (optional)
+        Maximum number of frames in each chunk
+
+    Returns
+    -------
+    chunkshape:  int, tuple
+        Chunk shape of dataset, including frame dimension
+    """
+
+    frame_bytes = int(np.prod(shape)) * atom.itemsize
+    n_frames = max(1, chunk_bytes // max(1, frame_bytes))
+    if max_frames:
+        n_frames = min(n_frames, max_frames)
+
+    return (n_frames,) + tuple(shape)
+
+
+class AliasStore:
+    """Session keeping hdf5 files open for the duration of an analysis
+    stage, as an alternative to `make_hdf5`, `load_hdf5`, `save_hdf5`
+    and `frame_check_hdf5`, which reopen files on every call.
+
+    Each dataset is an earray with one row per trajectory frame,
+    located at node (default='/dataset', the layout of `make_hdf5`)
+    in its file. Appended frames are buffered in memory and written in
+    batches of batch_size frames, and the number of frames held in each
+    dataset is tracked in memory, so that checking whether a frame is
+    done does not touch the disk. All buffered frames are written when
+    the session is closed.
+
+    Datasets belonging to one set of analysis parameters may be kept
+    together in a group of a single results file, with the parameters
+    stored as attributes of the group (see `parameter_group`).
+
+    Can be used as a context manager:
+
+        with AliasStore() as store:
+            store.create(file_path, shape, tables.Float64Atom())
+            for frame in range(nframe):
+                mode = store.mode(file_path, frame)
+                store.save(file_path, array, frame, mode)
+    """
+
+    def __init__(self, batch_size=16):
+        """
+        Parameters
+        ----------
+        batch_size:  int (optional)
+            Number of appended frames buffered before writing to disk
+        """
+        self.batch_size = batch_size
+
+        self._files = {}
+        self._writable = {}
+        self._n_frames = {}
+        self._buffers = {}
+        self._attrs = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _file(self, file_path, writable=False):
+        """Return open file, reopening for writing if required"""
+
+        if file_path in self._files:
+            if self._writable[file_path] or not writable:
+                return self._files[file_path]
+            self._close_file(file_path)
+
+        if not writable and not os.path.exists(file_path + '.hdf5'):
+            raise FileNotFoundError(
+                'No such hdf5 file: {}.hdf5'.format(file_path))
+
+        self._files[file_path] = tables.open_file(
+            file_path + '.hdf5', 'a' if writable else 'r')
+        self._writable[file_path] = writable
+
+        return self._files[file_path]
+
+    def _close_file(self, file_path):
+        """Write buffered frames and close file"""
+
+        self.flush(file_path)
+        self._files.pop(file_path).close()
+        for key in list(self._n_frames):
+            if key[0] == file_path:
+                self._n_frames.pop(key)
+        for key in list(self._attrs):
+            if key[0] == file_path:
+                self._attrs.pop(key)
+
+    def _dataset(self, file_path, node='/dataset', writable=False):
+        return self._file(file_path, writable).get_node(node)
+
+    def exists(self, file_path, node='/dataset'):
+        """Returns whether node exists in hdf5 file"""
+
+        if (file_path not in self._files
+                and not os.path.exists(file_path + '.hdf5')):
+            return False
+
+        return node in self._file(file_path)
+
+    def create(self, file_path, shape, atom, expected_frames=None,
+               node='/dataset', attrs=None, filters=None):
+        """
+        Create an empty dataset in a hdf5 file, with chunks tuned to
+        reading and writing whole frames (see `frame_chunkshape`).
+        Any existing dataset at node is replaced.
+
+        Floating point frames saved to integer datasets with a
+        'scale_factor' attribute are quantised (see `quantise_array`),
+        and are converted back to floating point values when loaded.
+
+        Parameters
+        ----------
+        file_path:  str
+            Path name of hdf5 file
+        shape:  int, tuple
+            Shape of each frame in dataset
+        atom:  tables.Atom
+            Data type of dataset
+        expected_frames:  int (optional)
+            Expected number of frames in dataset
+        node:  str (optional)
+            Location of dataset in hdf5 file
+        attrs:  dict (optional)
+            Attributes to store alongside dataset
+        filters:  tables.Filters (optional)
+            Compression filters of dataset, see `storage_filters`
+        """
+
+        key = (file_path, node)
+        self._buffers.pop(key, None)
+        self._attrs.pop(key, None)
+
+        if node == '/dataset':
+            # Dataset is the sole content of the file
+            if file_path in self._files:
+                self._close_file(file_path)
+            tables.open_file(file_path + '.hdf5', 'w').close()
+
+        outfile = self._file(file_path, writable=True)
+        if node in outfile:
+            outfile.remove_node(node)
+
+        where, name = node.rsplit('/', 1)
+        kwargs = {}
+        if expected_frames:
+            kwargs['expectedrows'] = expected_frames
+        dataset = outfile.create_earray(
+            where or '/', name, atom, (0,) + tuple(shape),
+            chunkshape=frame_chunkshape(
+                shape, atom, max_frames=expected_frames),
+            filters=filters, createparents=True, **kwargs)
+
+        for attr, value in (attrs or {}).items():
+            dataset.attrs[attr] = value
+
+        self._n_frames[key] = 0
+
+    def attrs(self, file_path, node='/dataset'):
+        """Returns dictionary of attributes stored at node"""
+
+        key = (file_path, node)
+        if key not in self._attrs:
+            attrs = self._file(file_path).get_node(node)._v_attrs
+            self._attrs[key] = {
+                name: attrs[name] for name in attrs._v_attrnamesuser}
+
+        return self._attrs[key]
+
+    def find_group(self, file_path, **parameters):
+        """
+        Returns location of group in hdf5 file with attributes
+        matching parameters, or None if no such group exists.
+        Parameters with a value of None are ignored.
+
+        Parameters
+        ----------
+        file_path:  str
+            Path name of hdf5 file
+        parameters:  dict
+            Values of analysis parameters identifying group
+
+        Returns
+        -------
+        node:  str
+            Location of group in hdf5 file
+        """
+
+        parameters = {
+            name: value for name, value in parameters.items()
+            if value is not None}
+
+        if not self.exists(file_path, '/'):
+            return None
+
+        for group in self._file(file_path).root._f_iter_nodes('Group'):
+            attrs = self.attrs(file_path, group._v_pathname)
+            if set(attrs) != set(parameters):
+                continue
+            if all(np.isclose(attrs[name], value)
+                   if isinstance(value, float) else attrs[name] == value
+                   for name, value in parameters.items()):
+                return group._v_pathname
+
+        return None
+
+    def parameter_group(self, file_path, **parameters):
+        """
+        Returns location of group in hdf5 file with attributes
+        matching parameters (see `find_group`), creating the group if
+        it does not exist
+
+        Parameters
+        ----------
+        file_path:  str
+            Path name of hdf5 file
+        parameters:  dict
+            Values of analysis parameters identifying group
+
+        Returns
+        -------
+        node:  str
+            Location of group in hdf5 file
+        """
+
+        node = self.find_group(file_path, **parameters)
+        if node is not None:
+            return node
+
+        outfile = self._file(file_path, writable=True)
+        index = len(outfile.root._v_groups)
+        while 'parameters_{}'.format(index) in outfile.root:
+            index += 1
+
+        group = outfile.create_group('/', 'parameters_{}'.format(index))
+        for name, value in parameters.items():
+            if value is not None:
+                group._v_attrs[name] = value
+
+        return group._v_pathname
+
+    def remove(self, file_path, node):
+        """Remove node, and any datasets it contains, from hdf5 file"""
+
+        self.flush(file_path)
+
+        prefix = node.rstrip('/') + '/'
+        for key in list(self._n_frames) + list(self._attrs):
+            if key[0] == file_path and (
+                    key[1] == node or key[1].startswith(prefix)):
+                self._n_frames.pop(key, None)
+                self._buffers.pop(key, None)
+                self._attrs.pop(key, None)
+
+        self._file(file_path, writable=True).remove_node(
+            node, recursive=True)
+
+    def shape(self, file_path, node='/dataset'):
+        """Returns shape of dataset in hdf5 file, including
+        buffered frames"""
+
+        dataset = self._dataset(file_path, node)
+        n_frames = self.n_frames(file_path, node)
+
+        return (n_frames,) + dataset.shape[1:]
+
+    def n_frames(self, file_path, node='/dataset'):
+        """Returns number of frames in hdf5 file, including
+        buffered frames"""
+
+        key = (file_path, node)
+        if key not in self._n_frames:
+            self._n_frames[key] = self._dataset(file_path, node).nrows
+
+        return self._n_frames[key]
+
+    def done(self, file_path, nframe, node='/dataset'):
+        """Returns mask of which of the first nframe frames are
+        held in hdf5 file"""
+        return np.arange(nframe) < self.n_frames(file_path, node)
+
+    def mode(self, file_path, frame, ow=False, node='/dataset'):
+        """Returns mode in which to save frame, see `mode_check_hdf5`"""
+        return mode_check_hdf5(
+            self.n_frames(file_path, node) <= frame, ow)
+
+    def load(self, file_path, frame='all', node='/dataset'):
+        """
+        Load an array from a hdf5 file, see `load_hdf5`
+
+        Parameters
+        ----------
+        file_path:  str
+            Path name of hdf5 file
+        frame:  int (optional)
+            Trajectory frame to load
+        node:  str (optional)
+            Location of dataset in hdf5 file
+
+        Returns
+        -------
+        array:  array_like (float);
+            Data array to be loaded
+        """
+
+        key = (file_path, node)
+        attrs = self.attrs(file_path, node)
+
+        if frame == 'all':
+            self.flush(file_path)
+            array = self._dataset(file_path, node)[:]
+        else:
+            buffer = self._buffers.get(key, [])
+            n_saved = self.n_frames(file_path, node) - len(buffer)
+            if frame >= n_saved:
+                array = buffer[frame - n_saved].copy()
+            else:
+                array = self._dataset(file_path, node)[frame]
+
+        return decode_array(array, attrs)
+
+    def save(self, file_path, array, frame, mode='a', node='/dataset'):
+        """
+        Save an array from a single frame to a hdf5 file, see
+        `save_hdf5`. Appended frames are buffered and written in
+        batches.
+
+        Parameters
+        ----------
+        file_path:  str
+            Path name of hdf5 file
+        array:  array_like (float);
+            Data array to be saved, must be same shape as object
+            'dataset' in hdf5 file
+        frame:  int
+            Trajectory frame to save
+        mode:  str (optional)
+            Option to append 'a' to hdf5 file or overwrite 'r+'
+            existing data
+        node:  str (optional)
+            Location of dataset in hdf5 file
+        """
+
+        if not mode:
+            return
+
+        key = (file_path, node)
+        dataset = self._dataset(file_path, node, writable=True)
+        array = np.asarray(array)
+        assert dataset.shape[1:] == array.shape
+
+        attrs = self.attrs(file_path, node)
+        if 'scale_factor' in attrs:
+            array = quantise_array(
+                array, attrs['scale_factor'], dataset.dtype)
+
+        buffer = self._buffers.setdefault(key, [])
+        n_frames = self.n_frames(file_path, node)
+
+        if mode.lower() == 'a':
+            buffer.append(np.array(array, dtype=dataset.dtype))
+            self._n_frames[key] = n_frames + 1
+            if len(buffer) >= self.batch_size:
+                self.flush(file_path)
+
+        elif mode.lower() == 'r+':
+            n_saved = n_frames - len(buffer)
+            if frame >= n_saved:
+                buffer[frame - n_saved][...] = array
+            else:
+                dataset[frame] = array
+
+    def flush(self, file_path=None):
+        """Write buffered frames of file_path (default=all files)
+        to disk"""
+
+        keys = [
+            key for key in self._buffers
+            if file_path is None or key[0] == file_path]
+
+        for key in keys:
+            buffer = self._buffers.pop(key)
+            if buffer:
+                dataset = self._dataset(*key, writable=True)
+                dataset.append(np.stack(buffer))
+                dataset.flush()
+
+    def close(self):
+        """Write all buffered frames and close all files"""
+
+        self.flush()
+        for outfile in self._files.values():
+            outfile.close()
+
+        self._files = {}
+        self._writable = {}
+        self._n_frames = {}
+        self._attrs = {}
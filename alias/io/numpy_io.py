@@ -1,3 +1,5 @@
+import struct
+
 import numpy as np
 
 
@@ -28,3 +30,162 @@ def load_npy(file_path, frames=[]):
         array = np.load(file_path + '.npy', mmap_mode='r')[frames]
 
     return array
+
+
+#: Length of header reserved at the start of streamed npy files,
+#: so that the header can be rewritten once the final shape is known
+NPY_HEADER_LENGTH = 256
+
+
+def npy_header(shape, dtype, length=NPY_HEADER_LENGTH):
+    """
+    Returns npy file header (version 1.0) for an array of given shape
+    and dtype, padded to length bytes
+
+    Parameters
+    ----------
+    shape:  int, tuple
+        Shape of array
+    dtype:  numpy.dtype
+        Data type of array
+    length:  int (optional)
+        Total length of header in bytes, a multiple of 64
+
+    Returns
+    -------
+    header:  bytes
+        Header to be written at the start of npy file
+    """
+
+    header = (
+        "{{'descr': {!r}, 'fortran_order': False, 'shape': {!r}, }}".format(
+            np.lib.format.dtype_to_descr(np.dtype(dtype)), tuple(shape)))
+
+    # Magic string, version and header length occupy 10 bytes
+    if len(header) + 11 > length:
+        raise ValueError(
+            'Header for shape {} exceeds {} bytes'.format(shape, length))
+    header = header.ljust(length - 11) + '\n'
+
+    return (np.lib.format.magic(1, 0)
+            + struct.pack('<H', len(header))
+            + header.encode('latin1'))
+
+
+class NpyFrameWriter:
+    """Streams frames of a trajectory into a npy file on disk, without
+    holding the whole trajectory in memory.
+
+    Frames are written through a memory map of the file, which is
+    preallocated for n_frames frames if known, and otherwise extended
+    as frames are written. The npy header records the number of frames
+    written when the writer is closed, after which the file can be
+    read with `load_npy` or `numpy.load`.
+
+    Can be used as a context manager:
+
+        with NpyFrameWriter(file_path, (nmol, 3), nframe) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+    """
+
+    def __init__(self, file_path, frame_shape, n_frames=None,
+                 dtype=np.float64, grow=1024):
+        """
+        Parameters
+        ----------
+        file_path:  str
+            Path name of npy file, without extension
+        frame_shape:  int, tuple
+            Shape of each frame
+        n_frames:  int (optional)
+            Expected number of frames, used to preallocate file
+        dtype:  numpy.dtype (optional)
+            Data type of array
+        grow:  int (optional)
+            Minimum number of frames to extend file by when full
+        """
+
+        self.file_path = file_path + '.npy'
+        self.frame_shape = tuple(frame_shape)
+        self.dtype = np.dtype(dtype)
+        self.grow = grow
+
+        self.n_frames = 0
+        self._capacity = 0
+        self._memmap = None
+
+        self._file = open(self.file_path, 'wb+')
+        self._file.write(npy_header(
+            (0,) + self.frame_shape, self.dtype))
+        self._reserve(n_frames or grow)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def frame_bytes(self):
+        return int(np.prod(self.frame_shape)) * self.dtype.itemsize
+
+    def _reserve(self, capacity):
+        """Extend file to hold capacity frames and remap"""
+
+        if self._memmap is not None:
+            self._memmap.flush()
+            self._memmap = None
+
+        self._file.truncate(
+            NPY_HEADER_LENGTH + capacity * self.frame_bytes)
+        self._capacity = capacity
+
+        if capacity * self.frame_bytes > 0:
+            self._memmap = np.memmap(
+                self._file, dtype=self.dtype, mode='r+',
+                offset=NPY_HEADER_LENGTH,
+                shape=(capacity,) + self.frame_shape)
+
+    def write(self, frames):
+        """
+        Append frames to file
+
+        Parameters
+        ----------
+        frames:  array_like; shape=(n, *frame_shape)
+            Frames to append
+        """
+
+        frames = np.asarray(frames)
+        if frames.shape[1:] != self.frame_shape:
+            raise ValueError(
+                'Frames of shape {} do not match frame shape {}'.format(
+                    frames.shape[1:], self.frame_shape))
+
+        end = self.n_frames + frames.shape[0]
+        if end > self._capacity:
+            self._reserve(max(end, self._capacity + self.grow,
+                              2 * self._capacity))
+
+        if frames.shape[0] > 0:
+            self._memmap[self.n_frames:end] = frames
+        self.n_frames = end
+
+    def close(self):
+        """Record number of frames written in header, remove any
+        unused space and close file"""
+
+        if self._file.closed:
+            return
+
+        if self._memmap is not None:
+            self._memmap.flush()
+            self._memmap = None
+
+        self._file.truncate(
+            NPY_HEADER_LENGTH + self.n_frames * self.frame_bytes)
+        self._file.seek(0)
+        self._file.write(npy_header(
+            (self.n_frames,) + self.frame_shape, self.dtype))
+        self._file.close()
@@ -5,8 +5,10 @@ import tables
 import numpy as np
 
 from alias.io.hdf5_io import (
-    make_hdf5, load_hdf5, save_hdf5, shape_check_hdf5)
-from alias.io.numpy_io import load_npy
+    make_hdf5, load_hdf5, save_hdf5, shape_check_hdf5,
+    frame_chunkshape, AliasStore, storage_atom, storage_filters,
+    quantise_array)
+from alias.io.numpy_io import load_npy, NpyFrameWriter
 from alias.io.checkfile_io import (
     make_checkfile, load_checkfile, update_checkfile)
 
@@ -46,6 +48,31 @@ class TestIO(TestCase):
 
             self.assertTrue(np.allclose(new_test_data, load_data))
 
+    def test_npy_frame_writer(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = tmp_dir + '/test'
+            test_data = self.test_data.reshape(10, 5)
+
+            # Preallocated for fewer frames than written
+            with NpyFrameWriter(file_path, (5,), 3, grow=2) as writer:
+                for index in range(0, 10, 3):
+                    writer.write(test_data[index:index + 3])
+
+            self.assertEqual(10, writer.n_frames)
+            load_data = load_npy(file_path)
+            self.assertEqual((10, 5), load_data.shape)
+            self.assertTrue(np.allclose(test_data, load_data))
+
+            # Unused preallocated space is removed on closing
+            with NpyFrameWriter(file_path, (5,), 200) as writer:
+                writer.write(test_data[:4])
+            self.assertTrue(
+                np.allclose(test_data[:4], load_npy(file_path)))
+
+            with NpyFrameWriter(file_path, (5,), 3) as writer:
+                with self.assertRaises(ValueError):
+                    writer.write(test_data.reshape(5, 10))
+
     def test_load_save_hdf5(self):
         with tempfile.NamedTemporaryFile() as tmp_file:
             make_hdf5(tmp_file.name, self.test_data.shape, tables.Int64Atom())
@@ -65,3 +92,155 @@ class TestIO(TestCase):
             load_data = load_hdf5(tmp_file.name, 0)
 
             self.assertTrue(np.allclose(new_test_data, load_data))
+
+    def test_frame_chunkshape(self):
+
+        self.assertEqual(
+            (1, 2, 100000),
+            frame_chunkshape((2, 100000), tables.Float64Atom()))
+        self.assertEqual(
+            (2**20 // 400, 50),
+            frame_chunkshape((50,), tables.Float64Atom()))
+        self.assertEqual(
+            (10, 50),
+            frame_chunkshape((50,), tables.Float64Atom(), max_frames=10))
+
+    def test_alias_store(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = tmp_dir + '/test'
+
+            with AliasStore(batch_size=3) as store:
+                store.create(file_path, self.test_data.shape,
+                             tables.Int64Atom())
+
+                for frame in range(4):
+                    self.assertEqual('a', store.mode(file_path, frame))
+                    store.save(
+                        file_path, self.test_data + frame, frame,
+                        store.mode(file_path, frame))
+
+                self.assertFalse(store.mode(file_path, 2))
+                self.assertEqual('r+', store.mode(file_path, 2, ow=True))
+                self.assertListEqual(
+                    [True] * 4 + [False], store.done(file_path, 5).tolist())
+                self.assertEqual((4, 50), store.shape(file_path))
+
+                # First batch is written to disk, last frame is buffered
+                self.assertEqual(3, store._dataset(file_path).nrows)
+                self.assertTrue(np.allclose(
+                    self.test_data + 3, store.load(file_path, 3)))
+
+                store.save(file_path, self.test_data, 3, 'r+')
+                store.save(file_path, self.test_data, 1, 'r+')
+
+            load_data = load_hdf5(file_path)
+            self.assertEqual((4, 50), load_data.shape)
+            self.assertTrue(np.allclose(self.test_data, load_data[1]))
+            self.assertTrue(np.allclose(self.test_data + 2, load_data[2]))
+            self.assertTrue(np.allclose(self.test_data, load_data[3]))
+
+            # Frames are reloaded from disk in a new session
+            with AliasStore() as store:
+                self.assertEqual(4, store.n_frames(file_path))
+                self.assertTrue(np.allclose(
+                    self.test_data, store.load(file_path, 1)))
+
+    def test_alias_store_groups(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = tmp_dir + '/test'
+
+            with AliasStore() as store:
+                self.assertIsNone(store.find_group(file_path, qm=2))
+
+                group_1 = store.parameter_group(
+                    file_path, qm=2, phi=1E-8, recon=False, q_max=None)
+                group_2 = store.parameter_group(
+                    file_path, qm=2, phi=1E-8, recon=True)
+
+                self.assertNotEqual(group_1, group_2)
+                self.assertEqual(
+                    group_1,
+                    store.find_group(file_path, qm=2, phi=1E-8, recon=False))
+                self.assertIsNone(store.find_group(file_path, qm=2))
+
+                node = group_1 + '/data'
+                store.create(file_path, self.test_data.shape,
+                             tables.Int64Atom(), node=node,
+                             attrs={'nslice': 10})
+                store.save(file_path, self.test_data, 0, node=node)
+
+                self.assertTrue(store.exists(file_path, node))
+                self.assertFalse(store.exists(file_path, group_2 + '/data'))
+                self.assertDictEqual(
+                    {'nslice': 10}, store.attrs(file_path, node))
+                self.assertEqual(1, store.n_frames(file_path, node))
+
+            load_data = load_hdf5(file_path, 0, node=node)
+            self.assertTrue(np.allclose(self.test_data, load_data))
+
+            with AliasStore() as store:
+                store.remove(file_path, group_1)
+                self.assertFalse(store.exists(file_path, node))
+                self.assertIsNone(
+                    store.find_group(file_path, qm=2, phi=1E-8, recon=False))
+
+            # Removing a group leaves groups sharing its name as a
+            # prefix, and their buffered frames, intact
+            with AliasStore(batch_size=3) as store:
+                store.create(file_path, self.test_data.shape,
+                             tables.Int64Atom(), node='/parameters_1/data')
+                store.create(file_path, self.test_data.shape,
+                             tables.Int64Atom(), node='/parameters_10/coeff')
+                store.save(file_path, self.test_data, 0,
+                           node='/parameters_10/coeff')
+                store.remove(file_path, '/parameters_1')
+                self.assertEqual(
+                    1, store.n_frames(file_path, '/parameters_10/coeff'))
+
+            with AliasStore() as store:
+                self.assertFalse(store.exists(file_path, '/parameters_1'))
+                self.assertEqual(
+                    1, store.n_frames(file_path, '/parameters_10/coeff'))
+
+    def test_quantise_array(self):
+
+        array = np.linspace(-5, 5, 101) * np.pi
+        quantised = quantise_array(array, 2E-3)
+
+        self.assertEqual(np.int16, quantised.dtype)
+        self.assertTrue(np.all(np.abs(quantised * 2E-3 - array) <= 1E-3))
+
+        with self.assertRaises(ValueError):
+            quantise_array(array * 1E4, 2E-3)
+
+    def test_storage(self):
+
+        self.assertIsInstance(storage_atom('float32'), tables.Float32Atom)
+        self.assertIsNone(storage_filters())
+        self.assertEqual('zlib', storage_filters('zlib').complib)
+        with self.assertRaises(ValueError):
+            storage_atom('float16')
+
+        data = np.sin(np.arange(200.)).reshape(2, 100) * 20
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = tmp_dir + '/test'
+
+            with AliasStore() as store:
+                store.create(
+                    file_path, data.shape, storage_atom('int16'),
+                    node='/group/data', attrs={'scale_factor': 2E-3},
+                    filters=storage_filters('zlib'))
+                store.save(file_path, data, 0, node='/group/data')
+                store.save(file_path, data, 1, node='/group/data')
+                store.save(file_path, -data, 1, 'r+', node='/group/data')
+
+                # Buffered frames are loaded as floating point values
+                self.assertTrue(np.allclose(
+                    data, store.load(file_path, 0, node='/group/data'),
+                    atol=1E-3))
+
+            for frame, sign in enumerate([1, -1]):
+                load_data = load_hdf5(file_path, frame, node='/group/data')
+                self.assertTrue(
+                    np.all(np.abs(sign * data - load_data) <= 1E-3))
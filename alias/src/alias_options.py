@@ -2,7 +2,9 @@ class AliasOptions:
 
     def __init__(self, ow_coeff=False, ow_recon=False,
                  ow_pos=False, ow_intpos=False, ow_hist=False,
-                 ow_dist=False):
+                 ow_dist=False, jobs=1, warm_start=False,
+                 assembly='auto', solver='auto', incremental=False,
+                 coarse_to_fine=False):
 
         self.ow_coeff = ow_coeff
         self.ow_recon = ow_recon
@@ -14,3 +16,9 @@ class AliasOptions:
             ow_dist = True
 
         self.ow_dist = ow_dist
+        self.jobs = jobs
+        self.warm_start = warm_start
+        self.assembly = assembly
+        self.solver = solver
+        self.incremental = incremental
+        self.coarse_to_fine = coarse_to_fine
@@ -0,0 +1,244 @@
+import numpy as np
+
+
+def wrapped_offsets(n_cells):
+    """Returns unique offsets to adjacent cells along a periodic
+    axis containing n_cells cells"""
+    return np.unique(np.array([-1, 0, 1]) % n_cells)
+
+
+class CellList:
+    """Bins molecular positions into a periodic grid of cells, each
+    with sides no smaller than a cutoff radius, so that all neighbours
+    of a position within the cutoff lie in its own or adjacent cells.
+
+    Distances are measured under minimum image conventions along x
+    and y only, as in the surface routines. Positions along z are
+    binned periodically, so that a molecule keeps its cell when
+    shifted by a cell length in z, but separations along z are not
+    wrapped. Coordinates are read from the arrays supplied, so
+    changes made to them in place after construction are respected,
+    provided each molecule remains in the same periodic cell.
+    """
+
+    def __init__(self, xmol, ymol, zmol, dim, cutoff, indices=None):
+        """
+        Parameters
+        ----------
+        xmol:  float, array_like; shape=(nmol)
+            Molecular coordinates in x dimension
+        ymol:  float, array_like; shape=(nmol)
+            Molecular coordinates in y dimension
+        zmol:  float, array_like; shape=(nmol)
+            Molecular coordinates in z dimension
+        dim:  float, array_like; shape=(3)
+            XYZ dimensions of simulation cell
+        cutoff:  float
+            Maximum radius of neighbour searches
+        indices:  int, array_like, optional
+            Indices of molecules to bin (default=all)
+        """
+        self.xmol = np.asarray(xmol)
+        self.ymol = np.asarray(ymol)
+        self.zmol = np.asarray(zmol)
+        self.dim = np.asarray(dim, dtype=float)[:3]
+        self.cutoff = cutoff
+
+        if indices is None:
+            indices = np.arange(self.xmol.size)
+        self.indices = np.asarray(indices, dtype=int)
+
+        self.n_cells = np.maximum(
+            np.array(self.dim // cutoff, dtype=int), 1)
+        self.cell_size = self.dim / self.n_cells
+
+        cells = self.cell_coords(
+            self.xmol[self.indices], self.ymol[self.indices],
+            self.zmol[self.indices])
+        self.cell_index = np.ravel_multi_index(cells, self.n_cells)
+
+        # Sort molecules by cell, recording start of each cell
+        self.order = np.argsort(self.cell_index, kind='stable')
+        self.cell_count = np.bincount(
+            self.cell_index, minlength=np.prod(self.n_cells))
+        self.cell_start = np.concatenate(
+            ([0], np.cumsum(self.cell_count)))
+
+        # Unique offsets to all adjacent cells, including each cell
+        self.offsets = np.array(np.meshgrid(
+            *[wrapped_offsets(n) for n in self.n_cells],
+            indexing='ij')).reshape(3, -1)
+
+        self._candidates = {}
+
+    def cell_coords(self, x, y, z):
+        """Returns coordinates of periodic cells containing each
+        position"""
+        positions = np.stack((x, y, z)).reshape(3, -1)
+        cells = np.array(
+            np.floor(positions / self.cell_size[:, None]), dtype=int)
+        return cells % self.n_cells[:, None]
+
+    def local_candidates(self, x, y, z):
+        """Returns positions within indices of binned molecules lying
+        in cells adjacent to position (x, y, z)"""
+        cell = [
+            int(np.floor(position / size)) % n_cells
+            for position, size, n_cells in zip(
+                (x, y, z), self.cell_size, self.n_cells)
+        ]
+        key = np.ravel_multi_index(cell, self.n_cells)
+
+        if key not in self._candidates:
+            neighbours = np.ravel_multi_index(
+                (np.array(cell)[:, None] + self.offsets)
+                % self.n_cells[:, None],
+                self.n_cells)
+            self._candidates[key] = np.concatenate([
+                self.order[self.cell_start[index]:self.cell_start[index + 1]]
+                for index in neighbours
+            ])
+
+        return self._candidates[key]
+
+    def candidates(self, x, y, z):
+        """
+        Returns indices of binned molecules lying in cells adjacent to
+        position (x, y, z), a superset of those within the cutoff
+
+        Parameters
+        ----------
+        x, y, z:  float
+            Coordinates of query position
+
+        Returns
+        -------
+        candidates:  int, array_like
+            Indices of molecules in position arrays
+        """
+        return self.indices[self.local_candidates(x, y, z)]
+
+    def separations_squared(self, x, y, z, candidates):
+        """Returns squared separations between position (x, y, z) and
+        candidate molecules, with minimum image conventions along x
+        and y"""
+        dx = self.xmol[candidates] - x
+        dx -= self.dim[0] * np.rint(dx / self.dim[0])
+        dy = self.ymol[candidates] - y
+        dy -= self.dim[1] * np.rint(dy / self.dim[1])
+        dz = self.zmol[candidates] - z
+
+        return dx * dx + dy * dy + dz * dz
+
+    def neighbours(self, x, y, z, radius=None):
+        """
+        Returns binned molecules within radius of position (x, y, z)
+
+        Parameters
+        ----------
+        x, y, z:  float
+            Coordinates of query position
+        radius:  float, optional
+            Radius of search, no greater than cutoff (default=cutoff)
+
+        Returns
+        -------
+        neighbours:  int, array_like
+            Positions of neighbouring molecules within indices
+        """
+        if radius is None:
+            radius = self.cutoff
+
+        local = self.local_candidates(x, y, z)
+        dr2 = self.separations_squared(x, y, z, self.indices[local])
+
+        return local[dr2 < radius**2]
+
+    def minimum_image(self, dxyz):
+        """Applies minimum image convention along x and y to the last
+        axis of separation array dxyz"""
+        dxyz[..., :2] -= self.dim[:2] * np.rint(dxyz[..., :2] / self.dim[:2])
+        return dxyz
+
+    def neighbour_count(self, x, y, z, radius=None):
+        """
+        Returns number of binned molecules within radius of
+        position (x, y, z)
+
+        Parameters
+        ----------
+        x, y, z:  float
+            Coordinates of query position
+        radius:  float, optional
+            Radius of search, no greater than cutoff (default=cutoff)
+
+        Returns
+        -------
+        count:  int
+            Number of molecules within radius
+        """
+        if radius is None:
+            radius = self.cutoff
+
+        dr2 = self.separations_squared(
+            x, y, z, self.candidates(x, y, z))
+
+        return np.count_nonzero(dr2 < radius**2)
+
+    def neighbour_counts(self, radius=None, x=None, y=None, z=None):
+        """
+        Returns number of binned molecules within radius of each
+        query position, by default each binned molecule (including
+        itself)
+
+        Parameters
+        ----------
+        radius:  float, optional
+            Radius of search, no greater than cutoff (default=cutoff)
+        x, y, z:  float, array_like; shape=(n_query), optional
+            Coordinates of query positions (default=binned molecules)
+
+        Returns
+        -------
+        counts:  int, array_like; shape=(n_query)
+            Number of neighbours of each query position
+        """
+        if radius is None:
+            radius = self.cutoff
+
+        positions = np.stack((
+            self.xmol[self.indices],
+            self.ymol[self.indices],
+            self.zmol[self.indices]), axis=-1)
+
+        if x is None:
+            queries = positions
+            cells = np.array(np.unravel_index(self.cell_index, self.n_cells))
+        else:
+            queries = np.stack(
+                (np.ravel(x), np.ravel(y), np.ravel(z)), axis=-1)
+            cells = self.cell_coords(*queries.T)
+
+        n_query = queries.shape[0]
+        counts = np.zeros(n_query, dtype=int)
+
+        for offset in self.offsets.T:
+            # Pair each query with every molecule in adjacent cell
+            neighbour = np.ravel_multi_index(
+                (cells + offset[:, None]) % self.n_cells[:, None],
+                self.n_cells)
+            n_pairs = self.cell_count[neighbour]
+            first = np.repeat(np.cumsum(n_pairs) - n_pairs, n_pairs)
+
+            local_i = np.repeat(np.arange(n_query), n_pairs)
+            local_j = self.order[
+                np.repeat(self.cell_start[neighbour], n_pairs)
+                + np.arange(local_i.size) - first]
+
+            dxyz = self.minimum_image(
+                positions[local_j] - queries[local_i])
+            within = np.sum(dxyz**2, axis=1) < radius**2
+
+            counts += np.bincount(local_i[within], minlength=n_query)
+
+        return counts
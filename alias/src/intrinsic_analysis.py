@@ -17,30 +17,49 @@ import tables
 
 import numpy as np
 
-from alias.io.hdf5_io import (
-    make_hdf5,
-    load_hdf5,
-    save_hdf5,
-    shape_check_hdf5,
-    frame_check_hdf5,
-    mode_check_hdf5
-)
+from alias.io.hdf5_io import AliasStore, storage_atom, storage_filters
 from alias.io.numpy_io import load_npy
 from alias.src.conversions import coeff_to_fourier_2
-from alias.src.wave_function import (
-    wave_function,
-    d_wave_function,
-    dd_wave_function
-)
+from alias.src.intrinsic_surface import SurfaceEvaluator
 
-from .utilities import unit_vector, create_file_name
+from .utilities import (
+    unit_vector, create_file_name, create_results_file_path,
+    results_parameters)
 
 
-def make_pos_dxdy(xmol, ymol, coeff, nmol, dim, qm):
+def _equal_attrs(attrs, expected):
+    """Returns whether attrs contain expected values"""
+    return all(
+        name in attrs and np.array_equal(attrs[name], value)
+        for name, value in expected.items())
+
+
+def _resolution_list(qu_list, qm):
+    """Returns sorted unique resolutions in qu_list (default=0..qm),
+    raising ValueError if any lie outside 0..qm"""
+
+    if qu_list is None:
+        qu_list = range(qm + 1)
+    qu_list = np.unique(qu_list)
+
+    if qu_list.size and (qu_list[0] < 0 or qu_list[-1] > qm):
+        raise ValueError(
+            'Resolutions {} not within range 0..{}'.format(
+                qu_list.tolist(), qm))
+
+    return qu_list
+
+
+def make_pos_dxdy(xmol, ymol, coeff, nmol, dim, qm, qu_list=None):
     """
     Calculate distances and derivatives at each molecular position with
     respect to intrinsic surface
 
+    The wave basis is evaluated once for every molecule. Contributions
+    of each frequency shell (or band of shells between consecutive
+    values of qu_list) are then obtained as masked matrix products,
+    and all cumulative resolutions are produced by a prefix sum.
+
     Parameters
     ----------
 
@@ -48,7 +67,7 @@ def make_pos_dxdy(xmol, ymol, coeff, nmol, dim, qm):
         Molecular coordinates in x dimension
     ymol:  float, array_like; shape=(nmol)
         Molecular coordinates in y dimension
-    coeff:	float, array_like; shape=(n_waves**2)
+    coeff:	float, array_like; shape=(2, n_waves**2)
         Optimised surface coefficients
     nmol:  int
         Number of molecules in simulation
@@ -57,96 +76,76 @@ def make_pos_dxdy(xmol, ymol, coeff, nmol, dim, qm):
     qm:  int
         Maximum number of wave frequencies in Fourier Sum
         representing intrinsic surface
+    qu_list:  int, array_like, optional
+        Resolutions qu to return, each within 0..qm (default=0..qm)
 
     Returns
     -------
 
-    int_z_mol:  array_like (float); shape=(nframe, 2, qm+1, nmol)
+    int_z_mol:  array_like (float); shape=(2, n_qu, nmol)
         Molecular distances from intrinsic surface
-    int_dxdy_mol:  array_like (float); shape=(nframe, 4, qm+1, nmol)
+    int_dxdy_mol:  array_like (float); shape=(4, n_qu, nmol)
         First derivatives of intrinsic surface wrt x and y at xmol, ymol
-    int_ddxddy_mol:  array_like (float); shape=(nframe, 4, qm+1, nmol)
+    int_ddxddy_mol:  array_like (float); shape=(4, n_qu, nmol)
         Second derivatives of intrinsic surface wrt x and y at xmol, ymol
 
     """
 
-    int_z_mol = np.zeros((qm+1, 2, nmol))
-    int_dxdy_mol = np.zeros((qm+1, 4, nmol))
-    int_ddxddy_mol = np.zeros((qm+1, 4, nmol))
+    qu_list = _resolution_list(qu_list, qm)
 
-    tmp_int_z_mol = np.zeros((2, nmol))
-    tmp_dxdy_mol = np.zeros((4, nmol))
-    tmp_ddxddy_mol = np.zeros((4, nmol))
+    n_waves = 2 * qm + 1
+    n_qu = qu_list.size
 
-    for qu in range(qm+1):
+    u_mat, v_mat = np.meshgrid(
+        np.arange(-qm, qm + 1), np.arange(-qm, qm + 1), indexing='ij')
+    shell = np.maximum(np.abs(u_mat), np.abs(v_mat))
 
-        if qu == 0:
-            j = (2 * qm + 1) * qm + qm
-            f_x = wave_function(xmol, 0, dim[0])
-            f_y = wave_function(ymol, 0, dim[1])
+    evaluator = SurfaceEvaluator(xmol, ymol, qm, dim)
 
-            tmp_int_z_mol[0] += f_x * f_y * coeff[0][j]
-            tmp_int_z_mol[1] += f_x * f_y * coeff[1][j]
+    int_z_mol = np.zeros((2, n_qu, nmol))
+    int_dxdy_mol = np.zeros((4, n_qu, nmol))
+    int_ddxddy_mol = np.zeros((4, n_qu, nmol))
 
-        else:
-            for u in [-qu, qu]:
-                for v in range(-qu, qu+1):
-                    j = (2 * qm + 1) * (u + qm) + (v + qm)
-
-                    f_x = wave_function(xmol, u, dim[0])
-                    f_y = wave_function(ymol, v, dim[1])
-                    df_dx = d_wave_function(xmol, u, dim[0])
-                    df_dy = d_wave_function(ymol, v, dim[1])
-                    ddf_ddx = dd_wave_function(xmol, u, dim[0])
-                    ddf_ddy = dd_wave_function(ymol, v, dim[1])
-
-                    tmp_int_z_mol[0] += f_x * f_y * coeff[0][j]
-                    tmp_int_z_mol[1] += f_x * f_y * coeff[1][j]
-                    tmp_dxdy_mol[0] += df_dx * f_y * coeff[0][j]
-                    tmp_dxdy_mol[1] += f_x * df_dy * coeff[0][j]
-                    tmp_dxdy_mol[2] += df_dx * f_y * coeff[1][j]
-                    tmp_dxdy_mol[3] += f_x * df_dy * coeff[1][j]
-                    tmp_ddxddy_mol[0] += ddf_ddx * f_y * coeff[0][j]
-                    tmp_ddxddy_mol[1] += f_x * ddf_ddy * coeff[0][j]
-                    tmp_ddxddy_mol[2] += ddf_ddx * f_y * coeff[1][j]
-                    tmp_ddxddy_mol[3] += f_x * ddf_ddy * coeff[1][j]
-
-            for u in range(-qu+1, qu):
-                for v in [-qu, qu]:
-                    j = (2 * qm + 1) * (u + qm) + (v + qm)
-
-                    f_x = wave_function(xmol, u, dim[0])
-                    f_y = wave_function(ymol, v, dim[1])
-                    df_dx = d_wave_function(xmol, u, dim[0])
-                    df_dy = d_wave_function(ymol, v, dim[1])
-                    ddf_ddx = dd_wave_function(xmol, u, dim[0])
-                    ddf_ddy = dd_wave_function(ymol, v, dim[1])
-
-                    tmp_int_z_mol[0] += f_x * f_y * coeff[0][j]
-                    tmp_int_z_mol[1] += f_x * f_y * coeff[1][j]
-                    tmp_dxdy_mol[0] += df_dx * f_y * coeff[0][j]
-                    tmp_dxdy_mol[1] += f_x * df_dy * coeff[0][j]
-                    tmp_dxdy_mol[2] += df_dx * f_y * coeff[1][j]
-                    tmp_dxdy_mol[3] += f_x * df_dy * coeff[1][j]
-                    tmp_ddxddy_mol[0] += ddf_ddx * f_y * coeff[0][j]
-                    tmp_ddxddy_mol[1] += f_x * ddf_ddy * coeff[0][j]
-                    tmp_ddxddy_mol[2] += ddf_ddx * f_y * coeff[1][j]
-                    tmp_ddxddy_mol[3] += f_x * ddf_ddy * coeff[1][j]
-
-        int_z_mol[qu] += tmp_int_z_mol
-        int_dxdy_mol[qu] += tmp_dxdy_mol
-        int_ddxddy_mol[qu] += tmp_ddxddy_mol
-
-    int_z_mol = np.swapaxes(int_z_mol, 0, 1)
-    int_dxdy_mol = np.swapaxes(int_dxdy_mol, 0, 1)
-    int_ddxddy_mol = np.swapaxes(int_ddxddy_mol, 0, 1)
+    lower = -1
+    for index, qu in enumerate(qu_list):
+
+        select = slice(qm - qu, qm + qu + 1)
+        band = (shell[select, select] > lower)
+        lower = qu
+
+        f_x = [evaluator.wave_table(0, order)[:, select]
+               for order in range(3)]
+        f_y = [evaluator.wave_table(1, order)[:, select]
+               for order in range(3)]
+
+        for surf in range(2):
+            coeff_matrix = np.reshape(
+                coeff[surf], (n_waves, n_waves))[select, select] * band
+
+            g_y = [np.dot(f, coeff_matrix.T) for f in f_y]
+
+            int_z_mol[surf, index] = np.sum(f_x[0] * g_y[0], axis=1)
+            int_dxdy_mol[2 * surf, index] = np.sum(
+                f_x[1] * g_y[0], axis=1)
+            int_dxdy_mol[2 * surf + 1, index] = np.sum(
+                f_x[0] * g_y[1], axis=1)
+            int_ddxddy_mol[2 * surf, index] = np.sum(
+                f_x[2] * g_y[0], axis=1)
+            int_ddxddy_mol[2 * surf + 1, index] = np.sum(
+                f_x[0] * g_y[2], axis=1)
+
+    # Accumulate shell contributions into each resolution
+    int_z_mol = np.cumsum(int_z_mol, axis=1)
+    int_dxdy_mol = np.cumsum(int_dxdy_mol, axis=1)
+    int_ddxddy_mol = np.cumsum(int_ddxddy_mol, axis=1)
 
     return int_z_mol, int_dxdy_mol, int_ddxddy_mol
 
 
 def create_intrinsic_positions_dxdyz(
         directory, file_name, nmol, nframe, qm, n0,
-        phi, dim, recon=0, ow_pos=False):
+        phi, dim, recon=0, ow_pos=False, q_max=None,
+        dtype='float64', precision=1E-3, complib=None, qu_list=None):
     """
     Calculate distances and derivatives at each molecular position
     with respect to intrinsic surface in simulation frame
@@ -176,59 +175,80 @@ def create_intrinsic_positions_dxdyz(
         Whether to use surface reconstructe coefficients
     ow_pos:  bool (default=False)
         Whether to overwrite positions and derivatives (default=False)
+    q_max: float (optional)
+        Maximum wave vector magnitude |q| of waves included in
+        surfaces (default=all waves up to qm)
+    dtype:  str (optional)
+        Storage type of positions and derivatives: 'float64',
+        'float32' or 'int16'. Values stored as 'int16' are quantised
+        to within precision, see `quantise_array` (default='float64')
+    precision:  float (optional)
+        Maximum error of values stored as 'int16' (default=1E-3).
+        Surface derivatives in int_dxdy_mol and int_ddxddy_mol must
+        lie within +/- 32767 * 2 * precision. Surface positions in
+        int_z_mol may lie anywhere within +/- dim[2], and are stored
+        to within dim[2] / 65534 instead if this is larger than
+        precision
+    complib:  str (optional)
+        Compression library used to store positions and derivatives,
+        see `storage_filters` (default=no compression)
+    qu_list:  int, array_like, optional
+        Resolutions qu to store, each within 0..qm (default=0..qm)
 
     """
 
     print("\n--- Running Intrinsic Positions and Derivatives Routine ---\n")
 
-    surf_dir = os.path.join(directory, 'surface')
     pos_dir = os.path.join(directory, 'pos')
-    intpos_dir = os.path.join(directory, 'intpos')
-    if not os.path.exists(intpos_dir):
-        os.mkdir(intpos_dir)
-
-    file_name_pos = create_file_name(
-        [file_name, qm, n0, int(1/phi + 0.5), nframe]
-    )
-    file_name_coeff = file_name_pos
+    results_file = create_results_file_path(file_name, directory)
+
+    qu_list = _resolution_list(qu_list, qm)
+    n_qu = qu_list.size
+
+    shapes = {
+        'int_z_mol': (2, n_qu, nmol),
+        'int_dxdy_mol': (4, n_qu, nmol),
+        'int_ddxddy_mol': (4, n_qu, nmol)
+    }
+
+    attrs = {name: {'qu_list': qu_list, 'dtype': dtype} for name in shapes}
+    if dtype == 'int16':
+        for name in shapes:
+            attrs[name]['scale_factor'] = 2 * precision
+        attrs['int_z_mol']['scale_factor'] = max(
+            2 * precision, dim[2] / np.iinfo(np.int16).max)
+
+    with AliasStore() as store:
+        group = store.parameter_group(
+            results_file, **results_parameters(qm, n0, phi, recon, q_max))
+        nodes = [group + '/' + name for name in shapes]
+
+        # Datasets stored with different resolutions, type or
+        # precision to those requested are replaced
+        if not all(
+                store.exists(results_file, node)
+                and _equal_attrs(store.attrs(results_file, node),
+                                 attrs[name])
+                for name, node in zip(shapes, nodes)):
+            for name, node in zip(shapes, nodes):
+                store.create(results_file, shapes[name],
+                             storage_atom(dtype), nframe, node=node,
+                             attrs=attrs[name],
+                             filters=storage_filters(complib))
+            file_check = False
 
-    if recon:
-        file_name_coeff += '_r'
-        file_name_pos += '_r'
-
-    intpos_data_file = os.path.join(intpos_dir + file_name_pos)
-
-    if not os.path.exists(intpos_data_file + "_int_z_mol.hdf5"):
-        make_hdf5(
-            intpos_data_file + '_int_z_mol',
-            (2, qm+1, nmol), tables.Float64Atom())
-        make_hdf5(
-            intpos_data_file + '_int_dxdy_mol',
-            (4, qm+1, nmol), tables.Float64Atom())
-        make_hdf5(
-            intpos_data_file + '_int_ddxddy_mol',
-            (4, qm+1, nmol), tables.Float64Atom())
-        file_check = False
-
-    elif not ow_pos:
-        "Checking number of frames in current distance files"
-        try:
-            file_check = shape_check_hdf5(
-                intpos_data_file + '_int_z_mol',
-                (nframe, 2, qm+1, nmol))
-            file_check *= shape_check_hdf5(
-                intpos_data_file + '_int_dxdy_mol',
-                (nframe, 4, qm+1, nmol))
-            file_check *= shape_check_hdf5(
-                intpos_data_file + '_int_ddxddy_mol',
-                (nframe, 4, qm+1, nmol))
-        except FileNotFoundError:
+        elif not ow_pos:
+            "Checking number of frames in current distance datasets"
+            file_check = all(
+                store.n_frames(results_file, node) >= nframe
+                for node in nodes)
+        else:
             file_check = False
-    else:
-        file_check = False
 
-    pos_data_file = os.path.join(pos_dir + file_name)
-    if not file_check:
+        if file_check:
+            return
+
+        pos_data_file = os.path.join(pos_dir + file_name)
         xmol = load_npy(
             pos_data_file + f'_{nframe}_xmol',
             frames=range(nframe))
@@ -238,40 +258,26 @@ def create_intrinsic_positions_dxdyz(
 
         for frame in range(nframe):
 
-            "Checking number of frames in int_z_mol file"
-            frame_check_int_z_mol = frame_check_hdf5(
-                intpos_data_file + '_int_z_mol', frame)
-            frame_check_int_dxdy_mol = frame_check_hdf5(
-                intpos_data_file + '_int_dxdy_mol', frame)
-            frame_check_int_ddxddy_mol = frame_check_hdf5(
-                intpos_data_file + '_int_ddxddy_mol', frame)
-
-            mode_int_z_mol = mode_check_hdf5(
-                frame_check_int_z_mol, ow_pos)
-            mode_int_dxdy_mol = mode_check_hdf5(
-                frame_check_int_dxdy_mol, ow_pos)
-            mode_int_ddxddy_mol = mode_check_hdf5(
-                frame_check_int_ddxddy_mol, ow_pos)
-
-            check = mode_int_z_mol or mode_int_dxdy_mol or mode_int_ddxddy_mol
-            if not check:
+            "Checking number of frames in int_z_mol dataset"
+            modes = [
+                store.mode(results_file, frame, ow_pos, node=node)
+                for node in nodes]
+
+            if any(modes):
                 sys.stdout.write(
                     "Calculating molecular distances "
                     f"and derivatives: frame {frame}\r"
                 )
                 sys.stdout.flush()
 
-                surf_data_file = os.path.join(surf_dir, file_name_coeff)
-                coeff = load_hdf5(surf_data_file + '_coeff', frame)
+                coeff = store.load(
+                    results_file, frame, node=group + '/coeff')
 
-                int_z_mol, int_dxdy_mol, int_ddxddy_mol = make_pos_dxdy(
-                    xmol[frame], ymol[frame], coeff, nmol, dim, qm)
-                save_hdf5(intpos_data_file + '_int_z_mol',
-                          int_z_mol, frame, mode_int_z_mol)
-                save_hdf5(intpos_data_file + '_int_dxdy_mol',
-                          int_dxdy_mol, frame, mode_int_dxdy_mol)
-                save_hdf5(intpos_data_file + '_int_ddxddy_mol',
-                          int_ddxddy_mol, frame, mode_int_ddxddy_mol)
+                arrays = make_pos_dxdy(
+                    xmol[frame], ymol[frame], coeff, nmol, dim, qm,
+                    qu_list=qu_list)
+                for node, array, mode in zip(nodes, arrays, modes):
+                    store.save(results_file, array, frame, mode, node=node)
 
 
 def make_int_mol_count(zmol, int_z_mol, nslice, qm, dim):
@@ -358,15 +364,17 @@ def den_curve_hist(zmol, int_z_mol, int_ddxddy_mol, nslice, nz, qm, dim,
     Returns
     -------
 
-    count_corr_array:  int, array_like; shape=(qm+1, nslice, nz)
+    count_corr_array:  int, array_like; shape=(n_qu, nslice, nz)
         Number histogram binned by molecular position along z axis and
-        mean curvature H across qm resolutions
+        mean curvature H across each resolution in int_z_mol (qm+1
+        unless a subset of resolutions is stored)
 
     """
 
-    count_corr_array = np.zeros((qm+1, nslice, nz))
+    n_qu = int_z_mol.shape[1]
+    count_corr_array = np.zeros((n_qu, nslice, nz))
 
-    for qu in range(qm+1):
+    for qu in range(n_qu):
 
         temp_count_corr_array = np.zeros((nslice, nz))
 
@@ -401,7 +409,8 @@ def den_curve_hist(zmol, int_z_mol, int_ddxddy_mol, nslice, nz, qm, dim,
 
 def create_intrinsic_den_curve_hist(directory, file_name, qm, n0, phi, nframe,
                                     nslice, dim,
-                                    nz=100, recon=False, ow_hist=False):
+                                    nz=100, recon=False, ow_hist=False,
+                                    q_max=None):
     """
     Calculate density and curvature histograms across surface
 
@@ -434,43 +443,46 @@ def create_intrinsic_den_curve_hist(directory, file_name, qm, n0, phi, nframe,
     ow_hist:  bool (optional)
         Whether to overwrite density and curvature distributions
         (default=False)
+    q_max: float (optional)
+        Maximum wave vector magnitude |q| of waves included in
+        surfaces (default=all waves up to qm)
     """
 
     print("\n--- Running Intrinsic Density and Curvature Routine --- \n")
 
     pos_dir = os.path.join(directory, 'pos')
-    intpos_dir = os.path.join(directory, 'intpos')
-    intden_dir = os.path.join(directory, 'intden')
-    if not os.path.exists(intden_dir):
-        os.mkdir(intden_dir)
 
-    file_name_pos = create_file_name(
-        [file_name, qm, n0, int(1./phi + 0.5), nframe])
-    file_name_hist = create_file_name(
-        [file_name, nslice, nz, qm, n0, int(1./phi + 0.5), nframe])
+    results_file = create_results_file_path(file_name, directory)
+
+    with AliasStore() as store:
+        group = store.parameter_group(
+            results_file, **results_parameters(qm, n0, phi, recon, q_max))
+        count_corr_node = group + '/count_corr'
+
+        # Histograms are made at each resolution of stored positions
+        qu_list = store.attrs(results_file, group + '/int_z_mol').get(
+            'qu_list', np.arange(qm + 1))
+        hist_attrs = {'nslice': nslice, 'nz': nz, 'qu_list': qu_list}
+
+        if (not store.exists(results_file, count_corr_node)
+                or not _equal_attrs(
+                    store.attrs(results_file, count_corr_node),
+                    hist_attrs)):
+            store.create(results_file, (qu_list.size, nslice, nz),
+                         tables.Float64Atom(), nframe,
+                         node=count_corr_node, attrs=hist_attrs)
+            file_check = False
 
-    if recon:
-        file_name_pos += '_r'
-        file_name_hist += '_r'
-
-    intden_data_file = os.path.join(intden_dir + file_name_hist)
-    if not os.path.exists(intden_data_file + '_count_corr.hdf5'):
-        make_hdf5(intden_data_file + '_count_corr',
-                  (qm+1, nslice, nz), tables.Float64Atom())
-        file_check = False
-
-    elif not ow_hist:
-        "Checking number of frames in current distribution files"
-        try:
-            file_check = shape_check_hdf5(
-                intden_data_file + '_count_corr', (nframe, qm+1, nslice, nz)
-            )
-        except FileNotFoundError:
+        elif not ow_hist:
+            "Checking number of frames in current distribution dataset"
+            file_check = (
+                store.n_frames(results_file, count_corr_node) >= nframe)
+        else:
             file_check = False
-    else:
-        file_check = False
 
-    if not file_check:
+        if file_check:
+            return
+
         pos_data_file = os.path.join(pos_dir + file_name)
         zmol = load_npy(pos_data_file + '_{}_zmol'.format(nframe))
         COM = load_npy(pos_data_file + '_{}_com'.format(nframe))
@@ -482,10 +494,8 @@ def create_intrinsic_den_curve_hist(directory, file_name, qm, n0, phi, nframe,
         for frame in range(nframe):
 
             "Checking number of frames in hdf5 files"
-            frame_check_count_corr = frame_check_hdf5(
-                intden_data_file + '_count_corr', frame)
-            mode_count_corr = mode_check_hdf5(
-                frame_check_count_corr, ow_hist)
+            mode_count_corr = store.mode(
+                results_file, frame, ow_hist, node=count_corr_node)
 
             if mode_count_corr:
                 sys.stdout.write(
@@ -493,24 +503,23 @@ def create_intrinsic_den_curve_hist(directory, file_name, qm, n0, phi, nframe,
                     "distributions: frame {}\r".format(frame))
                 sys.stdout.flush()
 
-                intpos_data_file = os.path.join(intpos_dir + file_name_pos)
-
-                int_z_mol = load_hdf5(
-                    intpos_data_file + '_int_z_mol', frame)
-                int_ddxddy_mol = load_hdf5(
-                    intpos_data_file + '_int_ddxddy_mol', frame)
+                int_z_mol = store.load(
+                    results_file, frame, node=group + '/int_z_mol')
+                int_ddxddy_mol = store.load(
+                    results_file, frame, node=group + '/int_ddxddy_mol')
 
                 count_corr_array = den_curve_hist(
                     zmol[frame], int_z_mol, int_ddxddy_mol,
                     nslice, nz, qm, dim)
-                save_hdf5(
-                    intden_data_file + '_count_corr',
-                    count_corr_array, frame, mode_count_corr)
+                store.save(
+                    results_file, count_corr_array, frame,
+                    mode_count_corr, node=count_corr_node)
 
 
 def av_intrinsic_distributions(directory, file_name, dim, nslice, qm, n0, phi,
                                nframe, nsample,
-                               nz=100, recon=False, ow_dist=False):
+                               nz=100, recon=False, ow_dist=False,
+                               q_max=None):
     """
     Summate average density and curvature distributions
 
@@ -545,51 +554,65 @@ def av_intrinsic_distributions(directory, file_name, dim, nslice, qm, n0, phi,
     ow_dist:  bool (optional)
         Whether to overwrite average density and curvature
         distributions (default=False)
+    q_max: float (optional)
+        Maximum wave vector magnitude |q| of waves included in
+        surfaces (default=all waves up to qm)
 
     Returns
     -------
 
-    int_den_curve_matrix:  float, array_like; shape=(qm+1, nslice, nz)
+    int_den_curve_matrix:  float, array_like; shape=(n_qu, nslice, nz)
         Average intrinsic density-curvature distribution for each
-        resolution across nsample frames
-    int_density:  float, array_like; shape=(qm+1, nslice)
+        stored resolution (qm+1 by default) across nsample frames
+    int_density:  float, array_like; shape=(n_qu, nslice)
         Average intrinsic density distribution for each resolution
         across nsample frames
-    int_curvature:  float, array_like; shape=(qm+1, nz)
+    int_curvature:  float, array_like; shape=(n_qu, nz)
         Average intrinsic surface curvature distribution for each
         resolution across nsample frames
 
     """
 
     intden_dir = os.path.join(directory, 'intden')
-    file_name_hist = create_file_name(
-        [file_name, nslice, nz, qm, n0, int(1./phi + 0.5), nframe])
     file_name_dist = create_file_name(
         [file_name, nslice, nz, qm, n0, int(1. / phi + 0.5), nsample])
 
     if recon:
-        file_name_hist += '_r'
         file_name_dist += '_r'
 
-    count_data_file = os.path.join(intden_dir, file_name_hist)
     curve_data_file = os.path.join(intden_dir, file_name_dist)
+    results_file = create_results_file_path(file_name, directory)
 
-    if not os.path.exists(curve_data_file + '_int_den_curve.npy') or ow_dist:
+    if not os.path.exists(intden_dir):
+        os.mkdir(intden_dir)
 
-        int_den_curve_matrix = np.zeros((qm+1, nslice, nz))
+    if not os.path.exists(curve_data_file + '_int_den_curve.npy') or ow_dist:
 
         print("\n--- Loading in Density and Curvature Distributions ---\n")
 
         lslice = dim[2] / nslice
         Vslice = dim[0] * dim[1] * lslice
 
-        for frame in range(nsample):
-            sys.stdout.write("Frame {}\r".format(frame))
-            sys.stdout.flush()
+        with AliasStore() as store:
+            group = store.find_group(
+                results_file,
+                **results_parameters(qm, n0, phi, recon, q_max))
+            if group is None:
+                raise FileNotFoundError(
+                    'No intrinsic surface results for given parameters'
+                    ' in {}.hdf5'.format(results_file))
+            count_corr_node = group + '/count_corr'
+            int_den_curve_matrix = np.zeros(
+                store.shape(results_file, count_corr_node)[1:])
+
+            for frame in range(nsample):
+                sys.stdout.write("Frame {}\r".format(frame))
+                sys.stdout.flush()
 
-            count_corr_array = load_hdf5(
-                count_data_file + '_count_corr', frame)
-            int_den_curve_matrix += count_corr_array / (nsample * Vslice)
+                count_corr_array = store.load(
+                    results_file, frame, node=count_corr_node)
+                int_den_curve_matrix += (
+                    count_corr_array / (nsample * Vslice))
 
         np.save(curve_data_file + "_int_den_curve.npy", int_den_curve_matrix)
 
@@ -688,15 +711,16 @@ def make_den_curve(zmol, int_z_mol, int_dxdy_mol, nmol, nslice, nz, qm, dim):
     Returns
     -------
 
-    count_corr_array:  int, array_like; shape=(qm+1, nslice, nz)
+    count_corr_array:  int, array_like; shape=(n_qu, nslice, nz)
         Number histogram binned by molecular position along z axis
-        and mean curvature H across qm resolutions
+        and mean curvature H across each resolution in int_z_mol
 
     """
 
-    count_corr_array = np.zeros((qm+1, nslice, nz))
+    n_qu = int_z_mol.shape[1]
+    count_corr_array = np.zeros((n_qu, nslice, nz))
 
-    for qu in range(qm+1):
+    for qu in range(n_qu):
 
         temp_count_corr_array = np.zeros((nslice, nz))
 
@@ -736,7 +760,8 @@ def make_den_curve(zmol, int_z_mol, int_dxdy_mol, nmol, nslice, nz, qm, dim):
 
 def create_intrinsic_den_curve_dist(directory, file_name, qm, n0, phi, nframe,
                                     nslice, dim,
-                                    nz=100, recon=0, ow_hist=False):
+                                    nz=100, recon=0, ow_hist=False,
+                                    q_max=None):
     """
     Calculate density and curvature distributions across surface
 
@@ -770,48 +795,45 @@ def create_intrinsic_den_curve_dist(directory, file_name, qm, n0, phi, nframe,
     ow_count:  bool (optional)
         Whether to overwrite density and curvature distributions
         (default=False)
+    q_max: float (optional)
+        Maximum wave vector magnitude |q| of waves included in
+        surfaces (default=all waves up to qm)
     """
 
     print("\n--- Running Intrinsic Density and Curvature Routine --- \n")
 
     pos_dir = os.path.join(directory, 'pos')
-    intpos_dir = os.path.join(directory, 'intpos')
-    intden_dir = os.path.join(directory, 'intden')
-
-    if not os.path.exists(intden_dir):
-        os.mkdir(intden_dir)
-
-    file_name_pos = create_file_name(
-        [file_name, qm, n0, int(1./phi + 0.5), nframe]
-    )
-    file_name_coeff = file_name_pos
-    file_name_hist = create_file_name(
-        [file_name, nslice, nz, qm, n0, int(1./phi + 0.5), nframe])
+    results_file = create_results_file_path(file_name, directory)
+
+    with AliasStore() as store:
+        group = store.parameter_group(
+            results_file, **results_parameters(qm, n0, phi, recon, q_max))
+        count_corr_node = group + '/count_corr'
+
+        # Histograms are made at each resolution of stored positions
+        qu_list = store.attrs(results_file, group + '/int_z_mol').get(
+            'qu_list', np.arange(qm + 1))
+        hist_attrs = {'nslice': nslice, 'nz': nz, 'qu_list': qu_list}
+
+        if (not store.exists(results_file, count_corr_node)
+                or not _equal_attrs(
+                    store.attrs(results_file, count_corr_node),
+                    hist_attrs)):
+            store.create(results_file, (qu_list.size, nslice, nz),
+                         tables.Float64Atom(), nframe,
+                         node=count_corr_node, attrs=hist_attrs)
+            file_check = False
 
-    if recon:
-        file_name_pos += '_r'
-        file_name_hist += '_r'
-        file_name_coeff += '_r'
-
-    count_data_file = os.path.join(intden_dir, file_name_hist)
-
-    if not os.path.exists(count_data_file + '_count_corr.hdf5'):
-        make_hdf5(count_data_file + '_count_corr',
-                  (qm+1, nslice, nz), tables.Float64Atom())
-        file_check = False
-
-    elif not ow_hist:
-        "Checking number of frames in current distribution files"
-        try:
-            file_check = shape_check_hdf5(
-                count_data_file + '_count_corr',
-                (nframe, qm+1, nslice, nz))
-        except FileNotFoundError:
+        elif not ow_hist:
+            "Checking number of frames in current distribution dataset"
+            file_check = (
+                store.n_frames(results_file, count_corr_node) >= nframe)
+        else:
             file_check = False
-    else:
-        file_check = False
 
-    if not file_check:
+        if file_check:
+            return
+
         pos_data_file = os.path.join(pos_dir + file_name)
         zmol = load_npy(pos_data_file + '_{}_zmol'.format(nframe))
         COM = load_npy(pos_data_file + '_{}_com'.format(nframe))
@@ -823,9 +845,8 @@ def create_intrinsic_den_curve_dist(directory, file_name, qm, n0, phi, nframe,
         for frame in range(nframe):
 
             "Checking number of frames in hdf5 files"
-            frame_check_count_corr = frame_check_hdf5(
-                count_data_file + '_count_corr', frame)
-            mode_count_corr = mode_check_hdf5(frame_check_count_corr, ow_hist)
+            mode_count_corr = store.mode(
+                results_file, frame, ow_hist, node=count_corr_node)
 
             if mode_count_corr:
                 sys.stdout.write(
@@ -833,14 +854,14 @@ def create_intrinsic_den_curve_dist(directory, file_name, qm, n0, phi, nframe,
                     f" frame {frame}\r")
                 sys.stdout.flush()
 
-                intpos_data_file = os.path.join(intpos_dir + file_name_pos)
-                int_z_mol = load_hdf5(intpos_data_file + '_int_z_mol', frame)
-                int_dxdy_mol = load_hdf5(
-                    intpos_data_file + '_int_dxdy_mol', frame)
+                int_z_mol = store.load(
+                    results_file, frame, node=group + '/int_z_mol')
+                int_dxdy_mol = store.load(
+                    results_file, frame, node=group + '/int_dxdy_mol')
 
                 count_corr_array = make_den_curve(
                     zmol[frame], int_z_mol, int_dxdy_mol, nmol,
                     nslice, nz, qm, dim)
-                save_hdf5(
-                    count_data_file + '_count_corr', count_corr_array,
-                    frame, mode_count_corr)
+                store.save(
+                    results_file, count_corr_array, frame,
+                    mode_count_corr, node=count_corr_node)
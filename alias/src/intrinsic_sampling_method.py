@@ -18,31 +18,33 @@ import tables
 
 import numpy as np
 
-from alias.io.hdf5_io import (
-    make_hdf5,
-    load_hdf5,
-    save_hdf5,
-    shape_check_hdf5,
-    frame_check_hdf5,
-    mode_check_hdf5
-)
+from alias.io.hdf5_io import AliasStore
 from alias.io.numpy_io import load_npy
 from alias.io.command_line_output import StdOutTable
-from alias.src.linear_algebra import update_A_b, lu_decomposition
+from alias.src.cell_list import CellList
+from alias.src.intrinsic_surface import SurfaceEvaluator
+from alias.src.linear_algebra import (
+    form_A_b, solve_linear, woodbury_decomposition)
+from alias.src.parallel import ordered_map, Call
 from alias.src.self_consistent_cycle import (
-    self_consistent_cycle,
+    self_consistent_cycle, make_zeta_list,
     initialise_surface, initialise_recon
 )
 from alias.src.spectra import intrinsic_area
-from alias.src.utilities import create_surface_file_path
+from alias.src.surface_reconstruction import surface_reconstruction
+from alias.src.utilities import (
+    create_results_file_path, results_parameters)
+from alias.src.wave_basis import wave_basis
 
 from .positions import check_pbc
-from .surface_reconstruction import surface_reconstruction
 from .utilities import numpy_remove
 
 
 def build_surface(xmol, ymol, zmol, dim, qm, n0, phi, tau, max_r,
-                  ncube=3, vlim=3, recon=0, surf_0=[0, 0], zvec=None):
+                  ncube=3, vlim=3, recon=0, surf_0=[0, 0], zvec=None,
+                  assembly='auto', solver='auto',
+                  incremental=False, woodbury='auto', warm_start=None,
+                  coarse_to_fine=False, q_max=None):
 
     """
     Create coefficients for Fourier sum representing intrinsic surface.
@@ -82,6 +84,31 @@ def build_surface(xmol, ymol, zmol, dim, qm, n0, phi, tau, max_r,
         Whether to peform surface reconstruction routine
     surf_0: float, array-like; shape=(2) (optional)
         Initial guesses for surface plane positions
+    assembly: str (optional)
+        Engine used to form A matrix and b vector, see `form_A_b`
+    solver: str (optional)
+        Method used to solve Ax = b, see `solve_linear`
+    incremental: bool (optional)
+        Whether to update Cholesky factors of A with each batch of
+        new pivots during the self consistent cycle, rather than
+        refactorising
+    woodbury: bool or str (optional)
+        Whether to solve for coefficients in the space of pivots using
+        the Woodbury identity; if 'auto', used whenever n0 < n_waves**2
+    warm_start: tuple (optional)
+        Coefficients and pivots of surfaces fitted to a previous,
+        correlated frame. Previous pivots that remain within tau of
+        the previous surfaces are used to seed the pivot search in
+        place of the ncube x ncube grid, and further pivots are
+        selected against the previous surfaces before the first
+        solve of the self consistent cycle.
+    coarse_to_fine: bool (optional)
+        Whether to grow pivots against surfaces of increasing
+        resolution up to qm, see `resolution_stages`
+    q_max: float (optional)
+        Maximum wave vector magnitude |q| of waves included in
+        surface, with all others held at zero (default=all waves
+        up to qm)
 
     Returns
     -------
@@ -97,10 +124,13 @@ def build_surface(xmol, ymol, zmol, dim, qm, n0, phi, tau, max_r,
 
     start = time.time()
 
-    coeff, A, b, area_diag = initialise_surface(qm, phi, dim)
+    # Waves included in surface, with all others held at zero
+    modes = wave_basis(qm, dim).indices(qm, q_max)
+
+    coeff, A, b, area_diag = initialise_surface(qm, phi, dim, modes)
 
     if recon:
-        psi, curve_matrix, H_var = initialise_recon(qm, phi, dim)
+        psi, curve_matrix, H_var = initialise_recon(qm, phi, dim, modes)
 
     # Remove molecules from vapour phase and assign an initial
     # grid of pivots furthest away from centre of mass
@@ -148,31 +178,46 @@ def build_surface(xmol, ymol, zmol, dim, qm, n0, phi, tau, max_r,
 
         end1 = time.time()
 
-        "Update A matrix and b vector"
-        temp_A, temp_b, fuv = update_A_b(xmol, ymol, zmol, dim, qm, pivot)
+        if woodbury == 'auto':
+            woodbury = n0 < modes.size
 
-        A += temp_A
-        b += temp_b
+        evaluator = SurfaceEvaluator(xmol, ymol, qm, dim)
 
-        end2 = time.time()
+        if recon or not woodbury:
+            "Update A matrix and b vector"
+            temp_A, temp_b = form_A_b(
+                xmol, ymol, zmol, dim, qm, pivot, assembly=assembly,
+                evaluator=evaluator, indices=modes)
 
-        "Perform LU decomosition to solve Ax = b"
-        coeff[0] = lu_decomposition(A[0] + area_diag, b[0])
-        coeff[1] = lu_decomposition(A[1] + area_diag, b[1])
+            A += temp_A
+            b += temp_b
 
-        if recon:
-            coeff[0], _ = surface_reconstruction(
-                coeff[0], A[0], b[0], area_diag, curve_matrix,
-                H_var, qm, pivot[0].size, psi)
-            coeff[1], _ = surface_reconstruction(
-                coeff[1], A[1], b[1], area_diag, curve_matrix,
-                H_var, qm, pivot[1].size, psi)
+        end2 = time.time()
+
+        "Solve Ax = b for surface coefficients"
+        for index, piv_n in enumerate(pivot):
+            if woodbury:
+                coeff_modes = woodbury_decomposition(
+                    evaluator.basis(piv_n)[modes], zmol[piv_n], area_diag,
+                    solver=solver)
+            else:
+                coeff_modes = solve_linear(
+                    A[index] + area_diag, b[index], solver=solver)
+
+            if recon:
+                coeff_modes, _ = surface_reconstruction(
+                    coeff_modes, A[index], b[index], area_diag,
+                    curve_matrix, H_var, qm, piv_n.size, psi,
+                    solver=solver)
+
+            coeff[index] = 0
+            coeff[index][modes] = coeff_modes
 
         end3 = time.time()
 
         "Calculate surface areas excess"
-        area1 = intrinsic_area(coeff[0], qm, qm, dim)
-        area2 = intrinsic_area(coeff[1], qm, qm, dim)
+        area1 = intrinsic_area(coeff[0], qm, qm, dim, evaluator=evaluator)
+        area2 = intrinsic_area(coeff[1], qm, qm, dim, evaluator=evaluator)
 
         end = time.time()
 
@@ -185,37 +230,25 @@ def build_surface(xmol, ymol, zmol, dim, qm, n0, phi, tau, max_r,
     # ut.view_surface(coeff, pivot, qm, qm, xmol, ymol, zmol, 50, dim)
 
     else:
-        piv_n1 = np.arange(ncube**2)
-        piv_n2 = np.arange(ncube**2)
-        piv_z1 = np.zeros(ncube**2)
-        piv_z2 = np.zeros(ncube**2)
-
-        dxyz = np.reshape(
-            np.tile(
-                np.stack((xmol, ymol, zmol)), (1, nmol)),
-            (3, nmol, nmol)
-        )
-        dxyz = np.transpose(dxyz, axes=(0, 2, 1)) - dxyz
-        for i, l in enumerate(dim[:2]):
-            dxyz[i] -= l * np.array(2 * dxyz[i] / l, dtype=int)
-        dr2 = np.sum(dxyz**2, axis=0)
-
-        vapour_list = np.where(np.count_nonzero(dr2 < max_r**2, axis=1) < vlim)
+        cell_list = CellList(xmol, ymol, zmol, dim, max_r)
+        vapour_list = np.where(cell_list.neighbour_counts() < vlim)
         print('Removing {} vapour molecules'.format(vapour_list[0].size))
         mol_list = numpy_remove(mol_list, vapour_list)
-        del dxyz, dr2
-
-        print('Selecting initial {} pivots'.format(ncube**2))
-        index_x = np.array(xmol * ncube / dim[0], dtype=int) % ncube
-        index_y = np.array(ymol * ncube / dim[1], dtype=int) % ncube
-
-        for n in mol_list:
-            if zmol[n] < piv_z1[ncube*index_x[n] + index_y[n]]:
-                piv_n1[ncube*index_x[n] + index_y[n]] = n
-                piv_z1[ncube*index_x[n] + index_y[n]] = zmol[n]
-            elif zmol[n] > piv_z2[ncube*index_x[n] + index_y[n]]:
-                piv_n2[ncube*index_x[n] + index_y[n]] = n
-                piv_z2[ncube*index_x[n] + index_y[n]] = zmol[n]
+        del cell_list
+
+        if warm_start is not None:
+            piv_n1, piv_n2 = surviving_pivots(
+                xmol, ymol, zmol, dim, qm, tau, mol_list, *warm_start)
+            print('Retaining {} {} pivots from previous frame'.format(
+                  piv_n1.size, piv_n2.size))
+
+        # Fall back to a grid of initial pivots if too few
+        # pivots survive from previous frame
+        if warm_start is None or min(piv_n1.size, piv_n2.size) < ncube**2:
+            piv_n1, piv_n2 = grid_pivots(
+                xmol, ymol, zmol, dim, ncube, mol_list)
+        else:
+            coeff = np.array(warm_start[0], dtype=float)
 
         "Update molecular and pivot lists"
         mol_list = numpy_remove(mol_list, piv_n1)
@@ -225,30 +258,130 @@ def build_surface(xmol, ymol, zmol, dim, qm, n0, phi, tau, max_r,
         assert np.sum(np.isin(piv_n1, mol_list)) == 0
         assert np.sum(np.isin(piv_n2, mol_list)) == 0
 
-        print('Initial {} pivots selected: {:10.3f} s'.format(
-              ncube**2, time.time() - start))
+        print('Initial {} {} pivots selected: {:10.3f} s'.format(
+              piv_n1.size, piv_n2.size, time.time() - start))
 
         "Split molecular position lists into two volumes for each surface"
         mol_list1 = mol_list
         mol_list2 = mol_list
 
-        assert piv_n1 not in mol_list1
-        assert piv_n2 not in mol_list2
+        assert not np.isin(piv_n1, mol_list1).any()
+        assert not np.isin(piv_n2, mol_list2).any()
 
         coeff, pivot = self_consistent_cycle(
             coeff, A, b, dim, qm, tau, xmol, ymol, zmol,
             [piv_n1, piv_n2], mol_list1, mol_list2, phi, n0,
-            new_piv1=[], new_piv2=[], recon=False)
+            new_piv1=piv_n1, new_piv2=piv_n2, recon=False,
+            assembly=assembly, solver=solver, incremental=incremental,
+            woodbury=woodbury, coarse_to_fine=coarse_to_fine,
+            q_max=q_max)
 
     print('\n')
 
     return coeff, pivot
 
 
+def grid_pivots(xmol, ymol, zmol, dim, ncube, mol_list):
+    """
+    Select initial pivots for each surface as the molecules with the
+    lowest and highest z positions in each cell of an ncube x ncube
+    grid in xy
+
+    Parameters
+    ----------
+    xmol:  float, array_like; shape=(nmol)
+        Molecular coordinates in x dimension
+    ymol:  float, array_like; shape=(nmol)
+        Molecular coordinates in y dimension
+    zmol:  float, array_like; shape=(nmol)
+        Molecular coordinates in z dimension
+    dim:  float, array_like; shape=(3)
+        XYZ dimensions of simulation cell
+    ncube:	int
+        Grid size for initial pivot molecule selection
+    mol_list:  int, array_like
+        Indices of molecules available to be selected as pivots
+
+    Returns
+    -------
+    piv_n1, piv_n2:  int, array_like; shape=(ncube**2)
+        Indices of initial pivot molecules for each surface
+    """
+
+    piv_n1 = np.arange(ncube**2)
+    piv_n2 = np.arange(ncube**2)
+    piv_z1 = np.zeros(ncube**2)
+    piv_z2 = np.zeros(ncube**2)
+
+    print('Selecting initial {} pivots'.format(ncube**2))
+    index_x = np.array(xmol * ncube / dim[0], dtype=int) % ncube
+    index_y = np.array(ymol * ncube / dim[1], dtype=int) % ncube
+
+    for n in mol_list:
+        if zmol[n] < piv_z1[ncube*index_x[n] + index_y[n]]:
+            piv_n1[ncube*index_x[n] + index_y[n]] = n
+            piv_z1[ncube*index_x[n] + index_y[n]] = zmol[n]
+        elif zmol[n] > piv_z2[ncube*index_x[n] + index_y[n]]:
+            piv_n2[ncube*index_x[n] + index_y[n]] = n
+            piv_z2[ncube*index_x[n] + index_y[n]] = zmol[n]
+
+    return piv_n1, piv_n2
+
+
+def surviving_pivots(xmol, ymol, zmol, dim, qm, tau, mol_list,
+                     coeff, pivot):
+    """
+    Select pivots of surfaces from a previous frame that remain
+    valid for the current molecular positions, being outside the
+    vapour phase and within tau of the previous surfaces
+
+    Parameters
+    ----------
+    xmol:  float, array_like; shape=(nmol)
+        Molecular coordinates in x dimension
+    ymol:  float, array_like; shape=(nmol)
+        Molecular coordinates in y dimension
+    zmol:  float, array_like; shape=(nmol)
+        Molecular coordinates in z dimension
+    dim:  float, array_like; shape=(3)
+        XYZ dimensions of simulation cell
+    qm:  int
+        Maximum number of wave frequencies in Fourier Sum
+        representing intrinsic surface
+    tau:  float
+        Tolerance along z axis either side of previous intrinsic
+        surface
+    mol_list:  int, array_like
+        Indices of molecules available to be selected as pivots
+    coeff:	array_like (float); shape=(2, n_waves**2)
+        Surface coefficients of previous frame
+    pivot:  array_like (int); shape=(2, n0)
+        Indicies of pivot molecules of previous frame
+
+    Returns
+    -------
+    piv_n1, piv_n2:  int, array_like
+        Indices of surviving pivot molecules for each surface
+    """
+
+    surviving = []
+    for piv_n, surf_coeff in zip(pivot, coeff):
+        piv_n = np.asarray(piv_n, dtype=int)
+        piv_n = piv_n[np.isin(piv_n, mol_list)]
+        zeta_list = make_zeta_list(
+            xmol, ymol, zmol, dim, piv_n, surf_coeff, qm, qm)
+        surviving.append(piv_n[zeta_list <= tau])
+
+    return surviving
+
+
 def create_intrinsic_surfaces(directory, file_name, dim, qm, n0, phi,
                               mol_sigma, nframe, recon=False, ncube=3,
                               vlim=3, tau=0.5,
-                              max_r=1.5, ow_coeff=False, ow_recon=False):
+                              max_r=1.5, ow_coeff=False, ow_recon=False,
+                              jobs=1, warm_start=False, q_max=None,
+                              assembly='auto', solver='auto',
+                              incremental=False, coarse_to_fine=False):
     """
     Routine to find optimised pivot density coefficient ns and pivot number n0
     based on lowest pivot diffusion rate
@@ -280,130 +413,188 @@ def create_intrinsic_surfaces(directory, file_name, dim, qm, n0, phi,
         Whether to overwrite surface coefficients (default=False)
     ow_recon:  bool (optional)
         Whether to overwrite reconstructed surface coefficients (default=False)
+    jobs:  int (optional)
+        Number of worker processes fitting frames in parallel (default=1)
+    warm_start:  bool (optional)
+        Whether to seed pivots of each frame from those of the
+        previous frame (default=False). Frames then depend on each
+        other, and so are fit in serial.
+    q_max: float (optional)
+        Maximum wave vector magnitude |q| of waves included in
+        surfaces, see `build_surface` (default=all waves up to qm)
+    assembly, solver, incremental, coarse_to_fine: (optional)
+        Options of self consistent cycle, see `build_surface`
 
     """
 
     print("\n--- Running Intrinsic Surface Routine ---\n")
 
-    surf_dir = os.path.join(directory, 'surface')
     pos_dir = os.path.join(directory, 'pos')
 
-    if not os.path.exists(surf_dir):
-        os.mkdir(surf_dir)
-
     n_waves = 2 * qm + 1
     max_r *= mol_sigma
     tau *= mol_sigma
 
-    coeff_file_name = create_surface_file_path(
-        file_name, surf_dir, qm, n0, phi, nframe, recon
-    )
-
-    "Make coefficient and pivot files"
-    if not os.path.exists(coeff_file_name + '_coeff.hdf5'):
-        make_hdf5(coeff_file_name + '_coeff',
-                  (2, n_waves**2), tables.Float64Atom())
-        make_hdf5(coeff_file_name + '_pivot',
-                  (2, n0), tables.Int64Atom())
-        file_check = False
-
-    elif not ow_coeff:
-        "Checking number of frames in current coefficient files"
-        try:
-            file_check = shape_check_hdf5(
-                coeff_file_name + '_coeff', (nframe, 2, n_waves**2))
-            file_check *= shape_check_hdf5(
-                coeff_file_name + '_pivot', (nframe, 2, n0))
-        except FileNotFoundError:
+    results_file = create_results_file_path(file_name, directory)
+
+    with AliasStore() as store:
+        group = store.parameter_group(
+            results_file, **results_parameters(qm, n0, phi, recon, q_max))
+        coeff_node = group + '/coeff'
+        pivot_node = group + '/pivot'
+
+        "Make coefficient and pivot datasets"
+        if not store.exists(results_file, coeff_node):
+            store.create(results_file, (2, n_waves**2),
+                         tables.Float64Atom(), nframe, node=coeff_node)
+            store.create(results_file, (2, n0),
+                         tables.Int64Atom(), nframe, node=pivot_node)
+            file_check = False
+
+        elif not ow_coeff:
+            "Checking number of frames in current coefficient datasets"
+            file_check = (
+                store.n_frames(results_file, coeff_node) >= nframe
+                and store.n_frames(results_file, pivot_node) >= nframe)
+        else:
             file_check = False
-    else:
-        file_check = False
 
-    if not file_check:
+        if file_check:
+            return
+
         print("IMPORTING GLOBAL POSITION DISTRIBUTIONS\n")
         pos_data_file = os.path.join(pos_dir, file_name)
         mol_traj = load_npy(pos_data_file + f'_{nframe}_mol_traj')
         mol_vec = load_npy(pos_data_file + f'_{nframe}_mol_vec')
         com_traj = load_npy(pos_data_file + f'_{nframe}_com')
 
-        n_mols = mol_traj.shape[1]
-        com_tile = np.moveaxis(
-            np.tile(com_traj, (n_mols, 1, 1)),
-            [0, 1, 2], [2, 1, 0])[2]
-        mol_traj[:, :, 2] -= com_tile
-
+        # Checking number of frames in coeff and pivot files
+        modes = {}
         for frame in range(nframe):
+            mode_coeff = store.mode(
+                results_file, frame, ow_coeff, node=coeff_node)
+            mode_pivot = store.mode(
+                results_file, frame, ow_coeff, node=pivot_node)
 
-            # Checking number of frames in coeff and pivot files
-            frame_check_coeff = frame_check_hdf5(
-                coeff_file_name + '_coeff', frame)
-            frame_check_pivot = frame_check_hdf5(
-                coeff_file_name + '_pivot', frame)
+            if mode_coeff or mode_pivot:
+                modes[frame] = (mode_coeff, mode_pivot)
 
-            mode_coeff = mode_check_hdf5(frame_check_coeff, ow_coeff)
-            mode_pivot = mode_check_hdf5(frame_check_pivot, ow_coeff)
+        # Initial guess of surface planes is only reported, so all
+        # frames may be fit independently unless warm starting
+        surf_0 = [-dim[2]/4, dim[2]/4]
 
-            if mode_coeff or mode_pivot:
+        if warm_start and jobs > 1:
+            print("Warm starting surfaces from previous frames:"
+                  " fitting frames in serial\n")
+            jobs = 1
+
+        def surface_arguments():
+            """Yields arguments of build_surface for each frame,
+            with z positions relative to centre of mass"""
+            for frame in modes:
                 sys.stdout.write(
                     "Optimising Intrinsic Surface coefficients:"
                     " frame {}\n".format(frame))
                 sys.stdout.flush()
 
-                if frame == 0:
-                    surf_0 = [-dim[2]/4, dim[2]/4]
-                else:
-                    index = (2 * qm + 1)**2 / 2
-                    coeff = load_hdf5(coeff_file_name + '_coeff', frame-1)
-                    surf_0 = [coeff[0][index], coeff[1][index]]
+                # Previous frame is always saved before the next set
+                # of arguments is requested when fitting in serial
+                previous = None
+                if warm_start and frame > 0:
+                    previous = (
+                        store.load(
+                            results_file, frame - 1, node=coeff_node),
+                        store.load(
+                            results_file, frame - 1, node=pivot_node))
+
+                yield Call(
+                    (mol_traj[frame, :, 0],
+                     mol_traj[frame, :, 1],
+                     mol_traj[frame, :, 2] - com_traj[frame, 2],
+                     dim, qm, n0, phi, tau, max_r,
+                     ncube, vlim, recon, surf_0,
+                     mol_vec[frame, :, 2]),
+                    {'warm_start': previous, 'q_max': q_max,
+                     'assembly': assembly, 'solver': solver,
+                     'incremental': incremental,
+                     'coarse_to_fine': coarse_to_fine})
+
+        # Coefficients and pivots are saved in frame order, so that
+        # partial runs may be resumed
+        results = ordered_map(build_surface, surface_arguments(), jobs=jobs)
+        for frame, (coeff, pivot) in zip(modes, results):
+            mode_coeff, mode_pivot = modes[frame]
+            store.save(
+                results_file, coeff, frame, mode_coeff, node=coeff_node)
+            store.save(
+                results_file, pivot, frame, mode_pivot, node=pivot_node)
 
-                coeff, pivot = build_surface(
-                    mol_traj[frame, :, 0],
-                    mol_traj[frame, :, 1],
-                    mol_traj[frame, :, 2],
-                    dim, qm, n0, phi, tau, max_r,
-                    ncube=ncube, vlim=vlim, recon=recon,
-                    surf_0=surf_0, zvec=mol_vec[frame])
 
-                save_hdf5(coeff_file_name + '_coeff', coeff, frame, mode_coeff)
-                save_hdf5(coeff_file_name + '_pivot', pivot, frame, mode_pivot)
+def pivot_swap(xmol, ymol, zmol, pivots, dim, max_r, n0):
+    """
+    Balance pivots between surfaces by repeatedly moving the pivot
+    with the fewest neighbours in the overloaded surface to the other
+    surface, until both contain n0 pivots. Ties are broken by the
+    earliest position in the pivot array.
 
+    Neighbour counts are calculated once and decremented as each
+    pivot is moved, rather than recalculated.
 
-def pivot_swap(xmol, ymol, zmol, pivots, dim, max_r, n0):
+    Parameters
+    ----------
+    xmol:  float, array_like; shape=(nmol)
+        Molecular coordinates in x dimension
+    ymol:  float, array_like; shape=(nmol)
+        Molecular coordinates in y dimension
+    zmol:  float, array_like; shape=(nmol)
+        Molecular coordinates in z dimension
+    pivots:  list of int, array_like
+        Indices of pivot molecules for both surfaces
+    dim:  float, array_like; shape=(3)
+        XYZ dimensions of simulation cell
+    max_r:  float
+        Maximum radius for neighbouring molecules
+    n0:  int
+        Number of molecular pivots in each surface
+
+    Returns
+    -------
+    zmol:  float, array_like; shape=(nmol)
+        Molecular coordinates in z dimension
+    pivots:  list of int, array_like
+        Balanced indices of pivot molecules for both surfaces
+    """
 
     assert (pivots[0].size + pivots[1].size == 2 * n0)
 
-    # Check equal number of pivots exists for each surface
-    while pivots[0].size != n0 or pivots[1].size != n0:
-
-        # Identify the overloaded surface"
-        surf_g = int(pivots[0].size < pivots[1].size)
-        surf_l = int(pivots[0].size > pivots[1].size)
-        piv_g = pivots[surf_g]
-
-        # Calculate radial distances between each pivot in the surface
-        dxyz = np.reshape(
-            np.tile(
-                np.stack(
-                    (xmol[piv_g], ymol[piv_g], zmol[piv_g])
-                ),
-                (1, pivots[surf_g].size)
-            ),
-            (3, pivots[surf_g].size, pivots[surf_g].size)
-        )
-
-        dxyz = np.transpose(dxyz, axes=(0, 2, 1)) - dxyz
-        for i, l in enumerate(dim[:2]):
-            dxyz[i] -= l * np.array(2 * dxyz[i] / l, dtype=int)
-        dr2 = np.sum(dxyz**2, axis=0)
-
-        # Compose a nearest neighbour list, ordered by number of neighbours
-        vapour_list = np.argsort(
-            np.count_nonzero(dr2 < max_r**2, axis=1))[:1]
-        piv = pivots[surf_g][vapour_list]
+    # Identify the overloaded surface, which remains so until balanced
+    surf_g = int(pivots[0].size < pivots[1].size)
+    surf_l = 1 - surf_g
+    piv_g = pivots[surf_g]
+
+    if piv_g.size == n0:
+        return zmol, pivots
+
+    # Count neighbours of each pivot in the surface
+    cell_list = CellList(xmol, ymol, zmol, dim, max_r, indices=piv_g)
+    neighbour_count = cell_list.neighbour_counts()
+    remaining = np.ones(piv_g.size, dtype=bool)
+    moved = []
 
+    for _ in range(piv_g.size - n0):
         # Swap the pivot molecule with the smallest number of neighbours
         # to the other surface
-        pivots[surf_l] = np.concatenate((pivots[surf_l], piv))
-        pivots[surf_g] = np.delete(pivots[surf_g], vapour_list)
+        index = np.argmin(
+            np.where(remaining, neighbour_count, piv_g.size + 1))
+        remaining[index] = False
+        moved.append(index)
+
+        # Remove pivot from neighbour counts of remaining pivots
+        n = piv_g[index]
+        neighbour_count[
+            cell_list.neighbours(xmol[n], ymol[n], zmol[n])] -= 1
+
+    pivots[surf_l] = np.concatenate((pivots[surf_l], piv_g[moved]))
+    pivots[surf_g] = piv_g[remaining]
 
     return zmol, pivots
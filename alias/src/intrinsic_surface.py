@@ -2,15 +2,194 @@ import numpy as np
 
 from alias.src.wave_function import (
     wave_function_array,
-    wave_function,
     d_wave_function_array,
-    d_wave_function,
     dd_wave_function_array,
-    dd_wave_function,
+    wave_function_table,
+    d_wave_function_table,
+    dd_wave_function_table,
     vcheck,
     wave_arrays,
     wave_indices
 )
+from alias.src.wave_basis import wave_basis
+
+
+class SurfaceEvaluator:
+    """Evaluates intrinsic surfaces and their derivatives at a fixed
+    set of molecular positions.
+
+    Tables of 1-D waves along x and y are built once for every
+    position and reused for any set of coefficients. Each evaluation
+    then uses the separable form of the Fourier sum,
+
+        xi(x, y) = sum_u f_u(x) * (sum_v C_uv f_v(y))
+
+    which requires two dense matrix products rather than a loop
+    over every (u, v) pair.
+
+    Tables are cached for the lifetime of the evaluator, typically a
+    single frame, up to a memory cap beyond which they are recomputed
+    on each use.
+    """
+
+    #: Default memory cap for cached tables in bytes
+    max_memory = 2 ** 29
+
+    #: Table generators for each order of derivative
+    table_functions = [
+        wave_function_table,
+        d_wave_function_table,
+        dd_wave_function_table
+    ]
+
+    def __init__(self, x, y, qm, dim, max_memory=None):
+        """
+        Parameters
+        ----------
+        x:  float, array_like; shape=(nmol)
+            Coordinates in x dimension
+        y:  float, array_like; shape=(nmol)
+            Coordinates in y dimension
+        qm:  int
+            Maximum number of wave frequencies in Fourier Sum
+            representing intrinsic surface
+        dim:  float, array_like; shape=(3)
+            XYZ dimensions of simulation cell
+        max_memory:  int, optional
+            Memory cap for cached tables in bytes
+        """
+        self.x = np.ravel(x)
+        self.y = np.ravel(y)
+        self.qm = qm
+        self.dim = dim
+
+        if max_memory is not None:
+            self.max_memory = max_memory
+
+        self._tables = {}
+
+    @property
+    def memory(self):
+        """Memory used by cached tables in bytes"""
+        return sum(table.nbytes for table in self._tables.values())
+
+    @property
+    def n_waves(self):
+        """Number of waves in each dimension of Fourier sum"""
+        return 2 * self.qm + 1
+
+    def wave_table(self, axis, order):
+        """Return wave table for given axis (0 = x, 1 = y) and order
+        of derivative, building it on first use"""
+
+        key = (axis, order)
+        if key in self._tables:
+            return self._tables[key]
+
+        positions = [self.x, self.y][axis]
+        table = self.table_functions[order](
+            positions, self.qm, self.dim[axis])
+
+        if self.memory + table.nbytes <= self.max_memory:
+            self._tables[key] = table
+
+        return table
+
+    def basis(self, indices=None):
+        """
+        Returns products of waves f(x, u, Lx).f(y, v, Ly) for each
+        coefficient at each position
+
+        Parameters
+        ----------
+        indices:  int, array_like, optional
+            Indices of positions to evaluate (default=all)
+
+        Returns
+        -------
+        fuv:  float, array_like; shape=(n_waves**2, n_indices)
+            Wave products, ordered as surface coefficients
+        """
+        if indices is None:
+            indices = slice(None)
+
+        f_x = self.wave_table(0, 0)[indices]
+        f_y = self.wave_table(1, 0)[indices]
+
+        fuv = f_x[:, :, None] * f_y[:, None, :]
+
+        return np.reshape(fuv, (-1, self.n_waves ** 2)).T
+
+    def _wave_sum(self, coeff, qu, x_order, y_order, indices):
+        """Return Fourier sum of coefficients at resolution qu,
+        using derivatives of given orders along x and y"""
+
+        if qu is None:
+            qu = self.qm
+        if indices is None:
+            indices = slice(None)
+
+        select = slice(self.qm - qu, self.qm + qu + 1)
+        coeff_matrix = np.reshape(
+            coeff, (self.n_waves, self.n_waves))[select, select]
+
+        f_x = self.wave_table(0, x_order)[indices, select]
+        f_y = self.wave_table(1, y_order)[indices, select]
+
+        return np.sum(f_x * np.dot(f_y, coeff_matrix.T), axis=1)
+
+    def xi(self, coeff, qu=None, indices=None):
+        """
+        Returns position of intrinsic surface at each position
+
+        Parameters
+        ----------
+        coeff:	float, array_like; shape=(n_waves**2)
+            Optimised surface coefficients
+        qu:  int, optional
+            Upper limit of wave frequencies in Fourier Sum
+            representing intrinsic surface (default=qm)
+        indices:  int, array_like, optional
+            Indices of positions to evaluate (default=all)
+
+        Returns
+        -------
+        xi_z:  float, array_like; shape=(nmol)
+            Positions of intrinsic surface in z dimension
+        """
+        return self._wave_sum(coeff, qu, 0, 0, indices)
+
+    def dxy_dxi(self, coeff, qu=None, indices=None):
+        """Returns first derivatives of intrinsic surface wrt x and y
+        at each position (see `xi` for parameters)"""
+
+        dx_dxi = self._wave_sum(coeff, qu, 1, 0, indices)
+        dy_dxi = self._wave_sum(coeff, qu, 0, 1, indices)
+
+        return dx_dxi, dy_dxi
+
+    def ddxy_ddxi(self, coeff, qu=None, indices=None):
+        """Returns second derivatives of intrinsic surface wrt x and y
+        at each position (see `xi` for parameters)"""
+
+        ddx_ddxi = self._wave_sum(coeff, qu, 2, 0, indices)
+        ddy_ddxi = self._wave_sum(coeff, qu, 0, 2, indices)
+
+        return ddx_ddxi, ddy_ddxi
+
+    def area_weights(self, qu=None):
+        """Returns weighting of squared coefficients in surface area
+        at resolution qu (see `spectra.intrinsic_area`)"""
+
+        return wave_basis(self.qm, self.dim).area_weights(qu)
+
+    def H_xy(self, coeff, qu=None, indices=None):
+        """Returns mean curvature of intrinsic surface at each
+        position (see `xi` for parameters)"""
+
+        ddx_ddxi, ddy_ddxi = self.ddxy_ddxi(coeff, qu, indices)
+
+        return ddx_ddxi + ddy_ddxi
 
 
 def xi(x, y, coeff, qm, qu, dim):
@@ -42,24 +221,71 @@ def xi(x, y, coeff, qm, qu, dim):
     """
 
     if np.isscalar(x):
-        u_array, v_array = wave_arrays(qm)
-        indices = wave_indices(qu, u_array, v_array)
+        basis = wave_basis(qm, dim)
+        u_array, v_array = basis.u_array, basis.v_array
+        indices = basis.indices(qu)
 
         wave_x = wave_function_array(x, u_array[indices], dim[0])
         wave_y = wave_function_array(y, v_array[indices], dim[1])
         xi_z = np.sum(wave_x * wave_y * coeff[indices])
     else:
-        xi_z = np.zeros(x.shape)
-        for u in range(-qu, qu+1):
-            for v in range(-qu, qu+1):
-                j = (2 * qm + 1) * (u + qm) + (v + qm)
-                wave_x = wave_function(x, u, dim[0])
-                wave_y = wave_function(y, v, dim[1])
-                xi_z += wave_x * wave_y * coeff[j]
+        evaluator = SurfaceEvaluator(x, y, qm, dim)
+        xi_z = np.reshape(evaluator.xi(coeff, qu), np.shape(x))
 
     return xi_z
 
 
+def xi_range(coeff, qm, dim, n_grid=None):
+    """
+    Returns bounds on the lowest and highest positions of intrinsic
+    surface, sampled on a regular grid across the xy plane.
+
+    Extrema lying between grid points are included by padding the
+    sampled range by a bound on the change in surface position
+    between each point and its nearest grid point,
+
+        pi / n_grid * sum_uv |C_uv| (|u| + |v|)
+
+    obtained from the largest possible gradient of the surface.
+
+    Parameters
+    ----------
+    coeff:	float, array_like; shape=(n_waves**2)
+        Optimised surface coefficients
+    qm:  int
+        Maximum number of wave frequencies in Fouier Sum representing
+        intrinsic surface
+    dim:  float, array_like; shape=(3)
+        XYZ dimensions of simulation cell
+    n_grid:  int, optional
+        Number of grid points along each of x and y
+        (default=4 per wave, 4 * (2 * qm + 1))
+
+    Returns
+    -------
+    xi_min, xi_max:  float
+        Range of intrinsic surface positions in z dimension
+    """
+
+    n_waves = 2 * qm + 1
+    if n_grid is None:
+        n_grid = 4 * n_waves
+
+    f_x = wave_function_table(
+        np.arange(n_grid) * dim[0] / n_grid, qm, dim[0])
+    f_y = wave_function_table(
+        np.arange(n_grid) * dim[1] / n_grid, qm, dim[1])
+    coeff_matrix = np.reshape(coeff, (n_waves, n_waves))
+
+    xi_grid = np.dot(f_x, np.dot(coeff_matrix, f_y.T))
+
+    basis = wave_basis(qm, dim)
+    padding = np.pi / n_grid * np.sum(
+        np.abs(coeff) * (np.abs(basis.u_array) + np.abs(basis.v_array)))
+
+    return np.min(xi_grid) - padding, np.max(xi_grid) + padding
+
+
 def dxy_dxi(x, y, coeff, qm, qu, dim):
     """
     Function returning derivatives of intrinsic surface at
@@ -92,8 +318,9 @@ def dxy_dxi(x, y, coeff, qm, qu, dim):
     """
 
     if np.isscalar(x):
-        u_array, v_array = wave_arrays(qm)
-        indices = wave_indices(qu, u_array, v_array)
+        basis = wave_basis(qm, dim)
+        u_array, v_array = basis.u_array, basis.v_array
+        indices = basis.indices(qu)
 
         wave_x = wave_function_array(x, u_array[indices], dim[0])
         wave_y = wave_function_array(y, v_array[indices], dim[1])
@@ -104,19 +331,11 @@ def dxy_dxi(x, y, coeff, qm, qu, dim):
         dy_dxi = np.sum(wave_x * wave_dy * coeff[indices])
 
     else:
-        dx_dxi = np.zeros(x.shape)
-        dy_dxi = np.zeros(x.shape)
-        for u in range(-qu, qu+1):
-            for v in range(-qu, qu+1):
-                j = (2 * qm + 1) * (u + qm) + (v + qm)
-
-                wave_x = wave_function(x, u, dim[0])
-                wave_y = wave_function(y, v, dim[1])
-                wave_dx = d_wave_function(x, u, dim[0])
-                wave_dy = d_wave_function(y, v, dim[1])
-
-                dx_dxi += wave_dx * wave_y * coeff[j]
-                dy_dxi += wave_x * wave_dy * coeff[j]
+        evaluator = SurfaceEvaluator(x, y, qm, dim)
+        dx_dxi, dy_dxi = [
+            np.reshape(array, np.shape(x))
+            for array in evaluator.dxy_dxi(coeff, qu)
+        ]
 
     return dx_dxi, dy_dxi
 
@@ -157,8 +376,9 @@ def ddxy_ddxi(x, y, coeff, qm, qu, dim):
     """
 
     if np.isscalar(x):
-        u_array, v_array = wave_arrays(qm)
-        indices = wave_indices(qu, u_array, v_array)
+        basis = wave_basis(qm, dim)
+        u_array, v_array = basis.u_array, basis.v_array
+        indices = basis.indices(qu)
 
         wave_x = wave_function_array(x, u_array[indices], dim[0])
         wave_y = wave_function_array(y, v_array[indices], dim[1])
@@ -169,19 +389,11 @@ def ddxy_ddxi(x, y, coeff, qm, qu, dim):
         ddy_ddxi = np.sum(wave_x * wave_ddy * coeff[indices])
 
     else:
-        ddx_ddxi = np.zeros(x.shape)
-        ddy_ddxi = np.zeros(x.shape)
-        for u in range(-qu, qu+1):
-            for v in range(-qu, qu+1):
-                j = (2 * qm + 1) * (u + qm) + (v + qm)
-
-                wave_x = wave_function(x, u, dim[0])
-                wave_y = wave_function(y, v, dim[1])
-                wave_ddx = dd_wave_function(x, u, dim[0])
-                wave_ddy = dd_wave_function(y, v, dim[1])
-
-                ddx_ddxi += wave_ddx * wave_y * coeff[j]
-                ddy_ddxi += wave_x * wave_ddy * coeff[j]
+        evaluator = SurfaceEvaluator(x, y, qm, dim)
+        ddx_ddxi, ddy_ddxi = [
+            np.reshape(array, np.shape(x))
+            for array in evaluator.ddxy_ddxi(coeff, qu)
+        ]
 
     return ddx_ddxi, ddy_ddxi
 
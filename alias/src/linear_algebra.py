@@ -1,10 +1,12 @@
 import numpy as np
 import scipy as sp
 
-from alias.src.wave_function import wave_arrays, wave_function
+from alias.src.wave_basis import wave_basis
+from alias.src.wave_function import wave_function
 
 
-def update_A_b(xmol, ymol, zmol, dim, qm, new_pivot):
+def update_A_b(xmol, ymol, zmol, dim, qm, new_pivot, evaluator=None,
+               indices=None):
     """
     Update A matrix and b vector for new pivot selection
 
@@ -25,42 +27,292 @@ def update_A_b(xmol, ymol, zmol, dim, qm, new_pivot):
         Number of coefficients / waves in surface
     new_pivot:  int, array_like
         Indices of new pivot molecules for both surfaces
+    evaluator:  SurfaceEvaluator, optional
+        Evaluator containing wave tables for all molecules in frame
+    indices:  int, array_like; shape=(n_modes), optional
+        Indices of waves included in surface (default=all waves), see
+        `WaveBasis.indices`
 
     Returns
     -------
-    A:  float, array_like; shape=(2, n_waves**2, n_waves**2)
+    A:  float, array_like; shape=(2, n_modes, n_modes)
         Matrix containing wave product weightings
         f(x, u1, Lx).f(y, v1, Ly).f(x, u2, Lx).f(y, v2, Ly)
         for each coefficient in the linear algebra equation
         Ax = b for both surfaces
-    b:  float, array_like; shape=(2, n_waves**2)
+    b:  float, array_like; shape=(2, n_modes)
         Vector containing solutions z.f(x, u, Lx).f(y, v, Ly)
         to the linear algebra equation Ax = b
         for both surfaces
+    fuv:  list of float, array_like; shape=(n_modes, n_pivots)
+        Wave products f(x, u, Lx).f(y, v, Ly) at new pivots of each
+        surface
 
     """
+    basis = wave_basis(qm, dim)
+    if indices is None:
+        indices = np.arange(basis.n_waves ** 2)
+    u_array = basis.u_array[indices]
+    v_array = basis.v_array[indices]
+    n_modes = len(indices)
+
+    A = np.zeros((2, n_modes, n_modes))
+    b = np.zeros((2, n_modes))
+
+    fuv = []
+
+    for surf in range(2):
+        pivot = np.asarray(new_pivot[surf], dtype=int)
+        if evaluator is not None:
+            fuv_surf = evaluator.basis(pivot)[indices]
+        else:
+            fuv_surf = np.zeros((n_modes, pivot.size))
+            for index in range(n_modes):
+                wave_x = wave_function(
+                    xmol[pivot], u_array[index], dim[0])
+                wave_y = wave_function(
+                    ymol[pivot], v_array[index], dim[1])
+                fuv_surf[index] = wave_x * wave_y
+
+        b[surf] += np.dot(fuv_surf, zmol[pivot])
+        A[surf] += np.dot(fuv_surf, fuv_surf.T)
+        fuv.append(fuv_surf)
+
+    return A, b, fuv
+
+
+def structure_factor(x, y, dim, p_max, q_max, weights=None):
+    """
+    Calculate the 2D structure factor of a set of positions
+
+        S(p, q) = sum_i w_i exp(i (p kx x_i + q ky y_i))
+
+    on the lattice of integer frequencies -p_max <= p <= p_max,
+    -q_max <= q <= q_max, where kx = 2 pi / Lx and ky = 2 pi / Ly
+
+    Parameters
+    ----------
+    x:  float, array_like; shape=(n)
+        Coordinates in x dimension
+    y:  float, array_like; shape=(n)
+        Coordinates in y dimension
+    dim:  float, array_like; shape=(3)
+        XYZ dimensions of simulation cell
+    p_max:  int
+        Maximum frequency along x
+    q_max:  int
+        Maximum frequency along y
+    weights:  float, array_like; shape=(n), optional
+        Weighting w_i of each position (default=1)
+
+    Returns
+    -------
+    s_pq:  complex, array_like; shape=(2 * p_max + 1, 2 * q_max + 1)
+        Structure factor, indexed by (p + p_max, q + q_max)
+    """
+
+    e_x = np.exp(
+        2j * np.pi / dim[0] * np.outer(x, np.arange(-p_max, p_max + 1)))
+    e_y = np.exp(
+        2j * np.pi / dim[1] * np.outer(y, np.arange(-q_max, q_max + 1)))
+
+    if weights is not None:
+        e_x *= np.asarray(weights)[:, None]
+
+    return np.dot(e_x.T, e_y)
+
+
+def wave_expansion(wave_array):
+    """
+    Returns coefficients a_u(s) expanding each wave in Fourier sum
+    into complex exponentials, f(x, u, Lx) = sum_s a_u(s) exp(i s |u| kx x)
+    for s = +1 and s = -1
+
+    Parameters
+    ----------
+    wave_array:  int, array_like
+        Wave frequencies u
+
+    Returns
+    -------
+    expansion:  dict of complex, array_like
+        Coefficients a_u(s) for each wave, keyed by s
+    """
+
+    wave_array = np.asarray(wave_array)
+
+    return {
+        1: np.where(wave_array >= 0, 0.5, -0.5j),
+        -1: np.where(wave_array >= 0, 0.5, 0.5j)
+    }
+
+
+def structure_update_A_b(xmol, ymol, zmol, dim, qm, new_pivot,
+                         indices=None):
+    """
+    Update A matrix and b vector for new pivot selection using
+    2D structure factors of the new pivots.
+
+    Each element of A is a sum over pivots of products of four waves,
+    which expands into structure factors S(p, q) on the lattice of sum
+    and difference frequencies |p|, |q| <= 2qm. Likewise, b is
+    determined by the z-weighted structure factor. Results are
+    equivalent to `update_A_b` to round-off, but the cost scales as
+    O(n_waves**4 * qm + n_pivots * qm**2) rather than
+    O(n_waves**4 * n_pivots).
+
+    Parameters
+    ----------
+    xmol:  float, array_like; shape=(nmol)
+        Molecular coordinates in x dimension
+    ymol:  float, array_like; shape=(nmol)
+        Molecular coordinates in y dimension
+    zmol:  float, array_like; shape=(nmol)
+        Molecular coordinates in z dimension
+    dim:  float, array_like; shape=(3)
+        XYZ dimensions of simulation cell
+    qm:  int
+        Maximum number of wave frequencies in Fouier Sum
+        representing intrinsic surface
+    new_pivot:  int, array_like
+        Indices of new pivot molecules for both surfaces
+    indices:  int, array_like; shape=(n_modes), optional
+        Indices of waves included in surface (default=all waves), see
+        `WaveBasis.indices`
+
+    Returns
+    -------
+    A:  float, array_like; shape=(2, n_modes, n_modes)
+        Matrix containing wave product weightings
+        f(x, u1, Lx).f(y, v1, Ly).f(x, u2, Lx).f(y, v2, Ly)
+        for each coefficient in the linear algebra equation
+        Ax = b for both surfaces
+    b:  float, array_like; shape=(2, n_modes)
+        Vector containing solutions z.f(x, u, Lx).f(y, v, Ly)
+        to the linear algebra equation Ax = b
+        for both surfaces
+    """
+
     n_waves = 2 * qm + 1
+    n_freq = 4 * qm + 1
+
+    if indices is None:
+        indices = np.arange(n_waves ** 2)
+    n_modes = len(indices)
 
-    u_array, v_array = wave_arrays(qm)
+    # Positions of each included wave (u, v) along x and y
+    basis = wave_basis(qm, dim)
+    u_index = basis.u_array[indices] + qm
+    v_index = basis.v_array[indices] + qm
+    u_pairs = u_index[:, None] * n_waves + u_index[None, :]
+    v_pairs = v_index[:, None] * n_waves + v_index[None, :]
 
-    A = np.zeros((2, n_waves**2, n_waves**2))
-    b = np.zeros((2, n_waves**2))
+    wave_array = np.arange(-qm, qm + 1)
+    abs_wave = np.abs(wave_array)
+    expansion = wave_expansion(wave_array)
 
-    fuv = np.zeros((2, n_waves**2, len(new_pivot[0])))
+    # Sparse map from frequency q = t1|v1| + t2|v2| onto wave pairs
+    # (v1, v2), weighted by expansion coefficients a_v1(t1) a_v2(t2)
+    freq_map = np.zeros((n_freq, n_waves ** 2), dtype=complex)
+    columns = np.arange(n_waves ** 2)
+    for t1 in [1, -1]:
+        for t2 in [1, -1]:
+            q = t1 * abs_wave[:, None] + t2 * abs_wave[None, :] + 2 * qm
+            freq_map[q.ravel(), columns] += np.outer(
+                expansion[t1], expansion[t2]).ravel()
+
+    A = np.zeros((2, n_modes, n_modes))
+    b = np.zeros((2, n_modes))
 
     for surf in range(2):
-        for index in range(n_waves**2):
-            wave_x = wave_function(
-                xmol[new_pivot[surf]], u_array[index], dim[0])
-            wave_y = wave_function(
-                ymol[new_pivot[surf]], v_array[index], dim[1])
-            fuv[surf][index] = wave_x * wave_y
-            b[surf][index] += np.sum(
-                zmol[new_pivot[index]] * fuv[surf][index])
+        pivot = np.asarray(new_pivot[surf], dtype=int)
+        if pivot.size == 0:
+            continue
 
-        A[surf] += np.dot(fuv[surf], fuv[surf].T)
+        s_xy = structure_factor(
+            xmol[pivot], ymol[pivot], dim, 2 * qm, 2 * qm)
+        s_z = structure_factor(
+            xmol[pivot], ymol[pivot], dim, qm, qm, weights=zmol[pivot])
 
-    return A, b, fuv
+        # Terms with s1 = -1 are complex conjugates of those with
+        # s1 = +1, so only half of the expansion is summed
+        s_x = np.zeros((n_waves, n_waves, n_freq), dtype=complex)
+        for s2 in [1, -1]:
+            p = abs_wave[:, None] + s2 * abs_wave[None, :] + 2 * qm
+            s_x += (
+                np.outer(expansion[1], expansion[s2])[:, :, None]
+                * s_xy[p])
+
+        # Contract over y frequencies, giving A indexed (u1, u2, v1, v2)
+        A_uuvv = np.dot(s_x.reshape(n_waves ** 2, n_freq), freq_map)
+        A[surf] = 2 * A_uuvv.real[u_pairs, v_pairs]
+
+        s_zx = s_z[abs_wave + qm]
+        b_uv = sum(
+            expansion[t][None, :] * s_zx[:, t * abs_wave + qm]
+            for t in [1, -1])
+        b[surf] = 2 * (expansion[1][:, None] * b_uv).real.ravel()[indices]
+
+    return A, b
+
+
+#: Engines available to form A matrix and b vector
+ASSEMBLY_ENGINES = ['auto', 'wave_product', 'structure_factor']
+
+#: Minimum number of new pivots for either surface for which the
+#: 'structure_factor' engine outperforms 'wave_product'
+STRUCTURE_FACTOR_PIVOTS = 2000
+
+
+def form_A_b(xmol, ymol, zmol, dim, qm, new_pivot,
+             assembly='auto', evaluator=None, indices=None):
+    """
+    Form A matrix and b vector for new pivot selection using
+    chosen assembly engine
+
+    Parameters
+    ----------
+    xmol, ymol, zmol, dim, qm, new_pivot:
+        See `update_A_b`
+    assembly:  str, optional
+        Either 'structure_factor' (see `structure_update_A_b`),
+        'wave_product' (see `update_A_b`) or 'auto', which uses
+        'structure_factor' only for batches of at least
+        STRUCTURE_FACTOR_PIVOTS new pivots
+    evaluator:  SurfaceEvaluator, optional
+        Evaluator containing wave tables for all molecules in frame,
+        used by 'wave_product' engine
+    indices:  int, array_like; shape=(n_modes), optional
+        Indices of waves included in surface (default=all waves), see
+        `WaveBasis.indices`
+
+    Returns
+    -------
+    A:  float, array_like; shape=(2, n_modes, n_modes)
+        Matrix containing wave product weightings
+    b:  float, array_like; shape=(2, n_modes)
+        Vector containing solutions z.f(x, u, Lx).f(y, v, Ly)
+    """
+
+    assert assembly in ASSEMBLY_ENGINES, (
+        f"Argument assembly=={assembly} must be one of "
+        f"{ASSEMBLY_ENGINES}"
+    )
+
+    if assembly == 'auto':
+        n_new = max(len(pivot) for pivot in new_pivot)
+        if n_new >= STRUCTURE_FACTOR_PIVOTS:
+            assembly = 'structure_factor'
+        else:
+            assembly = 'wave_product'
+
+    if assembly == 'structure_factor':
+        return structure_update_A_b(
+            xmol, ymol, zmol, dim, qm, new_pivot, indices=indices)
+
+    return update_A_b(
+        xmol, ymol, zmol, dim, qm, new_pivot, evaluator=evaluator,
+        indices=indices)[:2]
 
 
 def lu_decomposition(A, b):
@@ -90,3 +342,431 @@ def lu_decomposition(A, b):
     coeff = sp.linalg.lu_solve((lu, piv), b)
 
     return coeff
+
+
+def cholesky_factor(A):
+    """
+    Perform Cholesky factorisation of symmetric matrix A in
+    precision of its dtype, alongside LAPACK estimate of reciprocal
+    condition number
+
+    Parameters
+    ----------
+    A:  float, array_like; shape=(n, n)
+        Symmetric matrix
+
+    Returns
+    -------
+    factor:  float, array_like; shape=(n, n)
+        Upper triangular Cholesky factor of A, or None if A is not
+        positive definite
+    rcond:  float
+        Estimate of reciprocal condition number of A in 1-norm
+        (0 if A is not positive definite)
+    """
+    potrf, pocon = sp.linalg.get_lapack_funcs(('potrf', 'pocon'), (A,))
+
+    factor, info = potrf(A, lower=False, clean=True)
+    if info != 0:
+        return None, 0.
+
+    a_norm = np.max(np.sum(np.abs(A), axis=0))
+    rcond, info = pocon(factor, a_norm)
+
+    return factor, rcond
+
+
+def cholesky_decomposition(A, b):
+    """
+    Perform Cholesky decomposition to solve equation Ax = b for
+    symmetric positive definite A
+
+    Parameters
+    ----------
+    A:  float, array_like; shape=(n_waves**2, n_waves**2)
+        Symmetric positive definite matrix
+    b:  float, array_like; shape=(n_waves**2)
+        Vector containing solutions to the linear algebra equation
+
+    Returns
+    -------
+    coeff:	array_like (float); shape=(n_waves**2)
+        Optimised surface coefficients
+    """
+    c_and_lower = sp.linalg.cho_factor(A)
+    coeff = sp.linalg.cho_solve(c_and_lower, b)
+
+    return coeff
+
+
+def eigen_decomposition(A, b, rcond=None):
+    """
+    Perform eigen decomposition to solve equation Ax = b for
+    symmetric A, discarding eigenvalues below threshold rcond
+    relative to the largest eigenvalue
+
+    Parameters
+    ----------
+    A:  float, array_like; shape=(n_waves**2, n_waves**2)
+        Symmetric matrix
+    b:  float, array_like; shape=(n_waves**2)
+        Vector containing solutions to the linear algebra equation
+    rcond:  float (optional)
+        Relative eigenvalue cut off (default n_waves**2 times machine
+        precision)
+
+    Returns
+    -------
+    coeff:	array_like (float); shape=(n_waves**2)
+        Optimised surface coefficients
+    """
+    eig_val, eig_vec = np.linalg.eigh(A)
+
+    if rcond is None:
+        rcond = A.shape[0] * np.finfo(A.dtype).eps
+
+    cutoff = rcond * np.max(np.abs(eig_val))
+    large = np.abs(eig_val) > cutoff
+    inv_val = np.zeros(eig_val.shape)
+    inv_val[large] = 1. / eig_val[large]
+
+    coeff = np.dot(eig_vec, inv_val * np.dot(eig_vec.T, b))
+
+    return coeff
+
+
+def mixed_precision_decomposition(A, b, max_iter=10, factor=None):
+    """
+    Solve equation Ax = b for symmetric positive definite A using a
+    single precision Cholesky factorisation followed by double
+    precision iterative refinement.
+
+    Systems that are not well conditioned in single precision, or for
+    which refinement stalls or fails to converge within max_iter
+    steps, are solved in double precision instead (see
+    `double_precision_decomposition`).
+
+    Parameters
+    ----------
+    A:  float, array_like; shape=(n_waves**2, n_waves**2)
+        Symmetric positive definite matrix
+    b:  float, array_like; shape=(n_waves**2)
+        Vector containing solutions to the linear algebra equation
+    max_iter:  int (optional)
+        Maximum number of refinement steps
+    factor:  float32, array_like; shape=(n_waves**2, n_waves**2) (optional)
+        Precomputed single precision upper Cholesky factor of A
+
+    Returns
+    -------
+    coeff:	array_like (float); shape=(n_waves**2)
+        Optimised surface coefficients
+    """
+    A = np.asarray(A, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+
+    if factor is None:
+        factor, rcond = cholesky_factor(A.astype(np.float32))
+        if rcond <= MIXED_PRECISION_RCOND:
+            return double_precision_decomposition(A, b)
+
+    # Stopping criterion used by LAPACK dsposv
+    tolerance = (
+        np.sqrt(A.shape[0]) * np.finfo(np.float64).eps
+        * np.max(np.sum(np.abs(A), axis=1)))
+
+    coeff = sp.linalg.cho_solve(
+        (factor, False), b.astype(np.float32)).astype(np.float64)
+
+    residual_norm = np.inf
+    for _ in range(max_iter):
+        residual = b - np.dot(A, coeff)
+        previous_norm = residual_norm
+        residual_norm = np.max(np.abs(residual))
+
+        if residual_norm <= tolerance * np.max(np.abs(coeff)):
+            return coeff
+        if residual_norm >= previous_norm:
+            break
+
+        coeff += sp.linalg.cho_solve(
+            (factor, False), residual.astype(np.float32))
+
+    return double_precision_decomposition(A, b)
+
+
+def double_precision_decomposition(A, b):
+    """
+    Solve equation Ax = b for symmetric A by Cholesky decomposition
+    if positive definite and well conditioned, or otherwise by eigen
+    decomposition, based on LAPACK condition number estimates
+
+    Parameters
+    ----------
+    A:  float, array_like; shape=(n_waves**2, n_waves**2)
+        Symmetric matrix
+    b:  float, array_like; shape=(n_waves**2)
+        Vector containing solutions to the linear algebra equation
+
+    Returns
+    -------
+    coeff:	array_like (float); shape=(n_waves**2)
+        Optimised surface coefficients
+    """
+    factor, rcond = cholesky_factor(A)
+    if rcond > CHOLESKY_RCOND:
+        return sp.linalg.cho_solve((factor, False), b)
+
+    return eigen_decomposition(A, b)
+
+
+def auto_decomposition(A, b):
+    """
+    Solve equation Ax = b for symmetric A, selecting the fastest
+    stable method based on LAPACK condition number estimates.
+
+    Large, well conditioned systems are solved in mixed precision;
+    positive definite systems otherwise by double precision Cholesky
+    decomposition; all remaining systems by eigen decomposition.
+
+    Parameters
+    ----------
+    A:  float, array_like; shape=(n_waves**2, n_waves**2)
+        Symmetric matrix
+    b:  float, array_like; shape=(n_waves**2)
+        Vector containing solutions to the linear algebra equation
+
+    Returns
+    -------
+    coeff:	array_like (float); shape=(n_waves**2)
+        Optimised surface coefficients
+    """
+    if A.shape[0] >= MIXED_PRECISION_SIZE:
+        return mixed_precision_decomposition(A, b)
+
+    return double_precision_decomposition(A, b)
+
+
+def woodbury_decomposition(fuv, zmol, area_diag, solver='auto'):
+    """
+    Solve equation (F F.T + D)x = F z for surface coefficients in
+    the space of pivots, using the Woodbury matrix identity
+
+        (F F.T + D)^-1 F = D^-1 F (I + F.T D^-1 F)^-1
+
+    Modes without any surface area penalty (D = 0, such as the
+    constant u = v = 0 wave) are eliminated beforehand by projecting
+    the pivot positions onto the complement of their waves. Requires
+    only an n_pivots x n_pivots system, which is far smaller than
+    the full n_waves**2 system when there are few pivots.
+
+    Parameters
+    ----------
+    fuv:  float, array_like; shape=(n_waves**2, n_pivots)
+        Wave products f(x, u, Lx).f(y, v, Ly) at each pivot
+    zmol:  float, array_like; shape=(n_pivots)
+        Pivot coordinates in z dimension
+    area_diag: float, array_like; shape=(n_waves**2, n_waves**2)
+        Surface area diagonal terms for A matrix
+    solver:  str, optional
+        Method used to solve pivot space system, see `solve_linear`
+
+    Returns
+    -------
+    coeff:	array_like (float); shape=(n_waves**2)
+        Optimised surface coefficients
+    """
+    diag = np.diag(area_diag)
+    free = diag <= 0
+    n_pivots = fuv.shape[1]
+
+    # Orthonormal basis of pivot space spanned by unpenalised waves
+    basis, _ = np.linalg.qr(fuv[free].T)
+
+    def project(vector):
+        return vector - np.dot(basis, np.dot(basis.T, vector))
+
+    scaled_fuv = fuv[~free] / diag[~free][:, None]
+    kernel = np.dot(fuv[~free].T, scaled_fuv)
+    kernel = project(project(kernel).T)
+
+    weights = solve_linear(
+        np.identity(n_pivots) + kernel, project(zmol), solver=solver)
+
+    coeff = np.zeros(diag.shape)
+    coeff[~free] = np.dot(scaled_fuv, project(weights))
+
+    # Unpenalised waves fit residual positions by least squares
+    if np.any(free):
+        residual = zmol - np.dot(coeff[~free], fuv[~free])
+        coeff[free] = np.linalg.lstsq(
+            fuv[free].T, residual, rcond=None)[0]
+
+    return coeff
+
+
+#: Minimum matrix size for which mixed precision is attempted
+MIXED_PRECISION_SIZE = 500
+
+#: Minimum reciprocal condition number for mixed precision refinement
+MIXED_PRECISION_RCOND = 1E3 * np.finfo(np.float32).eps
+
+#: Minimum reciprocal condition number for Cholesky decomposition
+CHOLESKY_RCOND = 1E2 * np.finfo(np.float64).eps
+
+#: Solvers available for linear algebra equation Ax = b
+SOLVERS = {
+    'lu': lu_decomposition,
+    'cholesky': cholesky_decomposition,
+    'eigen': eigen_decomposition,
+    'mixed': mixed_precision_decomposition,
+    'auto': auto_decomposition
+}
+
+
+def solve_linear(A, b, solver='auto'):
+    """
+    Solve equation Ax = b using chosen solver
+
+    Parameters
+    ----------
+    A:  float, array_like; shape=(n_waves**2, n_waves**2)
+        Matrix containing wave product weightings, plus any
+        surface area and curvature terms
+    b:  float, array_like; shape=(n_waves**2)
+        Vector containing solutions z.f(x, u, Lx).f(y, v, Ly)
+        to the linear algebra equation Ax = b
+    solver:  str, optional
+        One of 'auto', 'cholesky', 'eigen', 'mixed' or 'lu'
+
+    Returns
+    -------
+    coeff:	array_like (float); shape=(n_waves**2)
+        Optimised surface coefficients
+    """
+
+    assert solver in SOLVERS, (
+        f"Argument solver=={solver} must be one of {list(SOLVERS)}"
+    )
+
+    return SOLVERS[solver](A, b)
+
+
+def cholesky_update(factor, vectors, block=64):
+    """
+    Update upper triangular Cholesky factor R of matrix A = R.T R in
+    place, such that R.T R = A + V V.T for rank-k update matrix V.
+
+    The stacked matrix [R; V.T] is triangularised by Householder QR,
+    one block of columns at a time, requiring O(k n**2) operations
+    rather than the O(n**3) of a full factorisation.
+
+    Parameters
+    ----------
+    factor:  float, array_like; shape=(n, n)
+        Upper triangular Cholesky factor
+    vectors:  float, array_like; shape=(n, k)
+        Columns of rank-k update matrix V
+    block:  int, optional
+        Number of columns triangularised in each step
+
+    Returns
+    -------
+    factor:  float, array_like; shape=(n, n)
+        Updated upper triangular Cholesky factor
+    """
+    n_rows = factor.shape[0]
+    stack = np.array(vectors, dtype=factor.dtype).T.reshape(-1, n_rows)
+
+    for start in range(0, n_rows, block):
+        end = min(start + block, n_rows)
+        size = end - start
+
+        q, r = np.linalg.qr(
+            np.vstack([factor[start:end, start:end], stack[:, start:end]]),
+            mode='complete')
+        remainder = np.dot(
+            q.T, np.vstack([factor[start:end, end:], stack[:, end:]]))
+
+        # Change sign of rows to ensure positive diagonal
+        signs = np.where(np.diag(r) < 0, -1., 1.)[:, None]
+        factor[start:end, start:end] = signs * r[:size]
+        factor[start:end, end:] = signs * remainder[:size]
+        stack[:, end:] = remainder[size:]
+
+    return factor
+
+
+class IncrementalCholesky:
+    """Maintains a Cholesky factor of a symmetric positive definite
+    matrix that grows by low rank updates, such as A + area_diag as
+    new pivots are added during `self_consistent_cycle`.
+
+    The factor is refreshed by a full factorisation whenever the
+    relative residual of a solution exceeds the tolerance.
+    """
+
+    def __init__(self, tolerance=1E-10, solver='auto'):
+        """
+        Parameters
+        ----------
+        tolerance:  float, optional
+            Maximum relative residual |Ax - b| / (|A||x| + |b|) of a
+            solution before a full refactorisation is performed
+        solver:  str, optional
+            Fallback solver used when matrix is not positive definite,
+            see `solve_linear`
+        """
+        self.tolerance = tolerance
+        self.solver = solver
+        self.factor = None
+        self.n_refactor = 0
+
+    def refactorise(self, matrix):
+        """Perform full Cholesky factorisation of matrix"""
+        self.factor, _ = cholesky_factor(matrix)
+        self.n_refactor += 1
+
+    def update(self, vectors):
+        """Apply rank-k update V V.T, where vectors contains the
+        columns of V"""
+        if self.factor is not None and np.size(vectors) > 0:
+            cholesky_update(self.factor, vectors)
+
+    def residual(self, matrix, b, coeff):
+        """Return relative residual of solution to matrix.x = b"""
+        residual = np.max(np.abs(b - np.dot(matrix, coeff)))
+        scale = (
+            np.max(np.sum(np.abs(matrix), axis=1)) * np.max(np.abs(coeff))
+            + np.max(np.abs(b)))
+
+        return residual / scale if scale > 0 else residual
+
+    def solve(self, matrix, b):
+        """
+        Solve matrix.x = b using current factor, refactorising if
+        required
+
+        Parameters
+        ----------
+        matrix:  float, array_like; shape=(n, n)
+            Current symmetric positive definite matrix, including all
+            updates applied to the factor
+        b:  float, array_like; shape=(n)
+            Vector containing solutions to the linear algebra equation
+
+        Returns
+        -------
+        coeff:	array_like (float); shape=(n)
+            Optimised surface coefficients
+        """
+        if self.factor is not None:
+            coeff = sp.linalg.cho_solve((self.factor, False), b)
+            if self.residual(matrix, b, coeff) <= self.tolerance:
+                return coeff
+
+        self.refactorise(matrix)
+        if self.factor is None:
+            return solve_linear(matrix, b, solver=self.solver)
+
+        return sp.linalg.cho_solve((self.factor, False), b)
@@ -0,0 +1,104 @@
+import os
+from collections import deque, namedtuple
+from contextlib import contextmanager
+import multiprocessing
+
+BLAS_THREAD_VARIABLES = [
+    'OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+    'BLIS_NUM_THREADS', 'VECLIB_MAXIMUM_THREADS', 'NUMEXPR_NUM_THREADS'
+]
+
+
+# Positional and keyword arguments of a function call, where
+# kwargs of None are taken as no keyword arguments
+Call = namedtuple('Call', ['args', 'kwargs'])
+Call.__new__.__defaults__ = (None,)
+
+
+def worker_threads(jobs):
+    """Returns number of BLAS threads available to each of jobs
+    worker processes without oversubscribing available cores"""
+    return max(1, (os.cpu_count() or 1) // jobs)
+
+
+@contextmanager
+def blas_threads(n_threads):
+    """
+    Context manager capping the number of threads used by BLAS
+    libraries in any processes started within it. Caps are passed
+    through environment variables, which are read when each process
+    first loads its BLAS library.
+
+    Parameters
+    ----------
+    n_threads:  int
+        Maximum number of threads per process
+    """
+    original = {
+        variable: os.environ.get(variable)
+        for variable in BLAS_THREAD_VARIABLES
+    }
+    os.environ.update({
+        variable: str(n_threads) for variable in BLAS_THREAD_VARIABLES
+    })
+
+    try:
+        yield
+    finally:
+        for variable, value in original.items():
+            if value is None:
+                os.environ.pop(variable)
+            else:
+                os.environ[variable] = value
+
+
+def ordered_map(function, arguments, jobs=1, buffer=2):
+    """
+    Generator yielding function(*args, **kwargs) for each Call in
+    arguments, in order. When jobs > 1, calls are spread across a
+    pool of freshly spawned worker processes, each with BLAS threads
+    capped to share the available cores, and at most buffer * jobs
+    calls are queued at once so that arguments can be produced lazily.
+
+    Parameters
+    ----------
+    function:  callable
+        Module level function, so that it may be sent to workers
+    arguments:  iterable of Call or tuple
+        Arguments of each call, where tuples are taken as positional
+        arguments only
+    jobs:  int, optional
+        Number of worker processes (default=1, run in serial)
+    buffer:  int, optional
+        Number of queued calls per worker
+
+    Yields
+    ------
+    result:
+        Return value of each call, in order of arguments
+    """
+
+    arguments = (
+        (call.args, call.kwargs or {})
+        for call in (
+            args if isinstance(args, Call) else Call(args)
+            for args in arguments)
+    )
+
+    if jobs <= 1:
+        for args, kwargs in arguments:
+            yield function(*args, **kwargs)
+        return
+
+    context = multiprocessing.get_context('spawn')
+
+    with blas_threads(worker_threads(jobs)):
+        with context.Pool(jobs) as pool:
+            pending = deque()
+            for args, kwargs in arguments:
+                pending.append(pool.apply_async(function, args, kwargs))
+                if len(pending) >= buffer * jobs:
+                    yield pending.popleft().get()
+
+            while pending:
+                yield pending.popleft().get()
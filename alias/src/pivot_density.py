@@ -4,19 +4,14 @@ import sys
 import numpy as np
 import tables
 
-from alias.io.hdf5_io import (
-    make_hdf5,
-    frame_check_hdf5,
-    mode_check_hdf5,
-    load_hdf5,
-    save_hdf5
-)
+from alias.io.hdf5_io import AliasStore
 from alias.io.numpy_io import load_npy
 from alias.src.intrinsic_sampling_method import build_surface
-from alias.src.utilities import create_surface_file_path
+from alias.src.utilities import (
+    create_results_file_path, results_parameters)
 
 
-def pivot_diffusion(file_name, surface_dir, mol_traj, cell_dim, mol_vec,
+def pivot_diffusion(file_name, directory, mol_traj, cell_dim, mol_vec,
                     surf_param, n_frame=20):
 
     print("Density Coefficient = {}".format(surf_param.pivot_density))
@@ -25,62 +20,66 @@ def pivot_diffusion(file_name, surface_dir, mol_traj, cell_dim, mol_vec,
     tot_piv_n1 = np.zeros((n_frame, surf_param.n_pivots), dtype=int)
     tot_piv_n2 = np.zeros((n_frame, surf_param.n_pivots), dtype=int)
 
-    coeff_file_name = create_surface_file_path(
-        file_name, surface_dir, surf_param.q_m,
-        surf_param.n_pivots, surf_param.phi,
-        surf_param.n_frames, surf_param.recon
-    )
-
-    if not os.path.exists(coeff_file_name + '_coeff.hdf5'):
-        make_hdf5(coeff_file_name + '_coeff',
-                  (2, surf_param.n_waves ** 2), tables.Float64Atom())
-        make_hdf5(coeff_file_name + '_pivot',
-                  (2, surf_param.n_pivots), tables.Int64Atom())
-
-    for frame in range(n_frame):
-        dim = cell_dim[frame]
-
-        "Checking number of frames in coeff and pivot files"
-        frame_check_coeff = frame_check_hdf5(
-            coeff_file_name + '_coeff', frame)
-        frame_check_pivot = frame_check_hdf5(
-            coeff_file_name + '_pivot', frame)
-
-        mode_coeff = mode_check_hdf5(frame_check_coeff)
-        mode_pivot = mode_check_hdf5(frame_check_pivot)
-
-        if not mode_coeff and not mode_pivot:
-            pivot = load_hdf5(coeff_file_name + '_pivot', frame)
-        else:
-            sys.stdout.write(
-                f"Optimising Intrinsic Surface coefficients:"
-                f" frame {frame}\n")
-            sys.stdout.flush()
-
-            if frame == 0:
-                surf_0 = [-dim[2] / 4, dim[2] / 4]
+    results_file = create_results_file_path(file_name, directory)
+
+    with AliasStore() as store:
+        group = store.parameter_group(
+            results_file, **results_parameters(
+                surf_param.q_m, surf_param.n_pivots, surf_param.phi,
+                surf_param.recon, surf_param.q_cutoff))
+        coeff_node = group + '/coeff'
+        pivot_node = group + '/pivot'
+
+        if not store.exists(results_file, coeff_node):
+            store.create(results_file, (2, surf_param.n_waves ** 2),
+                         tables.Float64Atom(), surf_param.n_frames,
+                         node=coeff_node)
+            store.create(results_file, (2, surf_param.n_pivots),
+                         tables.Int64Atom(), surf_param.n_frames,
+                         node=pivot_node)
+
+        for frame in range(n_frame):
+            dim = cell_dim[frame]
+
+            "Checking number of frames in coeff and pivot datasets"
+            mode_coeff = store.mode(results_file, frame, node=coeff_node)
+            mode_pivot = store.mode(results_file, frame, node=pivot_node)
+
+            if not mode_coeff and not mode_pivot:
+                pivot = store.load(results_file, frame, node=pivot_node)
             else:
-                index = (2 * surf_param.q_m + 1) ** 2 / 2
-                coeff = load_hdf5(coeff_file_name + '_coeff', frame - 1)
-                surf_0 = [coeff[0][index], coeff[1][index]]
-
-            coeff, pivot = build_surface(
-                mol_traj[frame, :, 0],
-                mol_traj[frame, :, 1],
-                mol_traj[frame, :, 2],
-                dim, surf_param.q_m, surf_param.n_pivots, surf_param.phi,
-                surf_param.tau, surf_param.max_r,
-                ncube=surf_param.n_cube, vlim=surf_param.v_lim,
-                recon=surf_param.recon, surf_0=surf_0,
-                zvec=mol_vec[frame, :, 2])
-
-            save_hdf5(
-                coeff_file_name + '_coeff', coeff, frame, mode_coeff)
-            save_hdf5(
-                coeff_file_name + '_pivot', pivot, frame, mode_pivot)
-
-        tot_piv_n1[frame] += pivot[0]
-        tot_piv_n2[frame] += pivot[1]
+                sys.stdout.write(
+                    f"Optimising Intrinsic Surface coefficients:"
+                    f" frame {frame}\n")
+                sys.stdout.flush()
+
+                if frame == 0:
+                    surf_0 = [-dim[2] / 4, dim[2] / 4]
+                else:
+                    index = (2 * surf_param.q_m + 1) ** 2 / 2
+                    coeff = store.load(
+                        results_file, frame - 1, node=coeff_node)
+                    surf_0 = [coeff[0][index], coeff[1][index]]
+
+                coeff, pivot = build_surface(
+                    mol_traj[frame, :, 0],
+                    mol_traj[frame, :, 1],
+                    mol_traj[frame, :, 2],
+                    dim, surf_param.q_m, surf_param.n_pivots,
+                    surf_param.phi, surf_param.tau, surf_param.max_r,
+                    ncube=surf_param.n_cube, vlim=surf_param.v_lim,
+                    recon=surf_param.recon, surf_0=surf_0,
+                    zvec=mol_vec[frame, :, 2], q_max=surf_param.q_cutoff)
+
+                store.save(
+                    results_file, coeff, frame, mode_coeff,
+                    node=coeff_node)
+                store.save(
+                    results_file, pivot, frame, mode_pivot,
+                    node=pivot_node)
+
+            tot_piv_n1[frame] += pivot[0]
+            tot_piv_n2[frame] += pivot[1]
 
     ex_1, ex_2 = mol_exchange(tot_piv_n1, tot_piv_n2)
 
@@ -115,14 +114,10 @@ def optimise_pivot_diffusion(file_name, directory, surf_param,
     """
 
     pos_dir = os.path.join(directory, 'pos')
-    surface_dir = os.path.join(directory, 'surface')
 
     if surf_param.n_frames < n_frame:
         n_frame = surf_param.n_frames
 
-    if not os.path.exists(surface_dir):
-        os.mkdir(surface_dir)
-
     pos_file_name = os.path.join(pos_dir, file_name)
     mol_traj = load_npy(
         pos_file_name + f'{surf_param.n_frames}_mol_traj',
@@ -157,7 +152,7 @@ def optimise_pivot_diffusion(file_name, directory, surf_param,
         density_array.append(surf_param.pivot_density)
 
         ex_1, ex_2 = pivot_diffusion(
-            file_name, surface_dir, mol_traj, cell_dim, mol_vec,
+            file_name, directory, mol_traj, cell_dim, mol_vec,
             surf_param, n_frame=n_frame
         )
 
@@ -200,27 +195,28 @@ def optimise_pivot_diffusion(file_name, directory, surf_param,
           f" = |{step_size}| < {precision}\n")
     print("Optimal number of pivots = {}".format(surf_param.n_pivots))
 
-    remove_unwanted_files(file_name, surface_dir, density_array, surf_param)
+    remove_unwanted_files(file_name, directory, density_array, surf_param)
 
 
-def remove_unwanted_files(file_name, surface_dir, density_array, surf_param):
+def remove_unwanted_files(file_name, directory, density_array, surf_param):
 
-    for density in density_array:
+    results_file = create_results_file_path(file_name, directory)
 
-        if density != surf_param.pivot_density:
+    with AliasStore() as store:
+        for density in density_array:
 
-            n_pivots = int(
-                surf_param.area * density
-                / surf_param.mol_sigma ** 2)
+            if density != surf_param.pivot_density:
 
-            coeff_file_name = create_surface_file_path(
-                file_name, surface_dir, surf_param.q_m,
-                n_pivots, surf_param.phi,
-                surf_param.n_frames, surf_param.recon
-            )
+                n_pivots = int(
+                    surf_param.area * density
+                    / surf_param.mol_sigma ** 2)
 
-            os.remove(coeff_file_name + '_coeff.hdf5')
-            os.remove(coeff_file_name + '_pivot.hdf5')
+                group = store.find_group(
+                    results_file, **results_parameters(
+                        surf_param.q_m, n_pivots, surf_param.phi,
+                        surf_param.recon, surf_param.q_cutoff))
+                if group is not None:
+                    store.remove(results_file, group)
 
 
 def mol_exchange(piv_1, piv_2):
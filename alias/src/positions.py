@@ -1,8 +1,15 @@
+import logging
+
 import mdtraj as md
 import numpy as np
 
+from alias.io.numpy_io import NpyFrameWriter, load_npy
+from alias.src.cell_list import CellList
+from alias.src.parallel import ordered_map, Call
 from alias.src.utilities import unit_vector
 
+log = logging.getLogger(__name__)
+
 
 def molecular_positions(
         atom_coord,
@@ -125,11 +132,10 @@ def coordinate_arrays(traj, atoms, masses, mode='molecule',
     trajectory"""
 
     atom_traj = traj.xyz * 10
-    mol_traj = np.empty((0, traj.n_residues, 3))
+    mol_traj = np.empty((traj.n_frames, traj.n_residues, 3))
 
     for index, atom_coord in enumerate(atom_traj):
-
-        mol_coord = molecular_positions(
+        mol_traj[index] = molecular_positions(
             atom_coord,
             atoms,
             masses,
@@ -137,9 +143,6 @@ def coordinate_arrays(traj, atoms, masses, mode='molecule',
             com_sites=com_sites
         )
 
-        mol_traj = np.concatenate([
-            mol_traj, np.expand_dims(mol_coord, 0)])
-
     return mol_traj
 
 
@@ -182,10 +185,166 @@ def orientation(traj, center_atom, vector_atoms):
     return u_vectors
 
 
+#: Suffixes of npy files containing outputs of batch_coordinate_loader
+COORDINATE_NAMES = ['mol_traj', 'com_traj', 'cell_dim', 'mol_vec']
+
+
+def trajectory_n_frames(trajectory):
+    """Returns number of frames in trajectory file as given by its
+    header, or None if this is not available without decoding the
+    whole trajectory"""
+    try:
+        with md.open(trajectory) as traj_file:
+            return len(traj_file)
+    except (IOError, TypeError, ValueError, NotImplementedError):
+        return None
+
+
+def frame_range_readable(trajectory):
+    """Returns whether trajectory file can be opened by mdtraj, seek
+    to a given frame and read frames from there, as required by
+    `parallel_coordinate_loader`"""
+    try:
+        with md.open(trajectory) as traj_file:
+            file_type = type(traj_file)
+            if not (hasattr(file_type, 'seek')
+                    and hasattr(file_type, 'read_as_traj')):
+                return False
+            # Formats with frame offsets can seek once these are known
+            if not hasattr(file_type, 'offsets'):
+                traj_file.seek(0)
+    except (IOError, TypeError, ValueError, NotImplementedError):
+        return False
+
+    return True
+
+
+def trajectory_index(trajectory, file_path=None):
+    """
+    Returns number of frames in trajectory file and, for formats such
+    as XTC that can only seek to a frame once the byte offsets of all
+    frames are known, the offsets of each frame. Obtaining offsets
+    requires a pass through the whole file, so they are stored in a
+    npy file to be reused if file_path is given.
+
+    Parameters
+    ----------
+    trajectory:  str
+        Path to trajectory file
+    file_path:  str, optional
+        Path name prefix of npy file to store offsets, with suffix
+        '_offsets'
+
+    Returns
+    -------
+    n_frames:  int
+        Number of frames in trajectory
+    offsets:  int, array_like; shape=(n_frames)
+        Byte offset of each frame in trajectory file, or None if
+        not required
+    """
+
+    with md.open(trajectory) as traj_file:
+        # Offsets property scans the whole file when read, so its
+        # presence is checked on the file type instead
+        if not hasattr(type(traj_file), 'offsets'):
+            return len(traj_file), None
+
+        if file_path is not None:
+            try:
+                offsets = np.array(load_npy(f'{file_path}_offsets'))
+                return offsets.size, offsets
+            except (FileNotFoundError, IOError):
+                pass
+
+        offsets = np.asarray(traj_file.offsets)
+
+    if file_path is not None:
+        np.save(f'{file_path}_offsets', offsets)
+
+    return offsets.size, offsets
+
+
+def coordinate_reduction(surface_parameters, topology):
+    """
+    Returns indices of atoms in trajectory that need to be decoded
+    and keyword arguments of `reduce_coordinates` for the surface
+    forming molecules described by surface_parameters
+
+    Parameters
+    ----------
+    surface_parameters:  instance of SurfaceParameters
+        Parameters for intrinsic surface
+    topology:  mdtraj.Topology
+        Topology of trajectory, see `mdtraj.load_topology`
+
+    Returns
+    -------
+    atom_indices:  int, array_like
+        Indices of atoms in surface forming molecules, as well as any
+        others used to calculate the centre of mass of the system
+    reduction:  dict
+        Keyword arguments of `reduce_coordinates`
+    """
+
+    selection = np.asarray(surface_parameters.atom_indices)
+    com_indices = np.asarray(surface_parameters.com_indices)
+    atom_indices = np.union1d(selection, com_indices)
+
+    com_masses = np.array([
+        topology.atom(index).element.mass for index in com_indices])
+
+    reduction = dict(
+        selection=np.searchsorted(atom_indices, selection),
+        com_indices=np.searchsorted(atom_indices, com_indices),
+        com_masses=com_masses,
+        atoms=surface_parameters.atoms,
+        masses=np.repeat(
+            surface_parameters.masses, surface_parameters.n_mols),
+        com_mode=surface_parameters.com_mode,
+        com_sites=surface_parameters.com_sites,
+        center_atom=surface_parameters.center_atom,
+        vector_atoms=surface_parameters.vector_atoms
+    )
+
+    return atom_indices, reduction
+
+
+def reduce_coordinates(traj, selection, com_indices, com_masses,
+                       atoms, masses, com_mode='molecule',
+                       com_sites=None, center_atom=None,
+                       vector_atoms=None):
+    """Returns molecular positions, centre of mass of system, cell
+    dimensions and molecular orientations for each frame in traj,
+    containing atoms given by `coordinate_reduction`"""
+
+    cell_dim = traj.unitcell_lengths * 10
+    com_traj = 10 * np.einsum(
+        'i,fij->fj', com_masses, traj.xyz[:, com_indices]
+    ) / com_masses.sum()
+
+    if selection.size < traj.n_atoms:
+        traj = traj.atom_slice(selection)
+    mol_traj = coordinate_arrays(
+        traj, atoms, masses, mode=com_mode, com_sites=com_sites)
+
+    mol_vec = orientation(traj, center_atom, vector_atoms)
+
+    return mol_traj, com_traj, cell_dim, mol_vec
+
+
 def batch_coordinate_loader(
-        trajectory, surface_parameters, topology=None, chunk=500):
+        trajectory, surface_parameters, topology=None, chunk=500,
+        file_path=None, jobs=1):
     """Generates molecular positions and centre of mass for each frame
 
+    Only atoms in the surface forming molecules, and those used to
+    calculate the centre of mass of the system, are decoded from the
+    trajectory. Each chunk loaded by mdtraj is written into arrays
+    preallocated for the whole trajectory. If file_path is given,
+    these arrays are npy files on disk that are streamed into chunk by
+    chunk, so that the trajectory need not fit in memory.
+
     Parameters
     ----------
     trajectory:  str
@@ -196,38 +355,261 @@ def batch_coordinate_loader(
         Path to topology file
     chunk  int, optional
         Maximum chunk size for mdtraj batch loading
-    """
-    mol_traj = np.empty((0, surface_parameters.n_mols, 3))
-    mol_vec = np.empty((0, surface_parameters.n_mols, 3))
-    com_traj = np.empty((0, 3))
-    cell_dim = np.zeros((0, 3))
+    file_path:  str, optional
+        Path name prefix of npy files to stream output into, with
+        suffixes '_mol_traj', '_com_traj', '_cell_dim' and '_mol_vec'
+    jobs:  int, optional
+        Number of worker processes to decode trajectory with if
+        file_path is given, see `parallel_coordinate_loader`
 
-    masses = np.repeat(
-        surface_parameters.masses, surface_parameters.n_mols)
+    Returns
+    -------
+    mol_traj:  float, array_like; shape=(nframe, nmol, 3)
+        Molecular positions
+    com_traj:  float, array_like; shape=(nframe, 3)
+        Centre of mass of system
+    cell_dim:  float, array_like; shape=(nframe, 3)
+        Cell dimensions
+    mol_vec:  float, array_like; shape=(nframe, nmol, 3)
+        Orientational unit vector of each molecule
+    """
+    if jobs > 1 and file_path is not None:
+        if frame_range_readable(trajectory):
+            return parallel_coordinate_loader(
+                trajectory, surface_parameters, file_path,
+                topology=topology, chunk=chunk, jobs=jobs)
+        log.info('Trajectory %s cannot be read by frame range, '
+                 'loading in serial', trajectory)
+
+    n_frames = trajectory_n_frames(trajectory)
+    n_mols = surface_parameters.n_mols
+    frame_shapes = [(n_mols, 3), (3,), (3,), (n_mols, 3)]
+
+    if file_path is None:
+        outputs = [
+            _ArrayFrameWriter(shape, n_frames) for shape in frame_shapes]
+    else:
+        outputs = [
+            NpyFrameWriter(f'{file_path}_{name}', shape, n_frames)
+            for name, shape in zip(COORDINATE_NAMES, frame_shapes)]
+
+    atom_indices, reduction = coordinate_reduction(
+        surface_parameters, md.load_topology(topology or trajectory))
 
     for index, traj in enumerate(
-            md.iterload(trajectory, chunk=chunk, top=topology)):
+            md.iterload(trajectory, chunk=chunk, top=topology,
+                        atom_indices=atom_indices)):
+        for output, array in zip(
+                outputs, reduce_coordinates(traj, **reduction)):
+            output.write(array)
+
+    for output in outputs:
+        output.close()
 
-        cell_dim_chunk = traj.unitcell_lengths * 10
-        com_chunk = md.compute_center_of_mass(traj) * 10
+    if file_path is None:
+        return tuple(output.array for output in outputs)
 
-        traj = traj.atom_slice(surface_parameters.atom_indices)
-        mol_chunk = coordinate_arrays(
-            traj, surface_parameters.atoms, masses,
-            mode=surface_parameters.com_mode,
-            com_sites=surface_parameters.com_sites)
+    return tuple(
+        load_npy(f'{file_path}_{name}') for name in COORDINATE_NAMES)
 
-        mol_traj = np.concatenate([mol_traj, mol_chunk])
-        com_traj = np.concatenate([com_traj, com_chunk])
-        cell_dim = np.concatenate([cell_dim, cell_dim_chunk])
 
-        vec_chunk = orientation(
-            traj, surface_parameters.center_atom,
-            surface_parameters.vector_atoms
+def parallel_coordinate_loader(
+        trajectory, surface_parameters, file_path, topology=None,
+        chunk=500, jobs=2):
+    """
+    Generates molecular positions and centre of mass for each frame,
+    decoding separate ranges of frames in each of jobs worker
+    processes. Each worker writes its range into disjoint slices of
+    npy files preallocated for the whole trajectory.
+
+    Parameters
+    ----------
+    trajectory:  str
+        Path to trajectory file, in a format that can be opened by
+        `mdtraj.open` and seek to a given frame
+    surface_parameters:  instance of SurfaceParameters
+        Parameters for intrinsic surface
+    file_path:  str
+        Path name prefix of npy files to write output into, with
+        suffixes '_mol_traj', '_com_traj', '_cell_dim' and '_mol_vec',
+        as well as '_offsets' for the frame offsets of formats that
+        require them
+    topology:  str, optional
+        Path to topology file
+    chunk  int, optional
+        Maximum number of frames decoded at once by each worker
+    jobs:  int, optional
+        Number of worker processes
+
+    Returns
+    -------
+    mol_traj:  float, array_like; shape=(nframe, nmol, 3)
+        Molecular positions
+    com_traj:  float, array_like; shape=(nframe, 3)
+        Centre of mass of system
+    cell_dim:  float, array_like; shape=(nframe, 3)
+        Cell dimensions
+    mol_vec:  float, array_like; shape=(nframe, nmol, 3)
+        Orientational unit vector of each molecule
+    """
+
+    n_frames, offsets = trajectory_index(trajectory, file_path)
+    n_mols = surface_parameters.n_mols
+    frame_shapes = [(n_mols, 3), (3,), (3,), (n_mols, 3)]
+
+    for name, shape in zip(COORDINATE_NAMES, frame_shapes):
+        np.lib.format.open_memmap(
+            f'{file_path}_{name}.npy', mode='w+',
+            shape=(n_frames,) + shape).flush()
+
+    topology = md.load_topology(topology or trajectory)
+    atom_indices, reduction = coordinate_reduction(
+        surface_parameters, topology)
+
+    # Split trajectory into more frame ranges than workers to balance
+    # load between them
+    n_ranges = min(n_frames, 4 * jobs)
+    bounds = np.linspace(0, n_frames, n_ranges + 1).astype(int)
+
+    for _ in ordered_map(
+            load_coordinate_range,
+            (Call((trajectory, topology, start, stop, file_path),
+                  dict(offsets=offsets, chunk=chunk,
+                       atom_indices=atom_indices, reduction=reduction))
+             for start, stop in zip(bounds[:-1], bounds[1:])),
+            jobs=jobs):
+        pass
+
+    return tuple(
+        load_npy(f'{file_path}_{name}') for name in COORDINATE_NAMES)
+
+
+def load_coordinate_range(trajectory, topology, start, stop, file_path,
+                          offsets=None, chunk=500, atom_indices=None,
+                          reduction=None):
+    """Decodes frames start to stop of trajectory and writes their
+    reduced coordinates into the corresponding slices of npy files
+    preallocated by `parallel_coordinate_loader`"""
+
+    outputs = [
+        np.load(f'{file_path}_{name}.npy', mmap_mode='r+')
+        for name in COORDINATE_NAMES]
+
+    with md.open(trajectory) as traj_file:
+        if offsets is not None:
+            traj_file.offsets = offsets
+        traj_file.seek(start)
+
+        for index in range(start, stop, chunk):
+            traj = traj_file.read_as_traj(
+                topology, n_frames=min(chunk, stop - index),
+                atom_indices=atom_indices)
+
+            for output, array in zip(
+                    outputs, reduce_coordinates(traj, **reduction)):
+                output[index:index + traj.n_frames] = array
+
+    for output in outputs:
+        output.flush()
+
+
+class _ArrayFrameWriter:
+    """In memory counterpart to NpyFrameWriter, filling an array
+    preallocated for n_frames frames and extending it if required"""
+
+    def __init__(self, frame_shape, n_frames=None, grow=1024):
+        self.n_frames = 0
+        self.grow = grow
+        self._array = np.empty((n_frames or 0,) + tuple(frame_shape))
+
+    @property
+    def array(self):
+        return self._array[:self.n_frames]
+
+    def write(self, frames):
+        end = self.n_frames + frames.shape[0]
+        if end > self._array.shape[0]:
+            array = np.empty(
+                (max(end, self._array.shape[0] + self.grow,
+                     2 * self._array.shape[0]),)
+                + self._array.shape[1:])
+            array[:self.n_frames] = self.array
+            self._array = array
+
+        self._array[self.n_frames:end] = frames
+        self.n_frames = end
+
+    def close(self):
+        pass
+
+
+def pivot_neighbour_counts(cell_list, shift, chunk=1024):
+    """
+    Returns number of binned pivots within the cutoff of each pivot,
+    at both its current position and when shifted along z. Neighbours
+    are found from the cell list where it excludes most pairs of
+    pivots, otherwise the matrix of pivot separations is built in
+    blocks of rows
+
+    Parameters
+    ----------
+    cell_list:  CellList
+        Cell list of pivot molecules, with cutoff equal to maximum
+        distance between neighbours
+    shift:  float
+        Shift of pivot positions along z
+    chunk:  int, optional
+        Number of pivots per block of rows
+
+    Returns
+    -------
+    neighbour_count:  int, array_like; shape=(n0)
+        Number of neighbours of each pivot at current position
+    neighbour_count_flip:  int, array_like; shape=(n0)
+        Number of neighbours of each pivot at shifted position
+    """
+
+    pivot = cell_list.indices
+    dim = cell_list.dim
+    x_pivot = cell_list.xmol[pivot]
+    y_pivot = cell_list.ymol[pivot]
+    z_pivot = cell_list.zmol[pivot]
+
+    if is_sparse(cell_list):
+        return (
+            cell_list.neighbour_counts(x=x_pivot, y=y_pivot, z=z_pivot),
+            cell_list.neighbour_counts(
+                x=x_pivot, y=y_pivot, z=z_pivot + shift)
         )
-        mol_vec = np.concatenate([mol_vec, vec_chunk])
 
-    return mol_traj, com_traj, cell_dim, mol_vec
+    neighbour_count = np.zeros(pivot.size, dtype=int)
+    neighbour_count_flip = np.zeros(pivot.size, dtype=int)
+
+    for start in range(0, pivot.size, chunk):
+        block = slice(start, start + chunk)
+
+        dr2 = x_pivot - x_pivot[block, None]
+        dr2 -= dim[0] * np.rint(dr2 / dim[0])
+        dr2 *= dr2
+        dy = y_pivot - y_pivot[block, None]
+        dy -= dim[1] * np.rint(dy / dim[1])
+        dr2 += dy * dy
+        dz = z_pivot - z_pivot[block, None]
+
+        neighbour_count[block] = np.count_nonzero(
+            dr2 + dz * dz < cell_list.cutoff**2, axis=1)
+        dz -= shift
+        neighbour_count_flip[block] = np.count_nonzero(
+            dr2 + dz * dz < cell_list.cutoff**2, axis=1)
+
+    return neighbour_count, neighbour_count_flip
+
+
+def is_sparse(cell_list):
+    """Returns whether neighbour searches in cell_list exclude enough
+    binned molecules to outweigh the cost of generating pairs from
+    each cell, compared to a dense search"""
+    return 8 * cell_list.offsets.shape[1] < np.prod(cell_list.n_cells)
 
 
 def check_pbc(xmol, ymol, zmol, pivots, dim, max_r=30):
@@ -236,6 +618,19 @@ def check_pbc(xmol, ymol, zmol, pivots, dim, max_r=30):
     to ensure most appropriate position along is used wrt each
     surface.
 
+    Each pivot is shifted by one cell length along z if that gives it
+    more neighbouring pivots within max_r, considering pivots in
+    order over two passes so that each decision sees all previous
+    shifts. Neighbour counts at the current and shifted positions of
+    all pivots are obtained at once, and then updated for subsequent
+    pivots near each shift as it is made.
+
+    Separations along x and y follow the minimum image convention for
+    any coordinates, including those unwrapped by more than one cell
+    length. Previous versions only reduced separations by a single
+    cell length, which is equivalent for coordinates wrapped into the
+    simulation cell.
+
     Parameters
     ----------
     xmol:  float, array_like; shape=(nmol)
@@ -258,30 +653,53 @@ def check_pbc(xmol, ymol, zmol, pivots, dim, max_r=30):
         appropriate PBC
     """
 
-    # Create pivot map
     for index_i, pivot in enumerate(pivots):
-        p_map = np.isin(np.arange(zmol.size), pivot)
+        pivot = np.asarray(pivot, dtype=int)
+        shift = dim[2] * np.array([1, -1])[index_i]
 
         for check in range(2):
-            for index_j, n in enumerate(pivot):
-
-                dxyz = np.stack(
-                    (xmol[p_map] - xmol[n],
-                     ymol[p_map] - ymol[n],
-                     zmol[p_map] - zmol[n])
-                )
-                for index_k, l in enumerate(dim[:2]):
-                    dxyz[index_k] -= l * np.array(
-                        2 * dxyz[index_k] / l, dtype=int)
-
-                dr2 = np.sum(dxyz**2, axis=0)
-                neighbour_count = np.count_nonzero(dr2 < max_r**2)
-
-                dxyz[2] += dim[2] * np.array([-1, 1])[index_i]
-                dr2 = np.sum(dxyz**2, axis=0)
-                neighbour_count_flip = np.count_nonzero(dr2 < max_r**2)
-
-                if neighbour_count_flip > neighbour_count:
-                    zmol[n] += dim[2] * np.array([1, -1])[index_i]
+            # Shifts along z retain the cell of each pivot, so cell
+            # list remains valid throughout each pass
+            cell_list = CellList(
+                xmol, ymol, zmol, dim, max_r, indices=pivot)
+            sparse = is_sparse(cell_list)
+            neighbour_count, neighbour_count_flip = pivot_neighbour_counts(
+                cell_list, shift)
+
+            index_j = 0
+            while True:
+                flips = np.flatnonzero(
+                    neighbour_count_flip[index_j:]
+                    > neighbour_count[index_j:])
+                if flips.size == 0:
+                    break
+                index_j += flips[0]
+                n = pivot[index_j]
+
+                # Move contribution of shifted pivot to neighbour
+                # counts of subsequent pivots
+                if sparse:
+                    local = cell_list.local_candidates(
+                        xmol[n], ymol[n], zmol[n])
+                    local = local[local > index_j]
+                else:
+                    local = np.arange(index_j + 1, pivot.size)
+
+                dx = xmol[pivot[local]] - xmol[n]
+                dx -= dim[0] * np.rint(dx / dim[0])
+                dy = ymol[pivot[local]] - ymol[n]
+                dy -= dim[1] * np.rint(dy / dim[1])
+                dr2 = dx * dx + dy * dy
+                dz = zmol[n] - zmol[pivot[local]]
+
+                for count, dz_local in zip(
+                        [neighbour_count, neighbour_count_flip],
+                        [dz, dz - shift]):
+                    count[local] += (
+                        (dr2 + (dz_local + shift)**2 < max_r**2).astype(int)
+                        - (dr2 + dz_local**2 < max_r**2))
+
+                zmol[n] += shift
+                index_j += 1
 
     return zmol
@@ -89,14 +89,11 @@ def run_alias(trajectory, alias_options, checkpoint=None, topology=None):
     except (FileNotFoundError, IOError):
 
         mol_traj, com_traj, cell_dim, mol_vec = batch_coordinate_loader(
-            trajectory, surf_param, topology=topology
+            trajectory, surf_param, topology=topology,
+            file_path=pos_file_name + f'{surf_param.n_frames}',
+            jobs=alias_options.jobs
         )
 
-        np.save(pos_file_name + f'{surf_param.n_frames}_mol_traj', mol_traj)
-        np.save(pos_file_name + f'{surf_param.n_frames}_mol_vec', mol_vec)
-        np.save(pos_file_name + f'{surf_param.n_frames}_com_traj', com_traj)
-        np.save(pos_file_name + f'{surf_param.n_frames}_cell_dim', cell_dim)
-
     surf_param.select_mol_sigma()
     checkfile = surf_param.serialize()
     save_checkfile(checkfile, checkpoint)
@@ -145,7 +142,14 @@ def run_alias(trajectory, alias_options, checkpoint=None, topology=None):
         vlim=surf_param.v_lim, tau=surf_param.tau,
         max_r=surf_param.max_r,
         ow_coeff=alias_options.ow_coeff,
-        ow_recon=alias_options.ow_recon)
+        ow_recon=alias_options.ow_recon,
+        jobs=alias_options.jobs,
+        warm_start=alias_options.warm_start,
+        q_max=surf_param.q_cutoff,
+        assembly=alias_options.assembly,
+        solver=alias_options.solver,
+        incremental=alias_options.incremental,
+        coarse_to_fine=alias_options.coarse_to_fine)
 
     create_intrinsic_positions_dxdyz(
         data_dir, file_name, surf_param.n_mol,
@@ -153,7 +157,12 @@ def run_alias(trajectory, alias_options, checkpoint=None, topology=None):
         surf_param.n_pivots, surf_param.phi,
         mean_cell_dim,
         recon=surf_param.recon,
-        ow_pos=alias_options.ow_intpos)
+        ow_pos=alias_options.ow_intpos,
+        q_max=surf_param.q_cutoff,
+        dtype=surf_param.pos_dtype,
+        precision=surf_param.pos_precision,
+        complib=surf_param.pos_complib,
+        qu_list=surf_param.pos_resolutions)
 
     create_intrinsic_den_curve_hist(
         data_dir, file_name, surf_param.q_m, surf_param.n_pivots,
@@ -161,7 +170,8 @@ def run_alias(trajectory, alias_options, checkpoint=None, topology=None):
         surf_param, surf_param.n_slice,
         surf_param.cell_dim,
         recon=surf_param.recon,
-        ow_hist=alias_options.ow_hist)
+        ow_hist=alias_options.ow_hist,
+        q_max=surf_param.q_cutoff)
 
     av_intrinsic_distributions(
         data_dir, file_name, surf_param.cell_dim,
@@ -169,6 +179,7 @@ def run_alias(trajectory, alias_options, checkpoint=None, topology=None):
         surf_param.n_pivots, surf_param.phi,
         surf_param.n_frames, surf_param.n_frames,
         recon=surf_param.recon,
-        ow_dist=alias_options.ow_dist)
+        ow_dist=alias_options.ow_dist,
+        q_max=surf_param.q_cutoff)
 
     print("\n---- ENDING PROGRAM ----\n")
@@ -3,18 +3,22 @@ import time
 import numpy as np
 
 from alias.io.command_line_output import StdOutTable
-from alias.src.intrinsic_surface import xi
-from alias.src.linear_algebra import update_A_b, lu_decomposition
+from alias.src.intrinsic_surface import xi, xi_range, SurfaceEvaluator
+from alias.src.linear_algebra import (
+    form_A_b, solve_linear, woodbury_decomposition, IncrementalCholesky)
 from alias.src.spectra import intrinsic_area
+from alias.src.slab_index import SlabIndex
 from alias.src.surface_reconstruction import surface_reconstruction
-from alias.src.utilities import bubble_sort, numpy_remove
-from alias.src.wave_function import wave_arrays, vcheck
+from alias.src.utilities import smallest_indices
+from alias.src.wave_basis import wave_basis
 
 
 def self_consistent_cycle(
         coeff, A, b, dim, qm, tau, xmol, ymol, zmol,
         pivot, mol_list1, mol_list2, phi, n0,
-        new_piv1=[], new_piv2=[], recon=False):
+        new_piv1=[], new_piv2=[], recon=False,
+        assembly='auto', solver='auto', incremental=False,
+        woodbury='auto', coarse_to_fine=False, q_max=None):
 
     start = time.time()
 
@@ -33,13 +37,67 @@ def self_consistent_cycle(
     tau2 = tau
     inc = 0.1 * tau
 
-    surf_param = initialise_surface(qm, phi, dim, recon)
-
-    if recon == 1:
-        psi = phi * dim[0] * dim[1]
-        coeff, A, b, area_diag, curve_matrix, H_var = surf_param
-    else:
-        coeff, A, b, area_diag = surf_param
+    # Molecules available to be selected as pivots for each surface,
+    # indexed by z position
+    slabs = [
+        SlabIndex(zmol, dim, mol_list) for mol_list in [mol_list1, mol_list2]
+    ]
+
+    # Waves included in surface, with all others held at zero.
+    # A matrix and b vector are formed and solved for these only.
+    basis = wave_basis(qm, dim)
+    modes = basis.indices(qm, q_max)
+    n_modes = modes.size
+
+    # Starting coefficients are non-zero when seeded from surfaces
+    # of a previous, correlated frame
+    coeff = np.array(coeff, dtype=float)
+    _, A, b, area_diag = initialise_surface(qm, phi, dim, modes)
+
+    if recon:
+        psi, curve_matrix, H_var = initialise_recon(qm, phi, dim, modes)
+
+    # Build wave tables for all molecules once per frame
+    evaluator = SurfaceEvaluator(xmol, ymol, qm, dim)
+
+    # Solve in pivot space whenever there are fewer pivots than waves,
+    # in which case A is only required for surface reconstruction
+    if woodbury == 'auto':
+        woodbury = (n0 < n_modes) and not incremental
+    assemble = recon or not woodbury
+
+    # Keep Cholesky factors of A + area_diag between iterations,
+    # updating them with each batch of new pivots
+    if incremental:
+        factors = [IncrementalCholesky(solver=solver) for _ in range(2)]
+
+    # Grow pivots against surfaces of increasing resolution, solving
+    # only for waves up to frequency qu until final stage
+    stages = [(qm, n0)]
+    if coarse_to_fine:
+        n_start = max(len(pivot[0]), len(pivot[1]))
+        stages = [
+            (qu, n_stage) for qu, n_stage in resolution_stages(qm, n0)
+            if n_stage > n_start or qu == qm
+        ]
+    stage = 0
+    qu, n_stage = stages[stage]
+    indices = np.flatnonzero(basis.mask(qu, q_max)[modes])
+
+    # Seeded surfaces select further pivots before the first solve,
+    # rather than being fitted to the initial pivots alone
+    if np.any(coeff):
+        new_pivots = [new_piv1, new_piv2]
+        taus = [tau1, tau2]
+        for index in range(2):
+            taus[index], new_piv, pivot[index] = select_pivots(
+                slabs[index], xmol, ymol, zmol, dim, coeff[index], qm,
+                taus[index], inc, pivot[index], n_stage,
+                evaluator=evaluator)
+            new_pivots[index] = np.concatenate(
+                (new_pivots[index], new_piv)).astype(int)
+        new_piv1, new_piv2 = new_pivots
+        tau1, tau2 = taus
 
     building_surface = True
     build_surf1 = True
@@ -49,30 +107,49 @@ def self_consistent_cycle(
 
         start1 = time.time()
 
-        "Update A matrix and b vector"
-        temp_A, temp_b, fuv = update_A_b(
-            xmol, ymol, zmol, dim, qm, [new_piv1, new_piv2])
+        if assemble:
+            "Update A matrix and b vector"
+            temp_A, temp_b = form_A_b(
+                xmol, ymol, zmol, dim, qm, [new_piv1, new_piv2],
+                assembly=assembly, evaluator=evaluator, indices=modes)
 
-        A += temp_A
-        b += temp_b
+            A += temp_A
+            b += temp_b
 
         end1 = time.time()
 
-        "Perform LU decomosition to solve Ax = b"
-        if build_surf1:
-            coeff[0] = lu_decomposition(A[0] + area_diag, b[0])
-        if build_surf2:
-            coeff[1] = lu_decomposition(A[1] + area_diag, b[1])
-
-        if recon:
-            if build_surf1:
-                coeff[0], _ = surface_reconstruction(
-                    coeff[0], A[0], b[0], area_diag, curve_matrix,
-                    H_var, qm, len(pivot[0]), psi)
-            if build_surf2:
-                coeff[1], _ = surface_reconstruction(
-                    coeff[1], A[1], b[1], area_diag, curve_matrix,
-                    H_var, qm, len(pivot[1]), psi)
+        "Solve Ax = b for surface coefficients"
+        new_pivots = [new_piv1, new_piv2]
+        for index, build_surf in enumerate([build_surf1, build_surf2]):
+            if not build_surf:
+                continue
+            piv_n = np.asarray(pivot[index], dtype=int)
+            if indices.size < n_modes:
+                coeff_modes = truncated_solve(
+                    A[index], b[index], area_diag, indices,
+                    fuv=evaluator.basis(piv_n)[modes] if woodbury else None,
+                    zmol=zmol[piv_n], solver=solver)
+            elif woodbury:
+                coeff_modes = woodbury_decomposition(
+                    evaluator.basis(piv_n)[modes], zmol[piv_n], area_diag,
+                    solver=solver)
+            elif incremental:
+                factors[index].update(
+                    evaluator.basis(new_pivots[index])[modes])
+                coeff_modes = factors[index].solve(
+                    A[index] + area_diag, b[index])
+            else:
+                coeff_modes = solve_linear(
+                    A[index] + area_diag, b[index], solver=solver)
+
+            if recon and qu == qm:
+                coeff_modes, _ = surface_reconstruction(
+                    coeff_modes, A[index], b[index], area_diag,
+                    curve_matrix, H_var, qm, len(pivot[index]), psi,
+                    solver=solver)
+
+            coeff[index] = 0
+            coeff[index][modes] = coeff_modes
 
         end2 = time.time()
 
@@ -82,58 +159,43 @@ def self_consistent_cycle(
         # )
 
         "Calculate surface areas excess"
-        area1 = intrinsic_area(coeff[0], qm, qm, dim)
-        area2 = intrinsic_area(coeff[1], qm, qm, dim)
+        area1 = intrinsic_area(coeff[0], qm, qm, dim, evaluator=evaluator)
+        area2 = intrinsic_area(coeff[1], qm, qm, dim, evaluator=evaluator)
 
         "Check whether more pivots are needed"
-        if len(pivot[0]) == n0:
+        if len(pivot[0]) == n_stage:
             build_surf1 = False
             new_piv1 = []
-        if len(pivot[1]) == n0:
+        if len(pivot[1]) == n_stage:
             build_surf2 = False
             new_piv2 = []
 
-        if build_surf1 or build_surf2:
-            finding_pivots = True
-            piv_search1 = True
-            piv_search2 = True
-        else:
-            finding_pivots = False
+        # Raise resolution once both surfaces have the pivots required
+        # by current stage, solving again for both with current pivots
+        if not (build_surf1 or build_surf2) and stage < len(stages) - 1:
+            stage += 1
+            qu, n_stage = stages[stage]
+            indices = np.flatnonzero(basis.mask(qu, q_max)[modes])
+            build_surf1 = True
+            build_surf2 = True
+            print("Raising resolution to qu = {} with {} pivots".format(
+                qu, n_stage))
+
+        if not (build_surf1 or build_surf2):
             building_surface = False
             print("ENDING SEARCH")
 
-        # Calculate distance between molecular z positions
-        # and intrinsic surface
+        # Search for more molecular pivot sites near each surface,
+        # raising threshold distance tau until it includes any
+        # molecules
         if build_surf1:
-            zeta_list1 = make_zeta_list(
-                xmol, ymol, zmol, dim, mol_list1, coeff[0], qm, qm)
+            tau1, new_piv1, pivot[0] = select_pivots(
+                slabs[0], xmol, ymol, zmol, dim, coeff[0], qm, tau1, inc,
+                pivot[0], n_stage, evaluator=evaluator)
         if build_surf2:
-            zeta_list2 = make_zeta_list(
-                xmol, ymol, zmol, dim, mol_list2, coeff[1], qm, qm)
-
-        # Search for more molecular pivot sites"
-
-        while finding_pivots:
-            # Perform pivot selection
-            if piv_search1 and build_surf1:
-                mol_list1, new_piv1, pivot[0] = pivot_selection(
-                    mol_list1, zeta_list1, pivot[0], tau1, n0)
-            if piv_search2 and build_surf2:
-                mol_list2, new_piv2, pivot[1] = pivot_selection(
-                    mol_list2, zeta_list2, pivot[1], tau2, n0)
-
-            # Check whether threshold distance tau needs to be increased
-            if len(new_piv1) == 0 and len(pivot[0]) < n0:
-                tau1 += inc
-            else:
-                piv_search1 = False
-
-            if len(new_piv2) == 0 and len(pivot[1]) < n0:
-                tau2 += inc
-            else:
-                piv_search2 = False
-
-            finding_pivots = (piv_search1 or piv_search2)
+            tau2, new_piv2, pivot[1] = select_pivots(
+                slabs[1], xmol, ymol, zmol, dim, coeff[1], qm, tau2, inc,
+                pivot[1], n_stage, evaluator=evaluator)
 
         end = time.time()
 
@@ -150,7 +212,84 @@ def self_consistent_cycle(
     return coeff, pivot
 
 
-def make_zeta_list(xmol, ymol, zmol, dim, mol_list, coeff, qm, qu):
+def resolution_stages(qm, n0):
+    """
+    Returns stages of coarse to fine surface fitting, halving
+    the maximum wave frequency from qm at each earlier stage.
+    Pivots are grown at each stage in proportion to the number
+    of waves available.
+
+    Parameters
+    ----------
+    qm:  int
+        Maximum number of wave frequencies in Fourier Sum
+        representing intrinsic surface
+    n0:  int
+        Maximum number of molecular pivots in intrinsic surface
+
+    Returns
+    -------
+    stages:  list of tuple
+        Maximum wave frequency qu and number of pivots at each stage
+    """
+
+    qu_list = [qm]
+    while qu_list[0] > 1:
+        qu_list.insert(0, qu_list[0] // 2)
+
+    return [
+        (qu, max(1, int(n0 * (2 * qu + 1)**2 / (2 * qm + 1)**2)))
+        for qu in qu_list
+    ]
+
+
+def truncated_solve(A, b, area_diag, indices,
+                    fuv=None, zmol=None, solver='auto'):
+    """
+    Solve for surface coefficients of selected waves only, typically
+    those up to a lower frequency qu (see `WaveBasis.indices`), with
+    all other coefficients set to zero
+
+    Parameters
+    ----------
+    A:  float, array_like; shape=(n_modes, n_modes)
+        Matrix containing wave product weightings
+    b:  float, array_like; shape=(n_modes)
+        Vector containing solutions z.f(x, u, Lx).f(y, v, Ly)
+    area_diag: float, array_like; shape=(n_modes, n_modes)
+        Surface area diagonal terms for A matrix
+    indices:  int, array_like
+        Indices of coefficients in b to solve for
+    fuv:  float, array_like; shape=(n_modes, n_pivots), optional
+        Wave products at each pivot. If supplied, solves in the
+        space of pivots instead of using A and b (see
+        `woodbury_decomposition`)
+    zmol:  float, array_like; shape=(n_pivots), optional
+        Pivot coordinates in z dimension, required with fuv
+    solver: str (optional)
+        Method used to solve linear equations, see `solve_linear`
+
+    Returns
+    -------
+    coeff:	array_like (float); shape=(n_modes)
+        Optimised surface coefficients
+    """
+
+    block = np.ix_(indices, indices)
+
+    coeff = np.zeros(b.shape)
+    if fuv is not None:
+        coeff[indices] = woodbury_decomposition(
+            fuv[indices], zmol, area_diag[block], solver=solver)
+    else:
+        coeff[indices] = solve_linear(
+            A[block] + area_diag[block], b[indices], solver=solver)
+
+    return coeff
+
+
+def make_zeta_list(xmol, ymol, zmol, dim, mol_list, coeff, qm, qu,
+                   evaluator=None):
     """
     Calculate dz (zeta) between molecular sites and intrinsic
     surface for resolution qu"
@@ -170,6 +309,8 @@ def make_zeta_list(xmol, ymol, zmol, dim, mol_list, coeff, qm, qu):
     qm:  int
         Maximum number of wave frequencies in Fouier Sum
         representing intrinsic surface
+    evaluator:  SurfaceEvaluator, optional
+        Evaluator containing wave tables for all molecules in frame
 
     Returns
     -------
@@ -179,7 +320,10 @@ def make_zeta_list(xmol, ymol, zmol, dim, mol_list, coeff, qm, qu):
     """
 
     "Calculate shortest z distance between molecules and surface, zeta"
-    zeta_list = xi(xmol[mol_list], ymol[mol_list], coeff, qm, qu, dim)
+    if evaluator is None:
+        zeta_list = xi(xmol[mol_list], ymol[mol_list], coeff, qm, qu, dim)
+    else:
+        zeta_list = evaluator.xi(coeff, qu, indices=mol_list)
 
     zeta_list = zmol[mol_list] - zeta_list
     zeta_list -= dim[2] * np.array(2 * zeta_list / dim[2], dtype=int)
@@ -188,16 +332,138 @@ def make_zeta_list(xmol, ymol, zmol, dim, mol_list, coeff, qm, qu):
     return zeta_list
 
 
-def pivot_selection(mol_list, zeta_list, piv_n, tau, n0):
+def select_pivots(slab_index, xmol, ymol, zmol, dim, coeff, qm, tau, inc,
+                  piv_n, n0, evaluator=None):
+    """
+    Select new pivots for an intrinsic surface from molecules within
+    threshold distance tau, raising tau until it includes any
+    molecules (see `search_tau` and `pivot_selection`).
+
+    Only molecules within a slab extending 6 tau either side of the
+    range of surface positions are considered, since all others lie
+    too far from the surface to be selected. These are removed from
+    the search along with any other distant molecules.
+
+    Parameters
+    ----------
+    slab_index:  SlabIndex
+        Index of molecules available to be selected as pivots,
+        updated in place
+    xmol:  float, array_like; shape=(nmol)
+        Molecular coordinates in x dimension
+    ymol:  float, array_like; shape=(nmol)
+        Molecular coordinates in y dimension
+    zmol:  float, array_like; shape=(nmol)
+        Molecular coordinates in z dimension
+    dim:  float, array_like; shape=(3)
+        XYZ dimensions of simulation cell
+    coeff:	array_like (float); shape=(n_waves**2)
+        Optimised surface coefficients
+    qm:  int
+        Maximum number of wave frequencies in Fouier Sum
+        representing intrinsic surface
+    tau:  float
+        Current threshold distance
+    inc:  float
+        Increment of threshold distance
+    piv_n:  int, array_like
+        Molecular pivot indices
+    n0:  int
+        Maximum number of molecular pivots in intrinsic
+        surface
+    evaluator:  SurfaceEvaluator, optional
+        Evaluator containing wave tables for all molecules in frame
+
+    Returns
+    -------
+    tau:  float
+        Updated threshold distance
+    new_piv:  int, array_like
+        Indices of new pivot molecules just selected
+    piv_n:  int, array_like
+        Updated molecular pivot indices
+    """
+
+    xi_min, xi_max = xi_range(coeff, qm, dim)
+
+    def slab_zeta_list(width):
+        mol_list = slab_index.slab(xi_min - width, xi_max + width)
+        zeta_list = make_zeta_list(
+            xmol, ymol, zmol, dim, mol_list, coeff, qm, qm,
+            evaluator=evaluator)
+        return mol_list, zeta_list
+
+    width = 6.0 * tau
+    mol_list, zeta_list = slab_zeta_list(width)
+
+    if len(piv_n) < n0:
+        # Closest molecule may lie outside the slab if none lie
+        # within it, in which case all molecules are searched
+        if not np.any(zeta_list <= width):
+            width = np.inf
+            mol_list, zeta_list = slab_zeta_list(width)
+
+        tau = search_tau(zeta_list, tau, inc)
+
+        if 6.0 * tau > width:
+            width = 6.0 * tau
+            mol_list, zeta_list = slab_zeta_list(width)
+
+    new_piv, piv_n = pivot_selection(
+        slab_index.available, mol_list, zeta_list, piv_n, tau, n0)
+
+    if len(new_piv) > 0:
+        slab_index.remove_outside(xi_min - width, xi_max + width)
+
+    return tau, new_piv, piv_n
+
+
+def search_tau(zeta_list, tau, inc):
+    """
+    Returns threshold distance for pivot selection, raised from tau
+    in steps of inc until at least one molecule lies within it
+
+    Parameters
+    ----------
+    zeta_list:  float, array_like; shape=(n_mol)
+        Array of dz (zeta) between molecular sites and intrinsic
+        surface
+    tau:  float
+        Current threshold distance
+    inc:  float
+        Increment of threshold distance
+
+    Returns
+    -------
+    tau:  float
+        Smallest threshold distance including any molecule
+    """
+
+    if len(zeta_list) == 0:
+        return tau
+
+    # Increments are accumulated one at a time, as if pivot
+    # selection were attempted at each threshold in turn
+    zeta_min = np.min(zeta_list)
+    while tau < zeta_min:
+        tau += inc
+
+    return tau
+
+
+def pivot_selection(available, mol_list, zeta_list, piv_n, tau, n0):
     """
     Search through zeta_list for values within tau threshold
-    and add to pivot list
+    and add to pivot list, in order of zeta (shortest to longest)
 
     Parameters
     ----------
-    mol_list:  int, array_like; shape=(n0)
-        Indices of molcules available to be selected as pivots
-    zeta_list:  float, array_like; shape=(n0)
+    available:  bool, array_like; shape=(nmol)
+        Whether each molecule is available to be selected as a
+        pivot, updated in place
+    mol_list:  int, array_like; shape=(n_mol)
+        Indices of molecules available to be selected as pivots
+    zeta_list:  float, array_like; shape=(n_mol)
         Array of dz (zeta) between molecular sites and intrinsic
         surface
     piv_n:  int, array_like; shape=(n0)
@@ -211,9 +477,6 @@ def pivot_selection(mol_list, zeta_list, piv_n, tau, n0):
 
     Returns
     -------
-    mol_list:  int, array_like; shape=(n0)
-        Updated indices of molcules available to be selected as
-        pivots
     new_piv:  int, array_like
         Indices of new pivot molecules just selected
     piv_n:  int, array_like; shape=(n0)
@@ -221,35 +484,23 @@ def pivot_selection(mol_list, zeta_list, piv_n, tau, n0):
 
     """
 
-    # Find new pivots based on zeta <= tau
-    new_piv = mol_list[zeta_list <= tau]
-    dz_new_piv = zeta_list[zeta_list <= tau]
-
-    # Order pivots by zeta (shortest to longest)
-    bubble_sort(new_piv, dz_new_piv)
-
-    # Add new pivots to pivoy list and check whether max n0
-    # pivots are selected"
-    piv_n = np.concatenate((piv_n, new_piv))
-
-    if piv_n.shape[0] > n0:
-        new_piv = new_piv[:-piv_n.shape[0]+n0]
-        piv_n = piv_n[:n0]
+    # Find closest new pivots based on zeta <= tau, up to a
+    # maximum of n0 pivots in total
+    within = np.flatnonzero(zeta_list <= tau)
+    n_new = min(within.size, n0 - len(piv_n))
+    new_piv = mol_list[within[smallest_indices(zeta_list[within], n_new)]]
 
-    far_tau = 6.0 * tau
+    piv_n = np.concatenate((piv_n, new_piv))[:n0]
 
-    # Remove pivots far from molecular search list
-    far_piv = mol_list[zeta_list > far_tau]
+    # Remove new pivots and molecules far from surface from search
     if len(new_piv) > 0:
-        mol_list = numpy_remove(
-            mol_list, np.concatenate((new_piv, far_piv)))
+        available[new_piv] = False
+        available[mol_list[zeta_list > 6.0 * tau]] = False
 
-    assert np.sum(np.isin(new_piv, mol_list)) == 0
+    return new_piv, piv_n
 
-    return mol_list, new_piv, piv_n
 
-
-def initialise_surface(qm, phi, dim):
+def initialise_surface(qm, phi, dim, indices=None):
     """
     Calculate initial parameters for ISM
 
@@ -263,48 +514,48 @@ def initialise_surface(qm, phi, dim):
         optimisation function
     dim:  float, array_like; shape=(3)
         XYZ dimensions of simulation cell
+    indices:  int, array_like; shape=(n_modes), optional
+        Indices of waves included in A matrix and b vector
+        (default=all waves), see `WaveBasis.indices`
 
     Returns
     -------
 
-    coeff:	array_like (float); shape=(n_waves**2)
+    coeff:	array_like (float); shape=(2, n_waves**2)
         Optimised surface coefficients
-    A:  float, array_like; shape=(n_waves**2, n_waves**2)
+    A:  float, array_like; shape=(2, n_modes, n_modes)
         Matrix containing wave product weightings
         f(x, u1, Lx).f(y, v1, Ly).f(x, u2, Lx).f(y, v2, Ly)
         for each coefficient in the linear algebra equation
         Ax = b for both surfaces
-    b:  float, array_like; shape=(n_waves**2)
+    b:  float, array_like; shape=(2, n_modes)
         Vector containing solutions z.f(x, u, Lx).f(y, v, Ly)
         to the linear algebra equation Ax = b
         for both surfaces
-    area_diag: float, array_like; shape=(n_waves**2)
+    area_diag: float, array_like; shape=(n_modes, n_modes)
         Surface area diagonal terms for A matrix
     """
 
     n_waves = 2*qm+1
 
-    # Form the diagonal xi^2 terms
-    u_array, v_array = wave_arrays(qm)
-    uv_check = vcheck(u_array, v_array)
+    basis = wave_basis(qm, dim)
+    if indices is None:
+        indices = np.arange(n_waves**2)
+    n_modes = len(indices)
 
-    # Make diagonal terms of A matrix
-    area_diag = phi * (
-        u_array**2 * dim[1] / dim[0]
-        + v_array**2 * dim[0] / dim[1]
-    )
-    area_diag = 4 * np.pi**2 * np.diagflat(area_diag * uv_check)
+    # Diagonal terms of A matrix are shared between frames
+    area_diag = np.diagflat(basis.area_vector(phi)[indices])
 
     # Create empty A matrix and b vector for linear algebra
     # equation Ax = b
-    A = np.zeros((2, n_waves**2, n_waves**2))
-    b = np.zeros((2, n_waves**2))
+    A = np.zeros((2, n_modes, n_modes))
+    b = np.zeros((2, n_modes))
     coeff = np.zeros((2, n_waves**2))
 
     return coeff, A, b, area_diag
 
 
-def initialise_recon(qm, phi, dim):
+def initialise_recon(qm, phi, dim, indices=None):
     """
     Calculate initial parameters for reconstructed
     ISM fitting procedure
@@ -319,37 +570,26 @@ def initialise_recon(qm, phi, dim):
         optimisation function
     dim:  float, array_like; shape=(3)
         XYZ dimensions of simulation cell
+    indices:  int, array_like; shape=(n_modes), optional
+        Indices of waves included in A matrix (default=all waves),
+        see `WaveBasis.indices`
 
     Returns
     -------
     psi:  float
         Weighting factor for surface reconstruction function
-    curve_matrix: float, array_like; shape=(n_waves**2, n_waves**2)
+    curve_matrix: float, array_like; shape=(n_modes, n_modes)
         Surface curvature terms for A matrix
-    H_var: float, array_like; shape=(n_waves**2)
+    H_var: float, array_like; shape=(n_modes)
         Diagonal terms for global variance of mean curvature
     """
 
     psi = phi * dim[0] * dim[1]
-    n_waves = 2 * qm + 1
-
-    "Form the diagonal xi^2 terms"
-    u_array, v_array = wave_arrays(qm)
-    uv_check = vcheck(u_array, v_array)
-
-    u_matrix = np.tile(u_array, (n_waves**2, 1))
-    v_matrix = np.tile(v_array, (n_waves**2, 1))
-
-    H_var = 4 * np.pi**4 * uv_check * (
-        u_array**4 / dim[0]**4 + v_array**4 / dim[1]**4
-        + 2 * (u_array * v_array)**2 / np.prod(dim**2)
-    )
-
-    curve_matrix = 16 * np.pi**4 * (
-        (u_matrix * u_matrix.T)**2 / dim[0]**4 +
-        (v_matrix * v_matrix.T)**2 / dim[1]**4 +
-        ((u_matrix * v_matrix.T)**2 +
-         (u_matrix.T * v_matrix)**2) / np.prod(dim**2)
-    )
+
+    basis = wave_basis(qm, dim)
+    curve_matrix = basis.curve_block(indices)
+    H_var = basis.H_var
+    if indices is not None:
+        H_var = H_var[indices]
 
     return psi, curve_matrix, H_var
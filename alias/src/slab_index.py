@@ -0,0 +1,96 @@
+import numpy as np
+
+
+class SlabIndex:
+    """Index of molecules available to be selected as pivots, sorted
+    by their periodic position along z so that those lying within a
+    slab of z positions can be found by bisection, rather than by
+    scanning every molecule in the frame.
+
+    Molecules are removed from the index as they are selected or
+    found to be far from the surface, which only clears a mask over
+    the sorted positions.
+    """
+
+    def __init__(self, zmol, dim, indices):
+        """
+        Parameters
+        ----------
+        zmol:  float, array_like; shape=(nmol)
+            Molecular coordinates in z dimension
+        dim:  float, array_like; shape=(3)
+            XYZ dimensions of simulation cell
+        indices:  int, array_like
+            Indices of molecules initially available
+        """
+        self.length = float(dim[2])
+
+        z_wrap = np.mod(zmol, self.length)
+        self.order = np.argsort(z_wrap, kind='stable')
+        self.z_sorted = z_wrap[self.order]
+
+        #: Whether each molecule is available, updated in place
+        self.available = np.zeros(np.size(zmol), dtype=bool)
+        self.available[indices] = True
+
+    def mol_list(self):
+        """Returns indices of all available molecules"""
+        return np.flatnonzero(self.available)
+
+    def _ranges(self, lower, upper):
+        """Returns ranges of sorted positions with z between lower
+        and upper, under periodic boundary conditions"""
+
+        width = upper - lower
+        if width >= self.length:
+            return [(0, self.z_sorted.size)]
+
+        lower = lower % self.length
+        upper = lower + width
+
+        bounds = [(lower, min(upper, self.length))]
+        if upper > self.length:
+            bounds.append((0., upper - self.length))
+
+        return [
+            tuple(np.searchsorted(self.z_sorted, bound, side=side)
+                  for bound, side in zip(edges, ['left', 'right']))
+            for edges in bounds
+        ]
+
+    def slab(self, lower, upper):
+        """
+        Returns available molecules with z positions between lower
+        and upper, under periodic boundary conditions
+
+        Parameters
+        ----------
+        lower, upper:  float
+            Limits of slab in z dimension
+
+        Returns
+        -------
+        mol_list:  int, array_like
+            Indices of molecules in slab, in ascending order
+        """
+        candidates = np.concatenate([
+            self.order[start:end]
+            for start, end in self._ranges(lower, upper)
+        ])
+        candidates = candidates[self.available[candidates]]
+
+        return np.sort(candidates)
+
+    def remove(self, indices):
+        """Removes molecules from index"""
+        self.available[indices] = False
+
+    def remove_outside(self, lower, upper):
+        """Removes all molecules with z positions outside of slab
+        between lower and upper, under periodic boundary conditions"""
+
+        previous = 0
+        for start, end in sorted(self._ranges(lower, upper)):
+            self.available[self.order[previous:start]] = False
+            previous = max(previous, end)
+        self.available[self.order[previous:]] = False
@@ -1,8 +1,7 @@
 import numpy as np
 from scipy import constants as con
 
-from alias.src.wave_function import (
-    vcheck, wave_arrays, wave_indices)
+from alias.src.wave_basis import wave_basis
 
 
 def calculate_frequencies(u_array, v_array, dim):
@@ -35,7 +34,7 @@ def filter_frequencies(q, fourier):
     return unique_q, av_fourier
 
 
-def power_spectrum_coeff(coeff_2, qm, qu, dim):
+def power_spectrum_coeff(coeff_2, qm, qu, dim, q_max=None):
     """
     Returns power spectrum of average surface coefficients,
     corresponding to the frequencies in q2_set
@@ -53,6 +52,9 @@ def power_spectrum_coeff(coeff_2, qm, qu, dim):
         representing intrinsic surface
     dim:  float, array_like; shape=(3)
         XYZ dimensions of simulation cell
+    q_max:  float, optional
+        Upper limit of wave vector magnitude of waves included in
+        Fourier sum, see `WaveBasis.mask` (default=no limit)
 
     Returns
     -------
@@ -65,15 +67,11 @@ def power_spectrum_coeff(coeff_2, qm, qu, dim):
 
     """
 
-    u_array, v_array = wave_arrays(qm)
+    basis = wave_basis(qm, dim)
+    indices = basis.indices(qu, q_max)
 
-    indices = wave_indices(qu, u_array, v_array)
-
-    q, q2 = calculate_frequencies(
-        u_array[indices], v_array[indices], dim)
-
-    fourier = coeff_2[indices] / 4 * vcheck(
-        u_array[indices], v_array[indices])
+    q = basis.q[indices]
+    fourier = coeff_2[indices] / 4 * basis.uv_check[indices]
 
     # Remove redundant frequencies
     unique_q, av_fourier = filter_frequencies(q, fourier)
@@ -81,7 +79,7 @@ def power_spectrum_coeff(coeff_2, qm, qu, dim):
     return unique_q, av_fourier
 
 
-def surface_tension_coeff(coeff_2, qm, qu, dim, T):
+def surface_tension_coeff(coeff_2, qm, qu, dim, T, q_max=None):
     """
     Returns spectrum of surface tension, corresponding to
     the frequencies in q2_set
@@ -101,6 +99,9 @@ def surface_tension_coeff(coeff_2, qm, qu, dim, T):
         XYZ dimensions of simulation cell
     T:  float
         Average temperature of simulation (K)
+    q_max:  float, optional
+        Upper limit of wave vector magnitude of waves included in
+        Fourier sum, see `WaveBasis.mask` (default=no limit)
 
     Returns
     -------
@@ -111,15 +112,13 @@ def surface_tension_coeff(coeff_2, qm, qu, dim, T):
 
     """
 
-    u_array, v_array = wave_arrays(qm)
-
-    indices = wave_indices(qu, u_array, v_array)
+    basis = wave_basis(qm, dim)
+    indices = basis.indices(qu, q_max)
 
-    q, q2 = calculate_frequencies(
-        u_array[indices], v_array[indices], dim)
+    q, q2 = basis.q[indices], basis.q2[indices]
 
-    int_A = dim[0] * dim[1] * q2 * coeff_2[indices] * vcheck(
-        u_array[indices], v_array[indices]) / 4
+    int_A = dim[0] * dim[1] * q2 * coeff_2[indices] * basis.uv_check[
+        indices] / 4
     gamma = con.k * T * 1E23 / int_A
 
     unique_q, av_gamma = filter_frequencies(q, gamma)
@@ -127,7 +126,7 @@ def surface_tension_coeff(coeff_2, qm, qu, dim, T):
     return unique_q, av_gamma
 
 
-def intrinsic_area(coeff, qm, qu, dim):
+def intrinsic_area(coeff, qm, qu, dim, evaluator=None):
     """
     Calculate the intrinsic surface area from coefficients
     at resolution qu
@@ -145,6 +144,8 @@ def intrinsic_area(coeff, qm, qu, dim):
         representing intrinsic surface
     dim:  float, array_like; shape=(3)
         XYZ dimensions of simulation cell
+    evaluator:  SurfaceEvaluator, optional
+        Evaluator containing cached area weightings for surface
 
     Returns
     -------
@@ -154,20 +155,12 @@ def intrinsic_area(coeff, qm, qu, dim):
         to cell cross section XY
     """
 
-    u_array, v_array = wave_arrays(qm)
-    indices = wave_indices(qu, u_array, v_array)
+    if evaluator is not None:
+        area_weights = evaluator.area_weights(qu)
+    else:
+        area_weights = wave_basis(qm, dim).area_weights(qu)
 
-    q2 = np.pi**2 * (
-        u_array[indices]**2 / dim[0]**2 +
-        v_array[indices]**2 / dim[1]**2
-    )
-
-    int_A = q2 * coeff[indices]**2 * vcheck(
-        u_array[indices], v_array[indices]
-    )
-    int_A = 1 + 0.5 * np.sum(int_A)
-
-    return int_A
+    return 1 + 0.5 * np.dot(area_weights, coeff**2)
 
 
 def cw_gamma_sr(q, gamma, kappa):
@@ -178,7 +171,7 @@ def cw_gamma_lr(q, gamma, kappa0, l0):
     return gamma + q**2 * (kappa0 + l0 * np.log(q))
 
 
-def get_frequency_set(qm, qu, dim):
+def get_frequency_set(qm, qu, dim, q_max=None):
     """
     Returns set of unique frequencies in Fourier series
 
@@ -190,6 +183,9 @@ def get_frequency_set(qm, qu, dim):
         representing intrinsic surface
     dim:  float, array_like; shape=(3)
         XYZ dimensions of simulation cell
+    q_max:  float, optional
+        Upper limit of wave vector magnitude of waves included in
+        Fourier sum, see `WaveBasis.mask` (default=no limit)
 
     Returns
     -------
@@ -200,12 +196,10 @@ def get_frequency_set(qm, qu, dim):
         Set of unique frequencies to bin coefficients to
     """
 
-    u_array, v_array = wave_arrays(qm)
-
-    indices = wave_indices(qu, u_array, v_array)
+    basis = wave_basis(qm, dim)
+    indices = basis.indices(qu, q_max)
 
-    q, q2 = calculate_frequencies(
-        u_array[indices], v_array[indices], dim)
+    q, q2 = basis.q[indices], basis.q2[indices]
 
     q_set = np.unique(q)[1:]
     q2_set = np.unique(q2)[1:]
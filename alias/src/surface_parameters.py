@@ -9,6 +9,7 @@ from alias.io.command_line_input import (
 )
 from alias.src.pivot_density import optimise_pivot_diffusion
 from alias.src.utilities import load_traj_frame
+from alias.src.wave_basis import mode_limits
 
 log = logging.getLogger(__name__)
 
@@ -20,13 +21,18 @@ class SurfaceParameters:
         'molecule', 'mol_sigma', 'masses', 'com_mode',
         'com_sites', 'center_atom', 'vector_atoms',
         'pivot_density', 'n_frames', 'cell_dim', 'v_lim',
-        'n_cube', 'tau', 'max_r', 'phi', 'recon']
+        'n_cube', 'tau', 'max_r', 'phi', 'recon', 'wave_cutoff',
+        'pos_dtype', 'pos_precision', 'pos_complib', 'pos_resolutions',
+        'com_reference', 'com_stride']
 
     def __init__(self, molecule=None, mol_sigma=None, masses=None, v_lim=3,
                  n_cube=3, tau=0.5, max_r=1.5, phi=5E-8, com_mode='molecule',
                  com_sites=None, center_atom=None, vector_atoms=None,
                  n_frames=None, pivot_density=None, cell_dim=None,
-                 recon=False):
+                 recon=False, wave_cutoff='square', pos_dtype='float64',
+                 pos_precision=1E-3, pos_complib=None,
+                 pos_resolutions=None, com_reference='system',
+                 com_stride=7):
         """Initialise parameters for a Intrinsic surface
 
         Parameters
@@ -37,6 +43,35 @@ class SurfaceParameters:
         atoms: list of str
             List of symbols representing atoms in molecule
             to calculate centre of mass from.
+        wave_cutoff: str, optional
+            Either 'square', to include all waves with frequencies
+            up to q_m in the Fourier sum, or 'circular', to include
+            only waves with wave vector magnitudes up to q_max
+        pos_dtype: str, optional
+            Storage type of intrinsic positions and derivatives,
+            either 'float64', 'float32' or 'int16'
+        pos_precision: float, optional
+            Maximum error of intrinsic positions and derivatives
+            stored as 'int16', see `create_intrinsic_positions_dxdyz`
+        pos_complib: str, optional
+            Compression library used to store intrinsic positions
+            and derivatives, for example 'zlib' or 'blosc'
+        pos_resolutions: list of int, optional
+            Resolutions qu at which to store intrinsic positions
+            and derivatives (default=all up to q_m)
+        com_reference: str, optional
+            Atoms used to calculate the centre of mass of the system
+            that molecular positions are referenced to, either
+            'system' for all atoms (default) or 'molecules' for only
+            those in the surface forming molecules
+        com_stride: int, optional
+            Stride between atoms used to estimate the centre of mass
+            of the system when com_reference is 'system', so that
+            only a subset of atoms outside the surface forming
+            molecules need to be loaded. The default stride is prime,
+            so that sampled atoms cycle through each site of small
+            repeated molecules. A stride of 1 gives the exact centre
+            of mass (default=7)
         """
 
         self.molecule = molecule
@@ -69,6 +104,15 @@ class SurfaceParameters:
         self.n_frames = n_frames
         self.cell_dim = cell_dim
         self.recon = recon
+        self.wave_cutoff = wave_cutoff
+
+        self.pos_dtype = pos_dtype
+        self.pos_precision = pos_precision
+        self.pos_complib = pos_complib
+        self.pos_resolutions = pos_resolutions
+
+        self.com_reference = com_reference
+        self.com_stride = com_stride
 
         self._traj = None
 
@@ -93,6 +137,14 @@ class SurfaceParameters:
             if (molecule.name == self.molecule)
         ]
 
+    @property
+    def com_indices(self):
+        """List of indices in trajectory that refer to atoms used to
+        calculate the centre of mass of the system"""
+        if self.com_reference == 'molecules':
+            return self.atom_indices
+        return list(range(0, self._traj.n_atoms, self.com_stride))
+
     @property
     def n_atoms(self):
         """Number of atoms in trajectory assigned to residue"""
@@ -147,8 +199,18 @@ class SurfaceParameters:
     def q_m(self):
         """Maximum number of wave frequencies allowed in
         Fourier sum representing intrinsic surface"""
+        if self.wave_cutoff == 'circular':
+            return max(mode_limits(self.q_max, self.cell_dim))
         return int(self.q_max / self.q_min)
 
+    @property
+    def q_cutoff(self):
+        """Maximum wave vector magnitude of waves included in
+        Fourier sum, or None if all waves up to q_m are included"""
+        if self.wave_cutoff == 'circular':
+            return self.q_max
+        return None
+
     @property
     def n_waves(self):
         """Number of waves in each dimension of Fourier sum
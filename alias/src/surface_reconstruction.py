@@ -1,16 +1,16 @@
 import numpy as np
+import scipy as sp
 
-from alias.src.linear_algebra import lu_decomposition
-from alias.src.wave_function import (
-    wave_function_array,
-    wave_function,
-    vcheck
-)
+from alias.src.intrinsic_surface import SurfaceEvaluator
+from alias.src.linear_algebra import solve_linear
+from alias.src.wave_basis import wave_basis
+from alias.src.wave_function import wave_function_array
 
 
 def surface_reconstruction(coeff, A, b, area_diag, curve_matrix,
                            H_var, qm, n0, psi,
-                           precision=1E-3, max_step=20):
+                           precision=1E-3, max_step=20, solver='auto',
+                           method='eigen'):
     """
     Iterative algorithm to perform surface reconstruction routine.
     Solves Ax = b general matrix equation until solution found where
@@ -50,6 +50,12 @@ def surface_reconstruction(coeff, A, b, area_diag, curve_matrix,
     max_step:  int
         Maximum iterative steps without solution until algorithm is
         restarted with a reduced psi
+    solver:  str (optional)
+        Method used to solve Ax = b, see `solve_linear`
+    method:  str (optional)
+        Either 'eigen', evaluating each trial psi from a single
+        generalised eigendecomposition (see `ReconstructionSweep`),
+        or 'solve', solving Ax = b at each trial psi
 
     Returns
     -------
@@ -60,6 +66,24 @@ def surface_reconstruction(coeff, A, b, area_diag, curve_matrix,
         Reconstructed surface coefficients
     """
 
+    if method == 'eigen':
+        try:
+            sweep = ReconstructionSweep(
+                A, b, area_diag, curve_matrix, H_var, n0)
+        except np.linalg.LinAlgError:
+            method = 'solve'
+
+    def trial(psi_trial):
+        """Returns coefficients and curvature variances at psi"""
+        if method == 'eigen':
+            return (sweep.coeff(psi_trial),) + sweep.H_var_values(psi_trial)
+
+        A_trial = A * (1. + curve_matrix * psi_trial / n0)
+        coeff_trial = solve_linear(A_trial + area_diag, b, solver=solver)
+
+        return (coeff_trial,) + H_var_values(
+            coeff_trial, A_trial, curve_matrix, H_var, qm, n0)
+
     reconstructing = True
     psi_array = np.array([0, psi])
     step = 0
@@ -81,14 +105,9 @@ def surface_reconstruction(coeff, A, b, area_diag, curve_matrix,
 
     "Amend psi weighting coefficient until H_var == H_piv_var"
     while reconstructing:
-        "Update A matrix and b vector"
-        A_recon = A * (1. + curve_matrix * psi_array[1] / n0)
-
-        "Update coeffs by performing LU decomosition to solve Ax = b"
-        coeff_recon = lu_decomposition(A_recon + area_diag, b)
-
-        H_var_coeff[1], H_var_piv[1], H_var_func[1] = H_var_values(
-            coeff_recon, A_recon, curve_matrix, H_var, qm, n0)
+        "Update coeffs for reconstructed A matrix"
+        coeff_recon, H_var_coeff[1], H_var_piv[1], H_var_func[1] = trial(
+            psi_array[1])
 
         "Recalculate gradient of optimistation function wrt psi"
         H_var_grad[1] = (
@@ -128,6 +147,8 @@ def surface_reconstruction(coeff, A, b, area_diag, curve_matrix,
     # print(' {:10.8f} {:10.4f} {:10.4f}'.format(
     #     psi_array[1],  H_var_coeff[0], H_var_piv[0]))
 
+    A_recon = A * (1. + curve_matrix * psi_array[1] / n0)
+
     return coeff_recon, A_recon
 
 
@@ -170,14 +191,11 @@ def H_var_values(coeff, A, curve_matrix, H_var, qm, n0):
         H_var_piv
     """
 
-    n_waves = 2 * qm + 1
-
     # Calculate variance of curvature across entire surface from coefficients
     H_var_coeff = np.sum(H_var * coeff**2)
 
     # Calculate variance of curvature at pivot sites only
-    coeff_matrix = np.tile(coeff, (n_waves**2, 1))
-    H_var_piv = np.sum(coeff_matrix * coeff_matrix.T * A * curve_matrix / n0)
+    H_var_piv = np.dot(coeff, np.dot(A * curve_matrix, coeff)) / n0
 
     # Calculate optimisation function (diff between coeff and pivot variance)
     H_var_func = abs(H_var_coeff - H_var_piv)
@@ -185,6 +203,71 @@ def H_var_values(coeff, A, curve_matrix, H_var, qm, n0):
     return H_var_coeff, H_var_piv, H_var_func
 
 
+class ReconstructionSweep:
+    """Evaluates reconstructed surface coefficients and curvature
+    variances for any value of weighting factor psi.
+
+    The reconstructed matrix A + (psi / n0) A.C + area_diag forms a
+    symmetric pencil, so a single generalised eigendecomposition
+
+        (A.C) V = (A + area_diag) V diag(lambda),  V.T (A + area_diag) V = I
+
+    gives coeff(psi) = V (V.T b / (1 + psi lambda / n0)), and both
+    quadratic forms in `H_var_values` can be projected onto the
+    eigenvectors in advance. Each trial psi then requires O(n_waves**4)
+    operations rather than an O(n_waves**6) solve.
+    """
+
+    def __init__(self, A, b, area_diag, curve_matrix, H_var, n0):
+        """
+        Parameters
+        ----------
+        A:  float, array_like; shape=(n_waves**2, n_waves**2)
+            Matrix containing wave product weightings
+        b:  float, array_like; shape=(n_waves**2)
+            Vector containing solutions z.f(x, u, Lx).f(y, v, Ly)
+        area_diag: float, array_like; shape=(n_waves**2, n_waves**2)
+            Surface area diagonal terms for A matrix
+        curve_matrix: float, array_like; shape=(n_waves**2, n_waves**2)
+            Surface curvature terms for A matrix
+        H_var: float, array_like; shape=(n_waves**2)
+            Diagonal terms for global variance of mean curvature
+        n0:  int
+            Maximum number of molecular pivots in intrinsic surface
+        """
+        self.n0 = n0
+
+        curve_A = A * curve_matrix
+        self.eig_val, self.eig_vec = sp.linalg.eigh(curve_A, A + area_diag)
+
+        self.eig_b = np.dot(self.eig_vec.T, b)
+        self.H_var_form = np.dot(self.eig_vec.T, H_var[:, None] * self.eig_vec)
+        self.curve_form = np.dot(
+            self.eig_vec.T, np.dot(curve_A * curve_matrix, self.eig_vec))
+
+    def weights(self, psi):
+        """Returns coefficients at psi in basis of eigenvectors"""
+        return self.eig_b / (1. + self.eig_val * psi / self.n0)
+
+    def coeff(self, psi):
+        """Returns reconstructed surface coefficients at psi"""
+        return np.dot(self.eig_vec, self.weights(psi))
+
+    def H_var_values(self, psi):
+        """Returns values of `H_var_values` for reconstructed surface
+        coefficients and A matrix at psi"""
+        weights = self.weights(psi)
+
+        H_var_coeff = np.dot(weights, np.dot(self.H_var_form, weights))
+        H_var_piv = (
+            np.sum(self.eig_val * weights**2)
+            + psi / self.n0 * np.dot(weights, np.dot(self.curve_form, weights))
+        ) / self.n0
+        H_var_func = abs(H_var_coeff - H_var_piv)
+
+        return H_var_coeff, H_var_piv, H_var_func
+
+
 def H_xy(x, y, coeff, qm, qu, dim):
     """
     H_xy(x, y, coeff, qm, qu, dim)
@@ -234,16 +317,8 @@ def H_xy(x, y, coeff, qm, qu, dim):
             * fuv * coeff[indices]
         )
     else:
-        H_array = np.zeros(x.shape)
-        for u in range(-qu, qu+1):
-            for v in range(-qu, qu+1):
-                j = (2 * qm + 1) * (u + qm) + (v + qm)
-                H_array += (
-                    wave_function(x, u, dim[0]) * wave_function(y, v, dim[1])
-                    * (u ** 2 / dim[0] ** 2 + v ** 2 / dim[1] ** 2)
-                    * coeff[j]
-                )
-        H = -4 * np.pi**2 * H_array
+        evaluator = SurfaceEvaluator(x, y, qm, dim)
+        H = np.reshape(evaluator.H_xy(coeff, qu), np.shape(x))
 
     return H
 
@@ -280,22 +355,15 @@ def H_var_coeff(coeff, qm, qu, dim):
     if qu == 0:
         return 0
 
-    n_waves = 2 * qm + 1
-
-    u_array = np.array(np.arange(n_waves**2) / n_waves, dtype=int) - qm
-    v_array = np.array(np.arange(n_waves**2) % n_waves, dtype=int) - qm
-    wave_filter = (
-        (u_array >= -qu) * (u_array <= qu)
-        * (v_array >= -qu) * (v_array <= qu)
-    )
-    indices = np.argwhere(wave_filter).flatten()
-    Psi = vcheck(u_array, v_array)[indices] / 4.
+    basis = wave_basis(qm, dim)
+    u_array, v_array = basis.u_array, basis.v_array
+    indices = basis.indices(qu)
+    Psi = basis.uv_check[indices] / 4.
 
     coeff_filter = coeff[:, :, indices]
     av_coeff_2 = np.mean(coeff_filter**2, axis=(0, 1)) * Psi
 
-    H_var_array = av_coeff_2[indices] * vcheck(
-        u_array[indices], v_array[indices])
+    H_var_array = av_coeff_2[indices] * basis.uv_check[indices]
     H_var_array *= (
         u_array[indices]**4 / dim[0]**4
         + v_array[indices]**4 / dim[1]**4
@@ -340,42 +408,25 @@ def H_var_mol(xmol, ymol, coeff, qm, qu, dim):
     if qu == 0:
         return 0
 
-    n_waves = 2 * qm + 1
-    nmol = xmol.shape[0]
-
-    # Create arrays of wave frequency indicies u and v
-    u_array = np.array(np.arange(n_waves**2) / n_waves, dtype=int) - qm
-    v_array = np.array(np.arange(n_waves**2) % n_waves, dtype=int) - qm
-    wave_check = (
-        (u_array >= -qu) * (u_array <= qu)
-        * (v_array >= -qu) * (v_array <= qu)
-    )
-    indices = np.argwhere(wave_check).flatten()
+    basis = wave_basis(qm, dim)
+    indices = basis.indices(qu)
 
-    # Create matrix of wave frequency indicies (u, v)**2
-    u_matrix = np.tile(u_array[indices], (len([indices]), 1))
-    v_matrix = np.tile(v_array[indices], (len([indices]), 1))
+    fuv = SurfaceEvaluator(xmol, ymol, qm, dim).basis()[indices]
+    ffuv = np.dot(fuv, fuv.T)
 
-    # Make curvature diagonal terms of A matrix
+    # Make curvature terms between each pair of waves
+    u_matrix = basis.u_array[None, indices]
+    v_matrix = basis.v_array[None, indices]
     curve_diag = 16 * np.pi**4 * (
-        u_matrix**2 * u_matrix.T**2 / dim[0]**4 +
-        v_matrix**2 * v_matrix.T**2 / dim[1]**4 +
-        (u_matrix**2 * v_matrix.T**2 + u_matrix.T**2 * v_matrix**2)
+        (u_matrix * u_matrix.T)**2 / dim[0]**4
+        + (v_matrix * v_matrix.T)**2 / dim[1]**4
+        + ((u_matrix * v_matrix.T)**2 + (u_matrix.T * v_matrix)**2)
         / (dim[0]**2 * dim[1]**2)
     )
 
-    # Form the diagonal xi^2 terms and b vector solutions
-    fuv = np.zeros((n_waves**2, nmol))
-    for u in range(-qu, qu+1):
-        for v in range(-qu, qu+1):
-            j = (2 * qm + 1) * (u + qm) + (v + qm)
-            fuv[j] = (
-                wave_function(xmol, u_array[j], dim[0])
-                * wave_function(ymol, v_array[j], dim[1])
-            )
-    ffuv = np.dot(fuv[indices], fuv[indices].T)
-
-    coeff_matrix = np.tile(coeff[indices], (len([indices]), 1))
-    H_var = np.sum(coeff_matrix * coeff_matrix.T * ffuv * curve_diag / nmol)
+    coeff_indices = coeff[indices]
+    H_var = np.dot(
+        coeff_indices, np.dot(ffuv * curve_diag, coeff_indices)
+    ) / xmol.shape[0]
 
     return H_var
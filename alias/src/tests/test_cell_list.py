@@ -0,0 +1,99 @@
+import numpy as np
+
+from alias.src.cell_list import CellList, wrapped_offsets
+from alias.tests.alias_test_case import AliasTestCase
+
+
+class TestCellList(AliasTestCase):
+
+    def setUp(self):
+
+        self.dim = np.array([20., 22., 60.])
+        self.max_r = 3.
+
+        random = np.random.RandomState(7)
+        self.xmol = random.uniform(0, self.dim[0], 400)
+        self.ymol = random.uniform(0, self.dim[1], 400)
+        self.zmol = random.uniform(-10, 10, 400)
+
+    def dense_counts(self, indices):
+
+        dxyz = np.stack((
+            self.xmol[indices], self.ymol[indices], self.zmol[indices]))
+        dxyz = dxyz[:, :, None] - dxyz[:, None, :]
+        for i, l in enumerate(self.dim[:2]):
+            dxyz[i] -= l * np.array(2 * dxyz[i] / l, dtype=int)
+        dr2 = np.sum(dxyz**2, axis=0)
+
+        return np.count_nonzero(dr2 < self.max_r**2, axis=1)
+
+    def test_wrapped_offsets(self):
+
+        self.assertArrayAlmostEqual([0], wrapped_offsets(1))
+        self.assertArrayAlmostEqual([0, 1], wrapped_offsets(2))
+        self.assertArrayAlmostEqual([0, 1, 4], wrapped_offsets(5))
+
+    def test_cells(self):
+
+        cell_list = CellList(
+            self.xmol, self.ymol, self.zmol, self.dim, self.max_r)
+
+        self.assertArrayAlmostEqual([6, 7, 20], cell_list.n_cells)
+        self.assertEqual(27, cell_list.offsets.shape[1])
+        self.assertEqual(400, np.sum(cell_list.cell_count))
+
+        cell_list = CellList(
+            self.xmol, self.ymol, self.zmol, self.dim, 25)
+        self.assertArrayAlmostEqual([1, 1, 2], cell_list.n_cells)
+        self.assertEqual(2, cell_list.offsets.shape[1])
+
+    def test_neighbour_counts(self):
+
+        cell_list = CellList(
+            self.xmol, self.ymol, self.zmol, self.dim, self.max_r)
+        self.assertArrayAlmostEqual(
+            self.dense_counts(np.arange(400)), cell_list.neighbour_counts())
+
+        indices = np.arange(0, 400, 3)
+        cell_list = CellList(
+            self.xmol, self.ymol, self.zmol, self.dim, self.max_r,
+            indices=indices)
+        self.assertArrayAlmostEqual(
+            self.dense_counts(indices), cell_list.neighbour_counts())
+
+    def test_query_neighbour_counts(self):
+
+        cell_list = CellList(
+            self.xmol, self.ymol, self.zmol, self.dim, self.max_r)
+        counts = self.dense_counts(np.arange(400))
+
+        self.assertArrayAlmostEqual(
+            counts[::20], cell_list.neighbour_counts(
+                x=self.xmol[::20], y=self.ymol[::20], z=self.zmol[::20]))
+
+        # Queries shifted by the cell length along z lie in the same
+        # cells, but have no neighbours
+        self.assertArrayAlmostEqual(
+            np.zeros(20), cell_list.neighbour_counts(
+                x=self.xmol[::20], y=self.ymol[::20],
+                z=self.zmol[::20] + self.dim[2]))
+
+    def test_neighbour_count(self):
+
+        cell_list = CellList(
+            self.xmol, self.ymol, self.zmol, self.dim, self.max_r)
+        counts = self.dense_counts(np.arange(400))
+
+        for index in range(0, 400, 20):
+            self.assertEqual(
+                counts[index],
+                cell_list.neighbour_count(
+                    self.xmol[index], self.ymol[index], self.zmol[index])
+            )
+
+        # Shifting a molecule by the cell length along z retains its
+        # cell, while its neighbours are measured from new position
+        self.zmol[0] += self.dim[2]
+        self.assertEqual(
+            1, cell_list.neighbour_count(
+                self.xmol[0], self.ymol[0], self.zmol[0]))
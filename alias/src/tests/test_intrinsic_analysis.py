@@ -1,10 +1,18 @@
+import os
+from tempfile import TemporaryDirectory
+
 import numpy as np
+import tables
 
+from alias.io.hdf5_io import AliasStore
 from alias.src.intrinsic_analysis import (
-    coeff_slice
+    coeff_slice, make_pos_dxdy, create_intrinsic_positions_dxdyz
 )
+from alias.src.intrinsic_surface import xi, dxy_dxi, ddxy_ddxi
 from alias.src.surface_reconstruction import (
     H_xy, H_var_mol)
+from alias.src.utilities import (
+    create_results_file_path, results_parameters)
 from alias.tests.alias_test_case import AliasTestCase
 
 
@@ -48,6 +56,106 @@ class TestIA(AliasTestCase):
 
         self.assertTrue(np.allclose(H_var, np.var(H_array), 0.07))
 
+    def test_make_pos_dxdy(self):
+
+        pos = np.linspace(0, 10, 12)
+        coeff = np.stack([self.coeff, np.linspace(-1, 1, self.n_waves ** 2)])
+
+        int_z_mol, int_dxdy_mol, int_ddxddy_mol = make_pos_dxdy(
+            pos, pos, coeff, 12, self.dim, self.qm)
+
+        self.assertEqual((2, self.qm + 1, 12), int_z_mol.shape)
+        self.assertEqual((4, self.qm + 1, 12), int_dxdy_mol.shape)
+        self.assertEqual((4, self.qm + 1, 12), int_ddxddy_mol.shape)
+
+        for qu in [0, 3, self.qm]:
+            for surf in range(2):
+                self.assertArrayAlmostEqual(
+                    xi(pos, pos, coeff[surf], self.qm, qu, self.dim),
+                    int_z_mol[surf, qu])
+                self.assertArrayAlmostEqual(
+                    dxy_dxi(pos, pos, coeff[surf], self.qm, qu, self.dim),
+                    int_dxdy_mol[2 * surf: 2 * surf + 2, qu])
+                self.assertArrayAlmostEqual(
+                    ddxy_ddxi(pos, pos, coeff[surf], self.qm, qu, self.dim),
+                    int_ddxddy_mol[2 * surf: 2 * surf + 2, qu])
+
+        subset = make_pos_dxdy(
+            pos, pos, coeff, 12, self.dim, self.qm, qu_list=[1, 4])
+
+        for array, sub_array in zip(
+                [int_z_mol, int_dxdy_mol, int_ddxddy_mol], subset):
+            self.assertEqual(2, sub_array.shape[1])
+            self.assertArrayAlmostEqual(array[:, [1, 4]], sub_array)
+
+        for qu_list in ([1, self.qm + 1], [-1, 2]):
+            with self.assertRaises(ValueError):
+                make_pos_dxdy(
+                    pos, pos, coeff, 12, self.dim, self.qm, qu_list=qu_list)
+
+    def test_create_intrinsic_positions_dxdyz(self):
+
+        nframe, nmol = 2, 12
+        random = np.random.RandomState(4)
+
+        with TemporaryDirectory() as directory:
+            for name in ['xmol', 'ymol']:
+                np.save(
+                    os.path.join(directory, 'pos') + f'test_{nframe}_{name}',
+                    random.uniform(0, 10, (nframe, nmol)))
+
+            results_file = create_results_file_path('test', directory)
+            with AliasStore() as store:
+                group = store.parameter_group(
+                    results_file,
+                    **results_parameters(self.qm, 10, 1E-8, False))
+                store.create(
+                    results_file, (2, self.n_waves ** 2),
+                    tables.Float64Atom(), nframe, node=group + '/coeff')
+                for frame in range(nframe):
+                    store.save(
+                        results_file, 0.01 * random.normal(
+                            size=(2, self.n_waves ** 2)),
+                        frame, node=group + '/coeff')
+
+            def int_z_mol(dim_z=50., name='int_z_mol', **kwargs):
+                create_intrinsic_positions_dxdyz(
+                    directory, 'test', nmol, nframe, self.qm, 10, 1E-8,
+                    self.dim + [dim_z], **kwargs)
+                with AliasStore() as store:
+                    node = group + '/' + name
+                    return (store.load(results_file, node=node),
+                            store.attrs(results_file, node))
+
+            z_mol, attrs = int_z_mol(qu_list=[1, 3])
+            self.assertEqual((nframe, 2, 2, nmol), z_mol.shape)
+
+            # Datasets are replaced when requested storage changes
+            z_mol_16, attrs = int_z_mol(
+                qu_list=[1, 3], dtype='int16', precision=1E-3)
+            self.assertEqual('int16', attrs['dtype'])
+            self.assertAlmostEqual(2E-3, attrs['scale_factor'])
+            self.assertTrue(np.allclose(z_mol, z_mol_16, atol=1E-3))
+
+            _, attrs = int_z_mol(
+                qu_list=[1, 3], dtype='int16', precision=1E-2)
+            self.assertAlmostEqual(2E-2, attrs['scale_factor'])
+
+            # Surface positions are stored with a resolution spanning
+            # the cell height, derivatives still to within precision
+            _, attrs = int_z_mol(
+                dim_z=200., qu_list=[1, 3], dtype='int16', precision=1E-3)
+            self.assertAlmostEqual(200. / 32767, attrs['scale_factor'])
+            _, attrs = int_z_mol(
+                dim_z=200., name='int_dxdy_mol',
+                qu_list=[1, 3], dtype='int16', precision=1E-3)
+            self.assertAlmostEqual(2E-3, attrs['scale_factor'])
+
+            z_mol, attrs = int_z_mol(qu_list=[0, 2, 3])
+            self.assertEqual((nframe, 2, 3, nmol), z_mol.shape)
+            self.assertArrayAlmostEqual([0, 2, 3], attrs['qu_list'])
+            self.assertNotIn('scale_factor', attrs)
+
     def test_coeff_slice(self):
         qm = 5
         qu = 3
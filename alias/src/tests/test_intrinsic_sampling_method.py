@@ -2,7 +2,13 @@ from unittest import TestCase
 
 import numpy as np
 
-from alias.src.intrinsic_surface import xi, dxy_dxi, ddxy_ddxi
+from alias.src.intrinsic_surface import (
+    xi, xi_range, dxy_dxi, ddxy_ddxi, SurfaceEvaluator
+)
+from alias.src.intrinsic_sampling_method import (
+    pivot_swap, surviving_pivots, build_surface
+)
+from alias.src.spectra import intrinsic_area
 
 
 class TestISM(TestCase):
@@ -30,6 +36,26 @@ class TestISM(TestCase):
             array = xi(x, x, self.coeff, self.qm, self.qu, self.dim)
             self.assertTrue(np.allclose(array, xi_array[index]))
 
+    def test_xi_range(self):
+
+        grid = np.linspace(0, 1, 200, endpoint=False)
+        x, y = np.meshgrid(grid * self.dim[0], grid * self.dim[1])
+        xi_grid = xi(
+            x.ravel(), y.ravel(), self.coeff, self.qm, self.qm, self.dim)
+
+        # Range encloses extrema between coarse grid points
+        for n_grid in [5, 20, None]:
+            xi_min, xi_max = xi_range(
+                self.coeff, self.qm, self.dim, n_grid=n_grid)
+            self.assertLessEqual(xi_min, np.min(xi_grid))
+            self.assertGreaterEqual(xi_max, np.max(xi_grid))
+
+        # Padding vanishes for flat surfaces
+        coeff = np.zeros(self.n_waves ** 2)
+        coeff[self.n_waves ** 2 // 2] = 2.
+        self.assertAlmostEqual(
+            (2., 2.), xi_range(coeff, self.qm, self.dim))
+
     def test_dxy_dxi(self):
 
         dx_dxi_array, dy_dxi_array = dxy_dxi(
@@ -61,3 +87,172 @@ class TestISM(TestCase):
 
             self.assertTrue(np.allclose(ddx_ddxi, ddx_ddxi_array[index]))
             self.assertTrue(np.allclose(ddy_ddxi, ddy_ddxi_array[index]))
+
+
+class TestSurfaceEvaluator(TestCase):
+
+    def setUp(self):
+        self.qm = 4
+        self.qu = 3
+        self.n_waves = 2 * self.qm + 1
+        self.coeff = np.linspace(-1, 1, self.n_waves ** 2)
+        self.dim = [10., 12.]
+
+        self.x = np.linspace(0, 10, 15)
+        self.y = np.linspace(1, 12, 15)
+        self.evaluator = SurfaceEvaluator(
+            self.x, self.y, self.qm, self.dim)
+
+    def test_xi(self):
+
+        xi_array = self.evaluator.xi(self.coeff, self.qu)
+
+        self.assertEqual((15,), xi_array.shape)
+        for index, (x, y) in enumerate(zip(self.x, self.y)):
+            self.assertAlmostEqual(
+                xi(x, y, self.coeff, self.qm, self.qu, self.dim),
+                xi_array[index])
+
+    def test_derivatives(self):
+
+        dx_dxi, dy_dxi = self.evaluator.dxy_dxi(self.coeff, self.qu)
+        ddx_ddxi, ddy_ddxi = self.evaluator.ddxy_ddxi(self.coeff, self.qu)
+
+        for index, (x, y) in enumerate(zip(self.x, self.y)):
+            dxy = dxy_dxi(x, y, self.coeff, self.qm, self.qu, self.dim)
+            ddxy = ddxy_ddxi(x, y, self.coeff, self.qm, self.qu, self.dim)
+
+            self.assertAlmostEqual(dxy[0], dx_dxi[index])
+            self.assertAlmostEqual(dxy[1], dy_dxi[index])
+            self.assertAlmostEqual(ddxy[0], ddx_ddxi[index])
+            self.assertAlmostEqual(ddxy[1], ddy_ddxi[index])
+
+        self.assertTrue(np.allclose(
+            ddx_ddxi + ddy_ddxi,
+            self.evaluator.H_xy(self.coeff, self.qu)))
+
+    def test_indices(self):
+
+        indices = np.array([2, 5, 11])
+        xi_array = self.evaluator.xi(self.coeff)
+
+        self.assertTrue(np.allclose(
+            xi_array[indices],
+            self.evaluator.xi(self.coeff, indices=indices)))
+
+    def test_basis(self):
+
+        indices = np.array([2, 5, 11])
+        fuv = self.evaluator.basis(indices)
+
+        self.assertEqual((self.n_waves ** 2, 3), fuv.shape)
+        self.assertTrue(np.allclose(
+            self.evaluator.xi(self.coeff, indices=indices),
+            np.dot(self.coeff, fuv)))
+
+    def test_memory_cap(self):
+
+        evaluator = SurfaceEvaluator(
+            self.x, self.y, self.qm, self.dim, max_memory=0)
+
+        self.assertTrue(np.allclose(
+            self.evaluator.xi(self.coeff), evaluator.xi(self.coeff)))
+        self.assertEqual(0, evaluator.memory)
+        self.assertEqual(
+            2 * self.x.size * self.n_waves * 8, self.evaluator.memory)
+
+    def test_area_weights(self):
+
+        for qu in [self.qu, self.qm]:
+            self.assertAlmostEqual(
+                intrinsic_area(self.coeff, self.qm, qu, self.dim),
+                intrinsic_area(
+                    self.coeff, self.qm, qu, self.dim,
+                    evaluator=self.evaluator)
+            )
+
+
+class TestPivotSwap(TestCase):
+
+    def setUp(self):
+        self.dim = np.array([20., 20., 60.])
+        self.max_r = 3.
+
+        random = np.random.RandomState(2)
+        self.xmol = random.uniform(0, self.dim[0], 180)
+        self.ymol = random.uniform(0, self.dim[1], 180)
+        self.zmol = random.uniform(-30, 30, 180)
+
+    def test_pivot_swap(self):
+
+        pivots = [np.arange(120), np.arange(120, 180)]
+        _, new_pivots = pivot_swap(
+            self.xmol, self.ymol, self.zmol,
+            [pivot.copy() for pivot in pivots], self.dim, self.max_r, 90)
+
+        # Reference: move pivot with fewest neighbours one at a time
+        piv_g, piv_l = pivots
+        while piv_g.size > 90:
+            dxyz = np.stack(
+                (self.xmol[piv_g], self.ymol[piv_g], self.zmol[piv_g]))
+            dxyz = dxyz[:, :, None] - dxyz[:, None, :]
+            for i, l in enumerate(self.dim[:2]):
+                dxyz[i] -= l * np.array(2 * dxyz[i] / l, dtype=int)
+            neighbour_count = np.count_nonzero(
+                np.sum(dxyz**2, axis=0) < self.max_r**2, axis=1)
+
+            index = np.argsort(neighbour_count, kind='stable')[:1]
+            piv_l = np.concatenate((piv_l, piv_g[index]))
+            piv_g = np.delete(piv_g, index)
+
+        self.assertTrue(np.array_equal(piv_g, new_pivots[0]))
+        self.assertTrue(np.array_equal(piv_l, new_pivots[1]))
+
+
+class TestWarmStart(TestCase):
+
+    def setUp(self):
+        self.dim = np.array([20., 20., 60.])
+        self.qm = 2
+        self.n_waves = 2 * self.qm + 1
+
+        random = np.random.RandomState(4)
+        self.xmol = random.uniform(0, self.dim[0], 800)
+        self.ymol = random.uniform(0, self.dim[1], 800)
+        self.zmol = random.uniform(-8, 8, 800)
+
+    def test_surviving_pivots(self):
+
+        # Flat surfaces at z = -7 and z = 7
+        coeff = np.zeros((2, self.n_waves ** 2))
+        coeff[:, self.n_waves ** 2 // 2] = [-7, 7]
+
+        pivot = [np.arange(0, 400, 2), np.arange(1, 400, 2)]
+        mol_list = np.arange(10, 800)
+
+        piv_n1, piv_n2 = surviving_pivots(
+            self.xmol, self.ymol, self.zmol, self.dim, self.qm, 1.,
+            mol_list, coeff, pivot)
+
+        for piv_n, surface, previous in zip(
+                [piv_n1, piv_n2], [-7, 7], pivot):
+            self.assertTrue(np.all(piv_n >= 10))
+            self.assertTrue(np.all(np.abs(self.zmol[piv_n] - surface) <= 1))
+            self.assertTrue(np.array_equal(
+                previous[(previous >= 10)
+                         & (np.abs(self.zmol[previous] - surface) <= 1)],
+                piv_n))
+
+    def test_build_surface(self):
+
+        coeff, pivot = build_surface(
+            self.xmol, self.ymol, self.zmol.copy(), self.dim, self.qm,
+            20, 1E-4, 1., 3.)
+
+        # Surfaces fitted to same frame are recovered from their pivots
+        coeff_warm, pivot_warm = build_surface(
+            self.xmol, self.ymol, self.zmol.copy(), self.dim, self.qm,
+            20, 1E-4, 1., 3., warm_start=(coeff, pivot))
+
+        self.assertTrue(np.array_equal(pivot, pivot_warm))
+        self.assertTrue(np.allclose(coeff, coeff_warm))
@@ -0,0 +1,230 @@
+from unittest import mock
+
+import numpy as np
+
+from alias.src.intrinsic_surface import SurfaceEvaluator
+from alias.src.linear_algebra import (
+    update_A_b,
+    structure_factor,
+    structure_update_A_b,
+    form_A_b,
+    cholesky_factor,
+    eigen_decomposition,
+    mixed_precision_decomposition,
+    solve_linear,
+    cholesky_update,
+    IncrementalCholesky,
+    woodbury_decomposition,
+    SOLVERS,
+    STRUCTURE_FACTOR_PIVOTS
+)
+from alias.src.self_consistent_cycle import initialise_surface
+from alias.src.wave_basis import wave_basis
+from alias.tests.alias_test_case import AliasTestCase
+
+
+class TestLinearAlgebra(AliasTestCase):
+
+    def setUp(self):
+
+        self.qm = 3
+        self.dim = np.array([12., 9., 30.])
+
+        random = np.random.RandomState(11)
+        self.xmol = random.uniform(0, self.dim[0], 50)
+        self.ymol = random.uniform(0, self.dim[1], 50)
+        self.zmol = random.normal(0, 2, 50)
+        self.pivot = [np.arange(0, 20), np.arange(25, 45)]
+
+    def test_structure_factor(self):
+
+        s_pq = structure_factor(
+            self.xmol, self.ymol, self.dim, 2, 3, weights=self.zmol)
+
+        self.assertEqual((5, 7), s_pq.shape)
+        self.assertAlmostEqual(np.sum(self.zmol), s_pq[2, 3])
+        self.assertAlmostEqual(
+            np.sum(self.zmol * np.exp(
+                2j * np.pi * (-self.xmol / self.dim[0]
+                              + 2 * self.ymol / self.dim[1]))),
+            s_pq[1, 5]
+        )
+
+    def test_structure_update_A_b(self):
+
+        A, b, _ = update_A_b(
+            self.xmol, self.ymol, self.zmol, self.dim, self.qm, self.pivot)
+        A_sf, b_sf = structure_update_A_b(
+            self.xmol, self.ymol, self.zmol, self.dim, self.qm, self.pivot)
+
+        A_ev, b_ev, _ = update_A_b(
+            self.xmol, self.ymol, self.zmol, self.dim, self.qm, self.pivot,
+            evaluator=SurfaceEvaluator(
+                self.xmol, self.ymol, self.qm, self.dim))
+        self.assertArrayAlmostEqual(A, A_ev)
+        self.assertArrayAlmostEqual(b, b_ev)
+
+        self.assertEqual(A.shape, A_sf.shape)
+        self.assertArrayAlmostEqual(A, A_sf)
+        self.assertArrayAlmostEqual(b, b_sf)
+
+        # Pivot lists for each surface may differ in length
+        A_sf, b_sf = structure_update_A_b(
+            self.xmol, self.ymol, self.zmol, self.dim, self.qm,
+            [self.pivot[0], []])
+        self.assertArrayAlmostEqual(A[0], A_sf[0])
+        self.assertArrayAlmostEqual(np.zeros(A[1].shape), A_sf[1])
+
+        A_ev, b_ev, fuv = update_A_b(
+            self.xmol, self.ymol, self.zmol, self.dim, self.qm,
+            [self.pivot[0], []])
+        self.assertArrayAlmostEqual(A_sf, A_ev)
+        self.assertArrayAlmostEqual(b_sf, b_ev)
+        self.assertEqual((49, 0), fuv[1].shape)
+
+    def test_form_A_b(self):
+
+        for assembly in ['auto', 'wave_product', 'structure_factor']:
+            A, b = form_A_b(
+                self.xmol, self.ymol, self.zmol, self.dim, self.qm,
+                self.pivot, assembly=assembly)
+            self.assertEqual((2, 49, 49), A.shape)
+            self.assertEqual((2, 49), b.shape)
+
+        with self.assertRaises(AssertionError):
+            form_A_b(
+                self.xmol, self.ymol, self.zmol, self.dim, self.qm,
+                self.pivot, assembly='unknown')
+
+        # Waves within an ellipse of frequencies only
+        modes = wave_basis(self.qm, self.dim).indices(self.qm, 1.5)
+        block = np.ix_(modes, modes)
+        evaluator = SurfaceEvaluator(self.xmol, self.ymol, self.qm, self.dim)
+        for assembly in ['wave_product', 'structure_factor']:
+            for engine_evaluator in [None, evaluator]:
+                A_modes, b_modes = form_A_b(
+                    self.xmol, self.ymol, self.zmol, self.dim, self.qm,
+                    self.pivot, assembly=assembly,
+                    evaluator=engine_evaluator, indices=modes)
+                self.assertEqual((2, modes.size, modes.size), A_modes.shape)
+                for index in range(2):
+                    self.assertArrayAlmostEqual(
+                        A[index][block], A_modes[index])
+                    self.assertArrayAlmostEqual(
+                        b[index][modes], b_modes[index])
+
+        # Large batches of pivots are assembled from structure factors
+        with mock.patch(
+                'alias.src.linear_algebra.structure_update_A_b',
+                return_value=(None, None)) as mock_engine:
+            form_A_b(
+                self.xmol, self.ymol, self.zmol, self.dim, self.qm,
+                self.pivot)
+            self.assertFalse(mock_engine.called)
+
+            pivot = [np.arange(STRUCTURE_FACTOR_PIVOTS), []]
+            form_A_b(
+                self.xmol, self.ymol, self.zmol, self.dim, self.qm,
+                pivot)
+            self.assertTrue(mock_engine.called)
+
+    def test_cholesky_factor(self):
+
+        A, _ = structure_update_A_b(
+            self.xmol, self.ymol, self.zmol, self.dim, 1, self.pivot)
+        factor, rcond = cholesky_factor(A[0])
+
+        self.assertArrayAlmostEqual(A[0], np.dot(factor.T, factor))
+        self.assertGreater(rcond, 0)
+        self.assertLessEqual(rcond, 1)
+
+        factor, rcond = cholesky_factor(-A[0])
+        self.assertIsNone(factor)
+        self.assertEqual(0, rcond)
+
+    def test_solve_linear(self):
+
+        A, b = structure_update_A_b(
+            self.xmol, self.ymol, self.zmol, self.dim, self.qm, self.pivot)
+        A = A[0] + np.diag(np.linspace(0, 1, 49))
+        coeff = np.linalg.solve(A, b[0])
+
+        for solver in SOLVERS:
+            self.assertArrayAlmostEqual(
+                coeff, solve_linear(A, b[0], solver=solver))
+
+        self.assertArrayAlmostEqual(
+            coeff, mixed_precision_decomposition(A, b[0]))
+
+        # Systems that are singular in single precision are solved
+        # in double precision instead
+        A = np.diag([1., 1E-9, 0.])
+        b = np.array([1., 1E-9, 0.])
+        self.assertArrayAlmostEqual(
+            np.array([1., 1., 0.]), mixed_precision_decomposition(A, b))
+
+        with self.assertRaises(AssertionError):
+            solve_linear(A, b[0], solver='unknown')
+
+    def test_eigen_decomposition(self):
+
+        # Singular systems return minimum norm solutions
+        A = np.diag([2., 1., 0.])
+        b = np.array([2., 1., 0.])
+
+        self.assertArrayAlmostEqual(
+            np.array([1., 1., 0.]), eigen_decomposition(A, b))
+        self.assertArrayAlmostEqual(
+            np.array([1., 1., 0.]), solve_linear(A, b))
+
+    def test_cholesky_update(self):
+
+        A, _ = structure_update_A_b(
+            self.xmol, self.ymol, self.zmol, self.dim, 1, self.pivot)
+        factor, _ = cholesky_factor(A[0])
+        vectors = np.random.RandomState(3).normal(size=(9, 4))
+
+        cholesky_update(factor, vectors, block=4)
+        self.assertArrayAlmostEqual(
+            A[0] + np.dot(vectors, vectors.T), np.dot(factor.T, factor))
+        self.assertTrue(np.all(np.diag(factor) > 0))
+        self.assertArrayAlmostEqual(np.zeros((9, 9)), np.tril(factor, -1))
+
+    def test_incremental_cholesky(self):
+
+        A, b = structure_update_A_b(
+            self.xmol, self.ymol, self.zmol, self.dim, 1, self.pivot)
+        vectors = np.random.RandomState(3).normal(size=(9, 4))
+        incremental = IncrementalCholesky()
+
+        # Factor is built on first solve
+        incremental.update(vectors)
+        self.assertIsNone(incremental.factor)
+        self.assertArrayAlmostEqual(
+            np.linalg.solve(A[0], b[0]), incremental.solve(A[0], b[0]))
+        self.assertEqual(1, incremental.n_refactor)
+
+        incremental.update(vectors)
+        A_update = A[0] + np.dot(vectors, vectors.T)
+        self.assertArrayAlmostEqual(
+            np.linalg.solve(A_update, b[0]),
+            incremental.solve(A_update, b[0]))
+        self.assertEqual(1, incremental.n_refactor)
+
+        # Inconsistent factor triggers refactorisation
+        self.assertArrayAlmostEqual(
+            np.linalg.solve(A[0], b[0]), incremental.solve(A[0], b[0]))
+        self.assertEqual(2, incremental.n_refactor)
+
+    def test_woodbury_decomposition(self):
+
+        _, _, _, area_diag = initialise_surface(self.qm, 1E-2, self.dim)
+        A, b = structure_update_A_b(
+            self.xmol, self.ymol, self.zmol, self.dim, self.qm, self.pivot)
+        evaluator = SurfaceEvaluator(self.xmol, self.ymol, self.qm, self.dim)
+
+        for index, piv_n in enumerate(self.pivot):
+            coeff = woodbury_decomposition(
+                evaluator.basis(piv_n), self.zmol[piv_n], area_diag)
+            self.assertArrayAlmostEqual(
+                solve_linear(A[index] + area_diag, b[index]), coeff)
@@ -0,0 +1,55 @@
+import os
+from unittest import TestCase
+
+from alias.src.parallel import (
+    ordered_map, blas_threads, worker_threads,
+    Call, BLAS_THREAD_VARIABLES
+)
+
+
+class TestParallel(TestCase):
+
+    def setUp(self):
+        self.arguments = [(index, 2) for index in range(10)]
+        self.results = [index ** 2 for index in range(10)]
+
+    def test_worker_threads(self):
+        self.assertEqual(1, worker_threads(10 * os.cpu_count()))
+        self.assertEqual(os.cpu_count(), worker_threads(1))
+
+    def test_blas_threads(self):
+        original = {
+            variable: os.environ.get(variable)
+            for variable in BLAS_THREAD_VARIABLES
+        }
+
+        with blas_threads(3):
+            for variable in BLAS_THREAD_VARIABLES:
+                self.assertEqual('3', os.environ[variable])
+
+        for variable in BLAS_THREAD_VARIABLES:
+            self.assertEqual(original[variable], os.environ.get(variable))
+
+    def test_ordered_map(self):
+        self.assertListEqual(
+            self.results, list(ordered_map(pow, self.arguments)))
+
+        # Results are returned in order with fewer queued calls
+        # than arguments
+        self.assertListEqual(
+            self.results,
+            list(ordered_map(pow, iter(self.arguments), jobs=2, buffer=1))
+        )
+
+        # Keyword arguments are passed with each Call
+        self.assertListEqual(
+            [index % 3 for index in range(10)],
+            list(ordered_map(
+                pow, [Call((index, 1), {'mod': 3}) for index in range(10)],
+                jobs=2))
+        )
+
+        # Calls without keyword arguments do not share a dictionary
+        self.assertIsNone(Call((2, 3)).kwargs)
+        self.assertListEqual(
+            [8, 9], list(ordered_map(pow, [Call((2, 3)), Call((3, 2))])))
@@ -1,3 +1,6 @@
+import tempfile
+from unittest import mock
+
 import numpy as np
 import mdtraj as md
 
@@ -6,7 +9,12 @@ from alias.src.positions import (
     minimum_image,
     coordinate_arrays,
     orientation,
-    batch_coordinate_loader
+    batch_coordinate_loader,
+    frame_range_readable,
+    coordinate_reduction,
+    parallel_coordinate_loader,
+    trajectory_index,
+    check_pbc
 )
 from alias.tests.alias_test_case import AliasTestCase
 from alias.tests.fixtures import (
@@ -87,6 +95,116 @@ class TestPositions(AliasTestCase):
         self.assertEqual((10, 3), cell_dim.shape)
         self.assertEqual((10, 3), com_traj.shape)
 
+        # System centre of mass is estimated from a subset of atoms
+        # outside the surface forming molecules by default
+        traj = md.load(amber_trajectory, top=amber_topology)
+        atom_indices, _ = coordinate_reduction(
+            self.parameters, traj.topology)
+        self.assertLess(atom_indices.size, traj.n_atoms)
+        self.assertTrue(np.all(np.isin(
+            self.parameters.atom_indices, atom_indices)))
+
+        # Exact centre of mass of whole system
+        self.parameters.com_stride = 1
+        atom_indices, _ = coordinate_reduction(
+            self.parameters, traj.topology)
+        self.assertEqual(traj.n_atoms, atom_indices.size)
+        outputs = batch_coordinate_loader(
+            amber_trajectory, self.parameters,
+            topology=amber_topology)
+        self.assertArrayAlmostEqual(mol_traj, outputs[0])
+        self.assertArrayAlmostEqual(
+            md.compute_center_of_mass(traj) * 10, outputs[1])
+        self.parameters.com_stride = 7
+
+        # Centre of mass of surface forming molecules only
+        self.parameters.com_reference = 'molecules'
+        atom_indices, _ = coordinate_reduction(
+            self.parameters, traj.topology)
+        self.assertArrayAlmostEqual(
+            self.parameters.atom_indices, atom_indices)
+        outputs = batch_coordinate_loader(
+            amber_trajectory, self.parameters,
+            topology=amber_topology)
+        self.assertArrayAlmostEqual(
+            md.compute_center_of_mass(
+                traj.atom_slice(self.parameters.atom_indices)) * 10,
+            outputs[1])
+        self.parameters.com_reference = 'system'
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            outputs = batch_coordinate_loader(
+                amber_trajectory, self.parameters,
+                topology=amber_topology, chunk=3,
+                file_path=tmp_dir + '/test')
+
+            for output, array in zip(
+                    outputs, [mol_traj, com_traj, cell_dim, mol_vec]):
+                self.assertIsInstance(output, np.memmap)
+                self.assertArrayAlmostEqual(array, output)
+
+    def test_parallel_coordinate_loader(self):
+
+        outputs = batch_coordinate_loader(
+            amber_trajectory, self.parameters,
+            topology=amber_topology)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = tmp_dir + '/test'
+            self.assertEqual(
+                (10, None), trajectory_index(amber_trajectory, file_path))
+
+            for output, array in zip(
+                    outputs, parallel_coordinate_loader(
+                        amber_trajectory, self.parameters, file_path,
+                        topology=amber_topology, chunk=2, jobs=2)):
+                self.assertArrayAlmostEqual(output, array)
+
+            # XTC files require frame offsets to seek, which are
+            # stored for reuse
+            xtc_trajectory = tmp_dir + '/test.xtc'
+            traj = md.load(amber_trajectory, top=amber_topology)
+            traj.save(xtc_trajectory)
+
+            n_frames, offsets = trajectory_index(
+                xtc_trajectory, file_path)
+            self.assertEqual(10, n_frames)
+            self.assertEqual((10,), offsets.shape)
+            self.assertArrayAlmostEqual(
+                offsets, np.load(file_path + '_offsets.npy'))
+
+            # Stored offsets are reused without reading the file
+            np.save(file_path + '_offsets', offsets[:4])
+            n_frames, cached = trajectory_index(xtc_trajectory, file_path)
+            self.assertEqual(4, n_frames)
+            self.assertArrayAlmostEqual(offsets[:4], cached)
+            np.save(file_path + '_offsets', offsets)
+
+            self.assertTrue(frame_range_readable(xtc_trajectory))
+            self.assertTrue(frame_range_readable(amber_trajectory))
+            pdb_trajectory = tmp_dir + '/test.pdb'
+            traj[:2].save(pdb_trajectory)
+            self.assertFalse(frame_range_readable(pdb_trajectory))
+
+            # Errors raised while decoding are not hidden by a serial
+            # fallback
+            with mock.patch(
+                    'alias.src.positions.parallel_coordinate_loader',
+                    side_effect=ValueError):
+                with self.assertRaises(ValueError):
+                    batch_coordinate_loader(
+                        xtc_trajectory, self.parameters,
+                        topology=amber_topology, file_path=file_path,
+                        jobs=2)
+
+            outputs = batch_coordinate_loader(
+                xtc_trajectory, self.parameters, topology=amber_topology)
+            for output, array in zip(
+                    outputs, parallel_coordinate_loader(
+                        xtc_trajectory, self.parameters, file_path,
+                        topology=amber_topology, chunk=2, jobs=1)):
+                self.assertArrayAlmostEqual(output, array)
+
     def test_simple_molecular_positions(self):
 
         coord = self.simple_coord[:-1]
@@ -197,3 +315,48 @@ class TestPositions(AliasTestCase):
 
         with self.assertRaises(AssertionError):
             minimum_image(d_coord, self.cell_dim[:2])
+
+    def test_check_pbc(self):
+
+        def dense_check_pbc(xmol, ymol, zmol, pivots, dim, max_r):
+            for index_i, pivot in enumerate(pivots):
+                for check in range(2):
+                    for n in pivot:
+                        dxyz = np.stack(
+                            (xmol[pivot] - xmol[n],
+                             ymol[pivot] - ymol[n],
+                             zmol[pivot] - zmol[n]), axis=-1)
+                        minimum_image(dxyz[:, :2], dim[:2])
+                        count = np.count_nonzero(
+                            np.sum(dxyz**2, axis=1) < max_r**2)
+
+                        dxyz[:, 2] += dim[2] * np.array([-1, 1])[index_i]
+                        count_flip = np.count_nonzero(
+                            np.sum(dxyz**2, axis=1) < max_r**2)
+
+                        if count_flip > count:
+                            zmol[n] += dim[2] * np.array([1, -1])[index_i]
+            return zmol
+
+        dim = np.array([40., 40., 60.])
+        random = np.random.RandomState(3)
+        xmol = random.uniform(0, dim[0], 600)
+        ymol = random.uniform(0, dim[1], 600)
+        zmol = random.uniform(-40, 40, 600)
+        pivots = [np.arange(0, 300, 2), np.arange(1, 300, 2)]
+
+        # Both cell list and dense neighbour searches are covered
+        for max_r in [4., 15.]:
+            z_pbc = dense_check_pbc(
+                xmol, ymol, zmol.copy(), pivots, dim, max_r)
+            self.assertFalse(np.allclose(zmol, z_pbc))
+            self.assertArrayAlmostEqual(
+                z_pbc, check_pbc(
+                    xmol, ymol, zmol.copy(), pivots, dim, max_r))
+
+            # Unwrapped coordinates are treated as their periodic images
+            shifts = random.randint(-3, 4, (2, 600))
+            self.assertArrayAlmostEqual(
+                z_pbc, check_pbc(
+                    xmol + dim[0] * shifts[0], ymol + dim[1] * shifts[1],
+                    zmol.copy(), pivots, dim, max_r))
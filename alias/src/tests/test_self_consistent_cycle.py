@@ -0,0 +1,226 @@
+from unittest import mock
+
+import numpy as np
+
+from alias.src.intrinsic_surface import SurfaceEvaluator
+from alias.src.linear_algebra import (
+    structure_update_A_b, solve_linear, form_A_b)
+from alias.src.slab_index import SlabIndex
+from alias.src.self_consistent_cycle import (
+    initialise_surface,
+    initialise_recon,
+    make_zeta_list,
+    pivot_selection,
+    select_pivots,
+    search_tau,
+    resolution_stages,
+    truncated_solve,
+    self_consistent_cycle
+)
+from alias.src.wave_basis import wave_basis
+from alias.tests.alias_test_case import AliasTestCase
+
+
+class TestSelfConsistentCycle(AliasTestCase):
+
+    def setUp(self):
+
+        self.qm = 4
+        self.dim = np.array([20., 20., 60.])
+
+        random = np.random.RandomState(8)
+        self.xmol = random.uniform(0, self.dim[0], 1200)
+        self.ymol = random.uniform(0, self.dim[1], 1200)
+        self.zmol = random.uniform(-8, 8, 1200)
+        self.n0 = 60
+
+    def _run_cycle(self, phi=1E-3, coeff=None, piv_n=None, **kwargs):
+        """Run self consistent cycle on test molecules, starting from
+        piv_n (default=the lowest and highest 4 molecules in z)"""
+
+        init_coeff, A, b, _ = initialise_surface(self.qm, phi, self.dim)
+        if coeff is None:
+            coeff = init_coeff
+        if piv_n is None:
+            order = np.argsort(self.zmol)
+            piv_n = (order[:4], order[-4:])
+        piv_n1, piv_n2 = piv_n
+        mol_list = np.setdiff1d(
+            np.arange(self.zmol.size), np.concatenate((piv_n1, piv_n2)))
+
+        return self_consistent_cycle(
+            coeff, A, b, self.dim, self.qm, 1., self.xmol, self.ymol,
+            self.zmol, [piv_n1, piv_n2], mol_list, mol_list, phi, self.n0,
+            new_piv1=piv_n1, new_piv2=piv_n2, **kwargs)
+
+    def test_search_tau(self):
+
+        zeta_list = np.array([0.7, 0.35, 0.9])
+        self.assertAlmostEqual(0.4, search_tau(zeta_list, 0.1, 0.1))
+        self.assertAlmostEqual(0.5, search_tau(zeta_list, 0.5, 0.1))
+        self.assertAlmostEqual(0.1, search_tau([], 0.1, 0.1))
+
+    def test_pivot_selection(self):
+
+        available = np.ones(10, dtype=bool)
+        mol_list = np.arange(2, 10)
+        zeta_list = np.array([0.3, 0.1, 0.5, 0.1, 4., 0.2, 0.4, 1.])
+
+        new_piv, piv_n = pivot_selection(
+            available, mol_list, zeta_list, np.array([0, 1]), 0.3, 5)
+
+        # Closest molecules within tau, ties in order of index
+        self.assertArrayAlmostEqual(np.array([3, 5, 7]), new_piv)
+        self.assertArrayAlmostEqual(np.array([0, 1, 3, 5, 7]), piv_n)
+
+        # New pivots and distant molecules are no longer available
+        self.assertArrayAlmostEqual(
+            np.flatnonzero(available), np.array([0, 1, 2, 4, 8, 9]))
+
+    def test_select_pivots(self):
+
+        coeff = np.zeros((2 * self.qm + 1) ** 2)
+        coeff[self.qm * (2 * self.qm + 1) + self.qm] = 6.
+        coeff[0] = 0.5
+        mol_list = np.arange(10, self.zmol.size)
+        piv_n = np.arange(10)
+
+        # Reference: search all available molecules
+        available = np.zeros(self.zmol.size, dtype=bool)
+        available[mol_list] = True
+        zeta_list = make_zeta_list(
+            self.xmol, self.ymol, self.zmol, self.dim, mol_list,
+            coeff, self.qm, self.qm)
+        tau = search_tau(zeta_list, 0.05, 0.02)
+        new_piv, _ = pivot_selection(
+            available, mol_list, zeta_list, piv_n, tau, 40)
+
+        slab_index = SlabIndex(self.zmol, self.dim, mol_list)
+        result = select_pivots(
+            slab_index, self.xmol, self.ymol, self.zmol, self.dim,
+            coeff, self.qm, 0.05, 0.02, piv_n, 40)
+
+        self.assertAlmostEqual(tau, result[0])
+        self.assertArrayAlmostEqual(new_piv, result[1])
+        self.assertArrayAlmostEqual(
+            np.flatnonzero(available), slab_index.mol_list())
+
+    def test_resolution_stages(self):
+
+        self.assertListEqual(
+            [(1, 9), (2, 25), (5, 121)], resolution_stages(5, 121))
+        self.assertListEqual(
+            [(1, 1), (2, 5)], resolution_stages(2, 5))
+
+    def test_truncated_solve(self):
+
+        _, _, _, area_diag = initialise_surface(self.qm, 1E-3, self.dim)
+        pivot = np.arange(30)
+        A, b = structure_update_A_b(
+            self.xmol, self.ymol, self.zmol, self.dim, self.qm,
+            [pivot, pivot])
+        indices = wave_basis(self.qm, self.dim).indices(2)
+
+        # Reference: solve for waves up to qu = 2 alone
+        A_2, b_2 = structure_update_A_b(
+            self.xmol, self.ymol, self.zmol, self.dim, 2, [pivot, pivot])
+        _, _, _, area_diag_2 = initialise_surface(2, 1E-3, self.dim)
+        coeff = np.zeros((2 * self.qm + 1) ** 2)
+        coeff[indices] = solve_linear(A_2[0] + area_diag_2, b_2[0])
+
+        self.assertArrayAlmostEqual(
+            coeff, truncated_solve(
+                A[0], b[0], area_diag, indices))
+
+        evaluator = SurfaceEvaluator(self.xmol, self.ymol, self.qm, self.dim)
+        self.assertArrayAlmostEqual(
+            coeff, truncated_solve(
+                A[0], b[0], area_diag, indices,
+                fuv=evaluator.basis(pivot), zmol=self.zmol[pivot]))
+
+    def test_coarse_to_fine(self):
+
+        coeff, pivot = self._run_cycle(coarse_to_fine=True)
+
+        self.assertEqual((2, self.n0), pivot.shape)
+
+        # Final coefficients are solved at full resolution
+        _, _, _, area_diag = initialise_surface(self.qm, 1E-3, self.dim)
+        A, b = structure_update_A_b(
+            self.xmol, self.ymol, self.zmol, self.dim, self.qm, pivot)
+        for index in range(2):
+            self.assertArrayAlmostEqual(
+                solve_linear(A[index] + area_diag, b[index]),
+                coeff[index])
+
+    def test_seeded_cycle(self):
+
+        coeff, pivot = self._run_cycle(woodbury=False)
+
+        # Surfaces seeded with previous coefficients select all
+        # remaining pivots before the first solve
+        with mock.patch(
+                'alias.src.self_consistent_cycle.form_A_b',
+                wraps=form_A_b) as mock_form:
+            _, pivot_seed = self._run_cycle(
+                coeff=coeff, piv_n=pivot[:, :4], woodbury=False)
+
+        self.assertEqual(1, mock_form.call_count)
+        self.assertEqual((2, self.n0), pivot_seed.shape)
+        for piv_n, piv_seed in zip(pivot, pivot_seed):
+            self.assertGreater(np.intersect1d(piv_n, piv_seed).size, 50)
+
+    def test_mixed_precision(self):
+
+        coeff, pivot = self._run_cycle(
+            phi=1E-8, solver='mixed', woodbury=False)
+
+        self.assertEqual((2, self.n0), pivot.shape)
+
+        _, _, _, area_diag = initialise_surface(self.qm, 1E-8, self.dim)
+        A, b = structure_update_A_b(
+            self.xmol, self.ymol, self.zmol, self.dim, self.qm, pivot)
+        for index in range(2):
+            self.assertArrayAlmostEqual(
+                solve_linear(A[index] + area_diag, b[index]),
+                coeff[index])
+
+    def test_circular_cutoff(self):
+
+        basis = wave_basis(self.qm, self.dim)
+        q_max = 2 * np.pi * 3 / self.dim[0]
+        indices = basis.indices(q_max=q_max)
+
+        coeff, pivot = self._run_cycle(q_max=q_max)
+
+        self.assertEqual((2, self.n0), pivot.shape)
+
+        # Waves outside cutoff are held at zero
+        self.assertFalse(np.any(coeff[:, ~basis.mask(q_max=q_max)]))
+
+        _, _, _, area_diag = initialise_surface(self.qm, 1E-3, self.dim)
+        A, b = structure_update_A_b(
+            self.xmol, self.ymol, self.zmol, self.dim, self.qm, pivot)
+        for index in range(2):
+            self.assertArrayAlmostEqual(
+                truncated_solve(A[index], b[index], area_diag, indices),
+                coeff[index])
+
+    def test_initialise_modes(self):
+
+        basis = wave_basis(self.qm, self.dim)
+        modes = basis.indices(2)
+        coeff, A, b, area_diag = initialise_surface(
+            self.qm, 1E-3, self.dim, modes)
+
+        self.assertEqual((2, basis.n_waves ** 2), coeff.shape)
+        self.assertEqual((2, modes.size, modes.size), A.shape)
+        self.assertEqual((2, modes.size), b.shape)
+        self.assertArrayAlmostEqual(
+            basis.area_diag(1E-3)[np.ix_(modes, modes)], area_diag)
+
+        _, curve_matrix, H_var = initialise_recon(
+            self.qm, 1E-3, self.dim, modes)
+        self.assertArrayAlmostEqual(
+            basis.curve_matrix[np.ix_(modes, modes)], curve_matrix)
+        self.assertArrayAlmostEqual(basis.H_var[modes], H_var)
@@ -0,0 +1,49 @@
+import numpy as np
+
+from alias.src.slab_index import SlabIndex
+from alias.tests.alias_test_case import AliasTestCase
+
+
+class TestSlabIndex(AliasTestCase):
+
+    def setUp(self):
+
+        self.dim = np.array([20., 20., 60.])
+
+        random = np.random.RandomState(3)
+        self.zmol = random.uniform(-30, 30, 300)
+        self.indices = np.arange(0, 300, 2)
+        self.slab_index = SlabIndex(self.zmol, self.dim, self.indices)
+
+    def in_slab(self, lower, upper):
+
+        z_wrap = self.zmol - lower
+        z_wrap -= self.dim[2] * np.floor(z_wrap / self.dim[2])
+
+        return z_wrap <= upper - lower
+
+    def test_slab(self):
+
+        self.assertArrayAlmostEqual(self.indices, self.slab_index.mol_list())
+
+        for lower, upper in [(-5, 5), (20, 40), (-45, -25), (-10, 80)]:
+            expected = np.flatnonzero(
+                self.in_slab(lower, upper) & self.slab_index.available)
+
+            self.assertArrayAlmostEqual(
+                expected, self.slab_index.slab(lower, upper))
+
+    def test_remove(self):
+
+        self.slab_index.remove([0, 2, 4])
+        self.assertArrayAlmostEqual(
+            self.indices[3:], self.slab_index.mol_list())
+
+        self.slab_index.remove_outside(20, 40)
+        expected = np.flatnonzero(self.in_slab(20, 40))
+        expected = expected[expected % 2 == 0]
+        expected = expected[expected > 4]
+
+        self.assertArrayAlmostEqual(expected, self.slab_index.mol_list())
+        self.assertArrayAlmostEqual(
+            expected, self.slab_index.slab(-30, 30))
@@ -34,6 +34,18 @@ class TestSurfaceParameters(TestCase):
         self.assertEqual(4, self.parameters.n_mols)
         self.assertEqual(24, self.parameters.n_sites)
 
+    def test_com_indices(self):
+
+        self.assertListEqual(
+            list(range(0, 220, 7)), self.parameters.com_indices)
+
+        self.parameters.com_stride = 1
+        self.assertEqual(220, len(self.parameters.com_indices))
+
+        self.parameters.com_reference = 'molecules'
+        self.assertListEqual(
+            self.parameters.atom_indices, self.parameters.com_indices)
+
     def test_select_masses(self):
 
         with mock.patch(INPUT_PATH, return_value='Y'):
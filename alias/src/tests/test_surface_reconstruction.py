@@ -0,0 +1,68 @@
+import numpy as np
+
+from alias.src.linear_algebra import structure_update_A_b, solve_linear
+from alias.src.self_consistent_cycle import (
+    initialise_surface, initialise_recon)
+from alias.src.surface_reconstruction import (
+    surface_reconstruction,
+    H_var_values,
+    ReconstructionSweep
+)
+from alias.tests.alias_test_case import AliasTestCase
+
+
+class TestSurfaceReconstruction(AliasTestCase):
+
+    def setUp(self):
+
+        self.qm = 2
+        self.n0 = 40
+        self.dim = np.array([20., 20., 60.])
+
+        random = np.random.RandomState(5)
+        xmol = random.uniform(0, self.dim[0], self.n0)
+        ymol = random.uniform(0, self.dim[1], self.n0)
+        zmol = (
+            0.8 * np.sin(2 * np.pi * xmol / self.dim[0])
+            + random.normal(0, 0.5, self.n0))
+
+        _, _, _, self.area_diag = initialise_surface(
+            self.qm, 1E-4, self.dim)
+        self.psi, self.curve_matrix, self.H_var = initialise_recon(
+            self.qm, 1E-4, self.dim)
+
+        A, b = structure_update_A_b(
+            xmol, ymol, zmol, self.dim, self.qm, [np.arange(self.n0)] * 2)
+        self.A = A[0]
+        self.b = b[0]
+        self.coeff = solve_linear(self.A + self.area_diag, self.b)
+
+    def test_reconstruction_sweep(self):
+
+        sweep = ReconstructionSweep(
+            self.A, self.b, self.area_diag, self.curve_matrix,
+            self.H_var, self.n0)
+
+        for psi in [0, self.psi, 10 * self.psi]:
+            A_recon = self.A * (1. + self.curve_matrix * psi / self.n0)
+            coeff = solve_linear(A_recon + self.area_diag, self.b)
+
+            self.assertArrayAlmostEqual(coeff, sweep.coeff(psi))
+            self.assertArrayAlmostEqual(
+                H_var_values(
+                    coeff, A_recon, self.curve_matrix, self.H_var,
+                    self.qm, self.n0),
+                sweep.H_var_values(psi)
+            )
+
+    def test_surface_reconstruction(self):
+
+        coeff, A_recon = surface_reconstruction(
+            self.coeff, self.A, self.b, self.area_diag, self.curve_matrix,
+            self.H_var, self.qm, self.n0, self.psi, method='solve')
+        coeff_eigen, A_recon_eigen = surface_reconstruction(
+            self.coeff, self.A, self.b, self.area_diag, self.curve_matrix,
+            self.H_var, self.qm, self.n0, self.psi, method='eigen')
+
+        self.assertArrayAlmostEqual(coeff, coeff_eigen)
+        self.assertArrayAlmostEqual(A_recon, A_recon_eigen)
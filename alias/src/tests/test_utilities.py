@@ -4,7 +4,8 @@ import numpy as np
 
 from alias.src.utilities import (
     unit_vector, numpy_remove,
-    bubble_sort, create_surface_file_path,
+    bubble_sort, smallest_indices, create_surface_file_path,
+    create_results_file_path, results_parameters,
     create_file_name
 )
 
@@ -61,6 +62,14 @@ class TestUtilities(TestCase):
             array))
         self.assertTrue(np.allclose(key, np.arange(9)))
 
+    def test_smallest_indices(self):
+        key = np.array([3., 1., 2., 1., 5., 2., 0., 2.])
+        order = np.argsort(key, kind='stable')
+
+        for k in range(key.size + 2):
+            self.assertTrue(np.array_equal(
+                order[:k], smallest_indices(key, k)))
+
     def test_create_surface_file_path(self):
 
         q_m = 10
@@ -85,3 +94,16 @@ class TestUtilities(TestCase):
             '/some/directory/some_file_name_10_12_100000000_5_r',
             file_name
         )
+
+    def test_create_results_file_path(self):
+
+        self.assertEqual(
+            '/some/directory/some_file_name_results',
+            create_results_file_path(self.file_name, self.directory)
+        )
+
+        self.assertDictEqual(
+            {'q_m': 10, 'n0': 12, 'phi': 1E-8, 'recon': True,
+             'q_max': None},
+            results_parameters(10, 12, 1E-8, 1)
+        )
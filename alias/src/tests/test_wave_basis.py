@@ -0,0 +1,97 @@
+import numpy as np
+
+from alias.src.wave_basis import WaveBasis, wave_basis, mode_limits
+from alias.src.wave_function import wave_arrays, wave_indices, check_uv
+from alias.tests.alias_test_case import AliasTestCase
+
+
+class TestWaveBasis(AliasTestCase):
+
+    def setUp(self):
+
+        self.qm = 3
+        self.dim = np.array([10., 12., 30.])
+        self.basis = WaveBasis(self.qm, self.dim)
+
+    def test_wave_arrays(self):
+
+        u_array, v_array = wave_arrays(self.qm)
+
+        self.assertEqual(7, self.basis.n_waves)
+        self.assertArrayAlmostEqual(u_array, self.basis.u_array)
+        self.assertArrayAlmostEqual(v_array, self.basis.v_array)
+        self.assertArrayAlmostEqual(
+            [check_uv(u, v) for u, v in zip(u_array, v_array)],
+            self.basis.uv_check)
+
+        for qu in range(self.qm + 1):
+            indices = wave_indices(qu, u_array, v_array)
+            self.assertArrayAlmostEqual(indices, self.basis.indices(qu))
+            self.assertArrayAlmostEqual(
+                indices, np.flatnonzero(self.basis.mask(qu)))
+
+    def test_frequencies(self):
+
+        u_array, v_array = wave_arrays(self.qm)
+        q2 = 4 * np.pi ** 2 * (
+            u_array ** 2 / self.dim[0] ** 2 + v_array ** 2 / self.dim[1] ** 2)
+
+        self.assertArrayAlmostEqual(q2, self.basis.q2)
+        self.assertArrayAlmostEqual(np.sqrt(q2), self.basis.q)
+
+        weights = self.basis.area_weights(1)
+        self.assertArrayAlmostEqual(
+            np.pi ** 2 * (1 / self.dim[0] ** 2 + 1 / self.dim[1] ** 2),
+            weights[self.basis.indices(1)][-1])
+        self.assertEqual(0, weights[0])
+
+    def test_circular_mask(self):
+
+        q_max = 2 * np.pi * 2 / self.dim[0]
+        mask = self.basis.mask(q_max=q_max)
+
+        self.assertTrue(np.all(self.basis.q[mask] <= q_max * (1 + 1E-12)))
+        self.assertTrue(np.all(self.basis.q[~mask] > q_max))
+        self.assertArrayAlmostEqual(
+            np.flatnonzero(mask), self.basis.indices(q_max=q_max))
+
+        # Wave (2, 0) lies on the cutoff, and (2, 1) outside
+        u_array, v_array = self.basis.u_array, self.basis.v_array
+        self.assertTrue(mask[(u_array == 2) & (v_array == 0)][0])
+        self.assertFalse(mask[(u_array == 2) & (v_array == 1)][0])
+        self.assertTrue(mask[(u_array == 0) & (v_array == 2)][0])
+        self.assertEqual((2, 2), mode_limits(q_max, self.dim))
+        self.assertEqual((4, 4), mode_limits(2 * q_max, self.dim))
+
+        # Square truncation still applies within the circle
+        self.assertEqual(
+            np.count_nonzero(self.basis.mask(1)),
+            np.count_nonzero(self.basis.mask(1, q_max)))
+
+    def test_read_only(self):
+
+        with self.assertRaises(ValueError):
+            self.basis.u_array[0] = 1
+        with self.assertRaises(ValueError):
+            self.basis.area_vector(0.1)[0] = 1
+
+    def test_wave_basis(self):
+
+        basis = wave_basis(self.qm, self.dim)
+
+        self.assertIs(basis, wave_basis(self.qm, list(self.dim)))
+        self.assertIsNot(basis, wave_basis(self.qm + 1, self.dim))
+        self.assertIs(
+            basis.area_vector(0.1),
+            wave_basis(self.qm, self.dim).area_vector(0.1))
+
+    def test_curve_block(self):
+
+        indices = self.basis.indices(1)
+        curve_block = self.basis.curve_block(indices)
+
+        self.assertEqual((indices.size, indices.size), curve_block.shape)
+        self.assertArrayAlmostEqual(
+            self.basis.curve_matrix[np.ix_(indices, indices)], curve_block)
+        self.assertArrayAlmostEqual(
+            np.diag(self.basis.area_vector(0.1)), self.basis.area_diag(0.1))
@@ -2,11 +2,18 @@ import numpy as np
 
 from alias.src.wave_function import (
     check_uv,
+    vcheck,
     wave_function,
     d_wave_function,
     dd_wave_function,
     cos_sin_indices,
-    wave_arrays
+    wave_function_array,
+    d_wave_function_array,
+    dd_wave_function_array,
+    wave_arrays,
+    wave_function_table,
+    d_wave_function_table,
+    dd_wave_function_table
 )
 from alias.tests.alias_test_case import AliasTestCase
 
@@ -24,6 +31,13 @@ class TestWaveFunction(AliasTestCase):
         self.assertEqual(2, check_uv(0, 1))
         self.assertEqual(1, check_uv(1, 1))
 
+    def test_vcheck(self):
+
+        u_array, v_array = wave_arrays(2)
+        self.assertArrayAlmostEqual(
+            [check_uv(u, v) for u, v in zip(u_array, v_array)],
+            vcheck(u_array, v_array))
+
     def test_wave_function(self):
 
         self.assertEqual(
@@ -96,3 +110,42 @@ class TestWaveFunction(AliasTestCase):
         u_array, v_array = wave_arrays(2)
         self.assertEqual((25,), u_array.shape)
         self.assertEqual((25,), v_array.shape)
+
+    def test_wave_function_tables(self):
+
+        x = np.linspace(0, self.lx, 7)
+        u_array = np.arange(-3, 4)
+
+        table = wave_function_table(x, 3, self.lx)
+        d_table = d_wave_function_table(x, 3, self.lx)
+        dd_table = dd_wave_function_table(x, 3, self.lx)
+
+        self.assertEqual((7, 7), table.shape)
+
+        for index, u in enumerate(u_array):
+            self.assertArrayAlmostEqual(
+                wave_function(x, u, self.lx), table[:, index])
+            self.assertArrayAlmostEqual(
+                d_wave_function(x, u, self.lx), d_table[:, index])
+            self.assertArrayAlmostEqual(
+                dd_wave_function(x, u, self.lx), dd_table[:, index])
+
+        # Recurrence remains accurate to high frequencies
+        x = np.linspace(-self.lx, 2 * self.lx, 50)
+        table = wave_function_table(x, 100, self.lx)
+        for index, u in enumerate(range(-100, 101)):
+            self.assertArrayAlmostEqual(
+                wave_function(x, u, self.lx), table[:, index])
+
+    def test_wave_function_arrays(self):
+
+        u_array = np.array([2, -1, 0, 3, -3])
+        x = 2.3
+
+        for function, array_function in zip(
+                [wave_function, d_wave_function, dd_wave_function],
+                [wave_function_array, d_wave_function_array,
+                 dd_wave_function_array]):
+            self.assertArrayAlmostEqual(
+                [function(x, u, self.lx) for u in u_array],
+                array_function(x, u_array, self.lx))
@@ -79,6 +79,43 @@ def bubble_sort(array, key):
                 key[i+1] = temp
 
 
+def smallest_indices(key, k):
+    """
+    Returns indices of the k smallest elements of key, ordered by
+    key with ties in order of index, as a stable sort of key would.
+    Elements are found in a single partition of key rather than a
+    full sort.
+
+    Parameters
+    ----------
+    key:  float, array_like; shape=(n)
+        Values to select from
+    k:  int
+        Number of elements to select
+
+    Returns
+    -------
+    indices:  int, array_like; shape=(min(k, n))
+        Indices of smallest elements of key in order
+    """
+
+    key = np.asarray(key)
+
+    if k <= 0:
+        return np.zeros(0, dtype=int)
+    if k >= key.size:
+        return np.argsort(key, kind='stable')
+
+    # All elements below the kth smallest value, along with the
+    # earliest elements equal to it
+    kth = np.partition(key, k - 1)[k - 1]
+    below = np.flatnonzero(key < kth)
+    equal = np.flatnonzero(key == kth)[:k - below.size]
+    indices = np.concatenate((below, equal))
+
+    return indices[np.argsort(key[indices], kind='stable')]
+
+
 def unit_vector(vector, axis=-1):
     """
     unit_vector(vector, axis=-1)
@@ -123,3 +160,18 @@ def create_surface_file_path(file_name, directory, q_m, n0,
         directory, f"{file_name}_{coeff_ext}")
 
     return file_path
+
+
+def create_results_file_path(file_name, directory):
+    """Returns path of hdf5 file holding all intrinsic surface
+    results of a trajectory"""
+    return os.path.join(directory, f"{file_name}_results")
+
+
+def results_parameters(q_m, n0, phi, recon, q_max=None):
+    """Returns parameters identifying a group of intrinsic surface
+    results in a results file, see `AliasStore.parameter_group`"""
+    return {
+        'q_m': int(q_m), 'n0': int(n0), 'phi': float(phi),
+        'recon': bool(recon), 'q_max': q_max
+    }
@@ -0,0 +1,261 @@
+from functools import lru_cache
+
+import numpy as np
+
+from alias.src.wave_function import wave_arrays, vcheck
+
+
+def read_only(array):
+    """Returns array flagged as read only, so that tables shared
+    between callers cannot be modified in place"""
+    array = np.asarray(array)
+    array.flags.writeable = False
+    return array
+
+
+class WaveBasis:
+    """Tables derived from the wave frequencies (u, v) of the Fourier
+    sum representing an intrinsic surface, for a maximum frequency qm
+    and cell dimensions dim.
+
+    Tables are built on first use and kept for the lifetime of the
+    basis, which is shared between all callers with the same qm and
+    dim (see `wave_basis`). All tables returned are read only.
+
+    Only tables with one entry per wave are kept: matrices over pairs
+    of waves (`area_diag`, `curve_matrix`) hold n_waves**4 elements and
+    are built from these tables on each call instead.
+    """
+
+    def __init__(self, qm, dim):
+        """
+        Parameters
+        ----------
+        qm:  int
+            Maximum number of wave frequencies in Fourier Sum
+            representing intrinsic surface
+        dim:  float, array_like; shape=(3)
+            XYZ dimensions of simulation cell
+        """
+        self.qm = qm
+        self.dim = read_only(np.array(dim, dtype=float))
+
+        u_array, v_array = wave_arrays(qm)
+        self.u_array = read_only(u_array)
+        self.v_array = read_only(v_array)
+
+        self._tables = {}
+
+    @property
+    def n_waves(self):
+        """Number of waves in each dimension of Fourier sum"""
+        return 2 * self.qm + 1
+
+    def _table(self, name, build):
+        """Return named table, calling build on first use"""
+
+        if name not in self._tables:
+            self._tables[name] = read_only(build())
+
+        return self._tables[name]
+
+    @property
+    def uv_check(self):
+        """Weightings of each (u, v) wave, see `wave_function.check_uv`"""
+        return self._table(
+            'uv_check', lambda: vcheck(self.u_array, self.v_array))
+
+    @property
+    def q2(self):
+        """Squared magnitude of each wave vector in Angstroms^-2"""
+        return self._table(
+            'q2', lambda: (
+                self.u_array ** 2 / self.dim[0] ** 2
+                + self.v_array ** 2 / self.dim[1] ** 2
+            ) * (4 * np.pi ** 2))
+
+    @property
+    def q(self):
+        """Magnitude of each wave vector in Angstroms^-1"""
+        return self._table('q', lambda: np.sqrt(self.q2))
+
+    def indices(self, qu=None, q_max=None):
+        """Returns indices of waves with frequencies up to qu
+        (default=qm) and wave vector magnitudes up to q_max
+        (default=no limit), see `mask`"""
+        return self._table(
+            'indices_{}_{!r}'.format(qu, q_max),
+            lambda: np.flatnonzero(self.mask(qu, q_max)))
+
+    def mask(self, qu=None, q_max=None):
+        """
+        Returns mask of waves included in a truncated Fourier sum
+
+        Parameters
+        ----------
+        qu:  int, optional
+            Upper limit of wave frequencies u and v (default=qm)
+        q_max:  float, optional
+            Upper limit of wave vector magnitude |q| in Angstroms^-1,
+            giving a circular (or elliptical, in wave frequencies)
+            set of waves (default=no limit)
+
+        Returns
+        -------
+        mask:  bool, array_like; shape=(n_waves**2)
+            Whether each wave is included
+        """
+        if qu is None:
+            qu = self.qm
+
+        def build():
+            mask = (
+                (np.abs(self.u_array) <= qu) & (np.abs(self.v_array) <= qu))
+            if q_max is not None:
+                mask &= self.q2 <= q_max ** 2 * (1 + 1E-12)
+            return mask
+
+        return self._table('mask_{}_{!r}'.format(qu, q_max), build)
+
+    def area_weights(self, qu=None):
+        """Returns weighting of squared coefficients in surface area
+        at resolution qu (see `spectra.intrinsic_area`)"""
+        if qu is None:
+            qu = self.qm
+        return self._table(
+            'area_weights_{}'.format(qu),
+            lambda: self.mask(qu) * self.q2 * self.uv_check / 4)
+
+    def area_vector(self, phi):
+        """
+        Returns surface area terms for each wave, forming the diagonal
+        of the A matrix terms given by `area_diag`
+
+        Parameters
+        ----------
+        phi:  float
+            Weighting factor of minimum surface area term in surface
+            optimisation function
+
+        Returns
+        -------
+        area_vector: float, array_like; shape=(n_waves**2)
+            Surface area terms for each wave
+        """
+        return self._table(
+            'area_vector_{!r}'.format(float(phi)),
+            lambda: 4 * np.pi ** 2 * phi * self.uv_check * (
+                self.u_array ** 2 * self.dim[1] / self.dim[0]
+                + self.v_array ** 2 * self.dim[0] / self.dim[1]))
+
+    def area_diag(self, phi):
+        """
+        Returns surface area diagonal terms for A matrix, built on
+        each call from `area_vector`
+
+        Parameters
+        ----------
+        phi:  float
+            Weighting factor of minimum surface area term in surface
+            optimisation function
+
+        Returns
+        -------
+        area_diag: float, array_like; shape=(n_waves**2, n_waves**2)
+            Surface area diagonal terms for A matrix
+        """
+        return np.diagflat(self.area_vector(phi))
+
+    @property
+    def H_var(self):
+        """Diagonal terms for global variance of mean curvature"""
+        return self._table(
+            'H_var', lambda: 4 * np.pi ** 4 * self.uv_check * (
+                self.u_array ** 4 / self.dim[0] ** 4
+                + self.v_array ** 4 / self.dim[1] ** 4
+                + 2 * (self.u_array * self.v_array) ** 2
+                / np.prod(self.dim ** 2)))
+
+    def curve_block(self, indices=None):
+        """
+        Returns surface curvature terms for A matrix between waves
+        at indices, built on each call
+
+        Parameters
+        ----------
+        indices:  int, array_like, optional
+            Indices of waves to include (default=all)
+
+        Returns
+        -------
+        curve_block: float, array_like; shape=(n_indices, n_indices)
+            Surface curvature terms for A matrix
+        """
+        if indices is None:
+            indices = slice(None)
+
+        u_matrix = self.u_array[None, indices]
+        v_matrix = self.v_array[None, indices]
+
+        return 16 * np.pi ** 4 * (
+            (u_matrix * u_matrix.T) ** 2 / self.dim[0] ** 4
+            + (v_matrix * v_matrix.T) ** 2 / self.dim[1] ** 4
+            + ((u_matrix * v_matrix.T) ** 2
+               + (u_matrix.T * v_matrix) ** 2)
+            / np.prod(self.dim ** 2)
+        )
+
+    @property
+    def curve_matrix(self):
+        """Surface curvature terms for A matrix, see `curve_block`"""
+        return self.curve_block()
+
+
+def mode_limits(q_max, dim):
+    """
+    Returns largest wave frequencies u and v along x and y with wave
+    vector magnitudes up to q_max
+
+    Parameters
+    ----------
+    q_max:  float
+        Upper limit of wave vector magnitude |q| in Angstroms^-1
+    dim:  float, array_like; shape=(3)
+        XYZ dimensions of simulation cell
+
+    Returns
+    -------
+    u_max, v_max:  int
+        Largest frequencies along x and y
+    """
+    return tuple(
+        int(q_max * length / (2 * np.pi) * (1 + 1E-12))
+        for length in dim[:2])
+
+
+@lru_cache(maxsize=8)
+def _cached_wave_basis(qm, dim):
+    return WaveBasis(qm, dim)
+
+
+def wave_basis(qm, dim):
+    """
+    Returns WaveBasis for a maximum frequency qm and cell dimensions
+    dim, shared between all calls with the same arguments. The most
+    recently used bases are kept in memory.
+
+    Parameters
+    ----------
+    qm:  int
+        Maximum number of wave frequencies in Fourier Sum
+        representing intrinsic surface
+    dim:  float, array_like; shape=(3)
+        XYZ dimensions of simulation cell
+
+    Returns
+    -------
+    basis:  WaveBasis
+        Tables derived from wave frequencies
+    """
+    return _cached_wave_basis(
+        int(qm), tuple(float(length) for length in dim))
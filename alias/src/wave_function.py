@@ -14,7 +14,18 @@ def check_uv(u, v):
     return 1.
 
 
-vcheck = np.vectorize(check_uv)
+def vcheck(u_array, v_array):
+    """
+    Returns weightings for each pair of frequencies in u_array
+    and v_array, as given by `check_uv`
+    """
+    u_array = np.abs(u_array)
+    v_array = np.abs(v_array)
+
+    return np.where(
+        u_array * v_array == 0,
+        np.where(u_array + v_array == 0, 4., 2.),
+        1.)
 
 
 def wave_function(x, u, Lx):
@@ -108,6 +119,76 @@ def dd_wave_function_array(x, u_array, Lx):
     return - coeff ** 2 * u_array ** 2 * f_array
 
 
+def _cos_sin_tables(x, qm, Lx, block=16):
+    """
+    Returns tables of cos and sin waves for all positive
+    frequencies k = 0..qm at each position in x
+
+    Waves are generated as powers of exp(i theta), with
+    theta = 2 pi x / Lx, by repeated multiplication within blocks
+    of frequencies. Only the first wave of each block is evaluated
+    directly, which bounds the accumulated round-off to that of
+    block multiplications for any qm.
+    """
+
+    theta = 2 * np.pi / Lx * np.ravel(np.asarray(x, dtype=float))
+    block = min(block, qm + 1)
+
+    # Powers exp(i j theta) for j = 0..block-1
+    powers = np.ones((theta.size, block), dtype=complex)
+    powers[:, 1:] = np.exp(1j * theta)[:, None]
+    powers = np.cumprod(powers, axis=1)
+
+    # First wave of each block, exp(i k0 theta)
+    starts = np.arange(0, qm + 1, block)
+    seeds = np.exp(1j * np.outer(theta, starts))
+
+    waves = np.reshape(
+        seeds[:, :, None] * powers[:, None, :], (theta.size, -1))
+    waves = waves[:, :qm + 1]
+
+    return waves.real, waves.imag
+
+
+def wave_function_table(x, qm, Lx):
+    """
+    Returns table of all waves in Fourier sum for frequencies
+    u = -qm..qm at each position in x; shape=(len(x), 2*qm+1)
+    """
+
+    cos_q, sin_q = _cos_sin_tables(x, qm, Lx)
+
+    return np.concatenate([sin_q[:, :0:-1], cos_q], axis=1)
+
+
+def d_wave_function_table(x, qm, Lx):
+    """
+    Returns table of first derivatives of all waves in Fourier sum
+    for frequencies u = -qm..qm at each position in x;
+    shape=(len(x), 2*qm+1)
+    """
+
+    coeff = 2 * np.pi / Lx
+    cos_q, sin_q = _cos_sin_tables(x, qm, Lx)
+    k_array = coeff * np.arange(qm + 1)
+
+    return np.concatenate(
+        [(k_array * cos_q)[:, :0:-1], - k_array * sin_q], axis=1)
+
+
+def dd_wave_function_table(x, qm, Lx):
+    """
+    Returns table of second derivatives of all waves in Fourier sum
+    for frequencies u = -qm..qm at each position in x;
+    shape=(len(x), 2*qm+1)
+    """
+
+    coeff = 2 * np.pi / Lx
+    u_array = np.arange(-qm, qm + 1)
+
+    return - coeff ** 2 * u_array ** 2 * wave_function_table(x, qm, Lx)
+
+
 def wave_arrays(qm):
     """Return full arrays of each (u, v) 2D wave frequency
     combination for a given maximum frequency, `qm`"""